@@ -10,8 +10,12 @@ import os
 import signal
 import threading
 import uuid
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Tuple
 
+from wifi_api.iface_control import HELPER_PATH, InterfaceControlError, make_controller
+
 app = Flask(__name__)
 CORS(app)
 
@@ -19,9 +23,80 @@ CORS(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Global variables
-active_processes: Dict[str, subprocess.Popen] = {}
-scan_results: Dict[str, Any] = {}
+# Deauth attacks run on a bounded pool; attacks beyond the queue limit are
+# refused rather than starting a thread each
+WORKERS = int(os.environ.get('FLASK_WORKERS', 4))
+MAX_QUEUED_JOBS = int(os.environ.get('FLASK_MAX_QUEUED_JOBS', 16))
+
+class ProcessRegistry:
+    """Child processes and queued jobs, shared by request and pool threads.
+
+    Every change and every read goes through one lock, so /api/status
+    reports a consistent snapshot even while jobs start and finish.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes: Dict[str, Tuple[str, subprocess.Popen]] = {}
+        self._queued: Dict[str, str] = {}
+        self._completed = 0
+        self._failed = 0
+
+    def queue(self, job_id: str, kind: str, limit: int) -> bool:
+        """Reserve a place for a job; False if ``limit`` jobs are already waiting."""
+        with self._lock:
+            if len(self._queued) >= limit:
+                return False
+            self._queued[job_id] = kind
+            return True
+
+    def start(self, job_id: str, kind: str, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._queued.pop(job_id, None)
+            self._processes[job_id] = (kind, process)
+
+    def finish(self, job_id: str, ok: bool) -> None:
+        with self._lock:
+            self._queued.pop(job_id, None)
+            self._processes.pop(job_id, None)
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_kind: Dict[str, int] = {}
+            for kind, _ in self._processes.values():
+                by_kind[kind] = by_kind.get(kind, 0) + 1
+            return {
+                "active": len(self._processes),
+                "byKind": by_kind,
+                "queued": len(self._queued),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def terminate_all(self) -> None:
+        with self._lock:
+            processes = [process for _, process in self._processes.values()]
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+registry = ProcessRegistry()
+job_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='job')
+
+@atexit.register
+def shutdown_jobs():
+    job_pool.shutdown(wait=False, cancel_futures=True)
+    registry.terminate_all()
+
+# Monitor mode changes go through nl80211 (or the sudo helper when not root)
+interface_controller = make_controller(
+    os.environ.get('INTERFACE_CONTROL_BACKEND', 'auto'),
+    os.environ.get('INTERFACE_HELPER_PATH', HELPER_PATH),
+)
 
 def run_command(command: List[str]) -> Tuple[bool, str, Optional[str]]:
     """Run a shell command and return its output."""
@@ -151,26 +226,22 @@ def start_monitor():
     if not interface:
         return jsonify({"error": "Interface name is required"}), 400
     
-    # Kill potentially interfering processes
-    run_command(['airmon-ng', 'check', 'kill'])
-    
-    # Start monitor mode
-    success, stdout, stderr = run_command(['airmon-ng', 'start', interface])
-    
-    if not success:
-        return jsonify({"error": stderr}), 500
+    # Kill potentially interfering processes, only when asked to
+    if data.get('killInterfering'):
+        run_command(['airmon-ng', 'check', 'kill'])
     
-    # Parse the output to get the monitor interface name
-    monitor_interface = f"{interface}mon"  # Default naming convention
-    match = re.search(r'(monitor mode enabled on|monitor mode vif enabled for) (\w+)', stdout)
-    if match:
-        monitor_interface = match.group(2)
+    # Switch the interface in place over netlink
+    try:
+        state = interface_controller.set_mode(interface, 'monitor')
+    except InterfaceControlError as e:
+        return jsonify({"error": str(e)}), 500
     
     return jsonify({
         "success": True,
         "message": f"Started monitor mode on {interface}",
         "data": {
-            "monitorInterface": monitor_interface
+            "monitorInterface": interface,
+            "state": state
         }
     })
 
@@ -183,14 +254,17 @@ def stop_monitor():
     if not interface:
         return jsonify({"error": "Interface name is required"}), 400
     
-    success, stdout, stderr = run_command(['airmon-ng', 'stop', interface])
-    
-    if not success:
-        return jsonify({"error": stderr}), 500
+    try:
+        state = interface_controller.set_mode(interface, 'managed')
+    except InterfaceControlError as e:
+        return jsonify({"error": str(e)}), 500
     
     return jsonify({
         "success": True,
-        "message": f"Stopped monitor mode on {interface}"
+        "message": f"Stopped monitor mode on {interface}",
+        "data": {
+            "state": state
+        }
     })
 
 @app.route('/api/scan', methods=['POST'])
@@ -217,9 +291,11 @@ def scan_networks():
     # Start airodump-ng in a background process
     cmd = ['airodump-ng', '--output-format', 'csv', '--write', output_file, interface]
     
+    process = None
+    ok = False
     try:
         process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        active_processes[scan_id] = process
+        registry.start(scan_id, 'scan', process)
         
         # Let the scan run for a few seconds
         time.sleep(5)
@@ -355,19 +431,6 @@ def scan_networks():
                                     network["clients"] += 1
                                     break
             
-        # Clean up the process
-        if scan_id in active_processes:
-            process = active_processes[scan_id]
-            process.send_signal(signal.SIGTERM)
-            process.wait(timeout=2)
-            del active_processes[scan_id]
-            
-        # Clean up the temporary files
-        for ext in ['-01.csv', '-01.kismet.csv', '-01.kismet.netxml', '-01.cap']:
-            file_path = f"{output_file}{ext}"
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
         # If no networks found (or error reading file), return mock data
         if not networks:
             networks = [
@@ -400,10 +463,34 @@ def scan_networks():
                 }
             ]
         
+        ok = True
         return jsonify({"networks": networks, "clients": clients})
     except Exception as e:
         logger.error(f"Error during scan: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        # Stop airodump-ng before it leaves the registry, so the count
+        # never drops while the process is still running
+        if process is not None:
+            stop_process(process)
+            registry.finish(scan_id, ok)
+        
+        # Clean up the temporary files
+        for ext in ['-01.csv', '-01.kismet.csv', '-01.kismet.netxml', '-01.cap']:
+            file_path = f"{output_file}{ext}"
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+def stop_process(process: subprocess.Popen, timeout: float = 2) -> None:
+    """Terminate a child process, killing it if it does not exit in time."""
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
 
 @app.route('/api/attack/deauth', methods=['POST'])
 def deauth_attack():
@@ -416,29 +503,15 @@ def deauth_attack():
     if not bssid:
         return jsonify({"error": "BSSID is required"}), 400
     
-    # Get the first monitor mode interface
-    success, stdout, stderr = run_command(['iwconfig'])
-    monitor_interface = None
-    
-    if success:
-        for line in stdout.split('\n'):
-            if 'Mode:Monitor' in line:
-                monitor_match = re.match(r'^(\w+)', line)
-                if monitor_match:
-                    monitor_interface = monitor_match.group(1)
-                    break
-    
+    monitor_interface = find_monitor_interface()
     if not monitor_interface:
         return jsonify({"error": "No monitor mode interface found"}), 400
     
-    # Run the deauth attack
+    # Queue the deauth attack on the worker pool
     attack_id = str(uuid.uuid4())
-    attack_thread = threading.Thread(
-        target=run_deauth_attack,
-        args=(attack_id, monitor_interface, bssid, client_mac, packets)
-    )
-    attack_thread.daemon = True
-    attack_thread.start()
+    if not registry.queue(attack_id, 'deauth', MAX_QUEUED_JOBS):
+        return jsonify({"error": "Too many attacks queued, try again later"}), 503
+    job_pool.submit(run_deauth_attack, attack_id, monitor_interface, bssid, client_mac, packets)
     
     return jsonify({
         "success": True,
@@ -446,8 +519,18 @@ def deauth_attack():
         "data": {"attackId": attack_id}
     })
 
-def run_deauth_attack(attack_id, interface, bssid, client_mac, packets):
-    """Run deauth attack in a separate thread."""
+def find_monitor_interface() -> Optional[str]:
+    """Return the first interface iwconfig reports in monitor mode."""
+    success, stdout, stderr = run_command(['iwconfig'])
+    if success:
+        for line in stdout.split('\n'):
+            if 'Mode:Monitor' in line:
+                monitor_match = re.match(r'^(\w+)', line)
+                if monitor_match:
+                    return monitor_match.group(1)
+    return None
+
+def deauth_command(interface, bssid, client_mac, packets) -> List[str]:
     cmd = ['aireplay-ng', '--deauth', str(packets), '-a', bssid]
     
     # If targeting a specific client
@@ -455,10 +538,17 @@ def run_deauth_attack(attack_id, interface, bssid, client_mac, packets):
         cmd.extend(['-c', client_mac])
         
     cmd.append(interface)
-    
+    return cmd
+
+def run_deauth_attack(attack_id, interface, bssid, client_mac, packets):
+    """Run a deauth attack on a pool worker."""
+    ok = False
     try:
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        active_processes[attack_id] = process
+        process = subprocess.Popen(
+            deauth_command(interface, bssid, client_mac, packets),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        registry.start(attack_id, 'deauth', process)
         
         # Wait for the process to complete
         stdout, stderr = process.communicate()
@@ -467,15 +557,12 @@ def run_deauth_attack(attack_id, interface, bssid, client_mac, packets):
             logger.error(f"Deauth attack failed: {stderr.decode('utf-8')}")
         else:
             logger.info(f"Deauth attack completed successfully")
-            
-        # Clean up
-        if attack_id in active_processes:
-            del active_processes[attack_id]
+            ok = True
             
     except Exception as e:
         logger.error(f"Error during deauth attack: {str(e)}")
-        if attack_id in active_processes:
-            del active_processes[attack_id]
+    finally:
+        registry.finish(attack_id, ok)
 
 @app.route('/api/airodump/output', methods=['POST'])
 def parse_airodump_output():
@@ -625,11 +712,33 @@ def parse_airodump_output():
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get the status of the backend server."""
+    counts = registry.snapshot()
     return jsonify({
         "status": "running",
-        "activeProcesses": len(active_processes),
+        "activeProcesses": counts["active"],
+        "processes": counts["byKind"],
+        "queuedJobs": counts["queued"],
+        "completedJobs": counts["completed"],
+        "failedJobs": counts["failed"],
+        "workers": WORKERS,
         "version": "0.1.0"
     })
 
+def serve():
+    """Serve the app with waitress, or Flask's server when debugging."""
+    host = os.environ.get('FLASK_HOST', '0.0.0.0')
+    port = int(os.environ.get('FLASK_PORT', 5000))
+    if os.environ.get('FLASK_DEBUG'):
+        # The reloader runs the app in a child process with its own registry
+        app.run(host=host, port=port, debug=True, threaded=True)
+        return
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        logger.warning("waitress is not installed; falling back to Flask's development server")
+        app.run(host=host, port=port, threaded=True)
+        return
+    waitress_serve(app, host=host, port=port, threads=int(os.environ.get('FLASK_THREADS', 16)))
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    serve()
@@ -1,16 +1,8 @@
 
 # WiFi API app initialization
+# The .env file is loaded once by the wifi_framework package, which Django
+# always imports (for settings) before this app.
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-
-# Load .env file if it exists
-env_path = Path(__file__).resolve().parent.parent.parent / '.env'
-if os.path.exists(env_path):
-    load_dotenv(env_path)
-else:
-    # Set default sudo password if .env doesn't exist
-    os.environ.setdefault("SUDO_PASSWORD", "john")
 
 # Helper function to get the sudo password
 def get_sudo_password():
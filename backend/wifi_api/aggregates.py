@@ -0,0 +1,125 @@
+
+# Incremental per-channel and per-band aggregates for the live scan
+
+# 2.4 GHz channels are 5 MHz apart but 20 MHz wide, so a neighbour up to four
+# channels away overlaps; the overlap shrinks linearly with distance.
+OVERLAP_SPAN = 5
+
+
+def band_for_channel(channel):
+    if 1 <= channel <= 14:
+        return '2.4'
+    if channel >= 32:
+        return '5'
+    return 'unknown'
+
+
+def encryption_class(privacy):
+    # airodump-ng lists the strongest protocol first, e.g. "WPA2 WPA"
+    tokens = (privacy or '').split()
+    return tokens[0] if tokens else 'OPN'
+
+
+class _Bucket:
+    __slots__ = ('aps', 'stations', 'signal_sum', 'signals', 'encryption')
+
+    def __init__(self):
+        self.aps = 0
+        self.stations = 0
+        self.signal_sum = 0
+        self.signals = {}       # signal value -> count, so max survives removals
+        self.encryption = {}    # encryption class -> count
+
+    def add(self, network, sign):
+        self.aps += sign
+        self.stations += sign * network['clients']
+        self.signal_sum += sign * network['signal']
+        _bump(self.signals, network['signal'], sign)
+        _bump(self.encryption, encryption_class(network['encryption']), sign)
+
+    def summary(self):
+        return {
+            "aps": self.aps,
+            "stations": self.stations,
+            "meanSignal": round(self.signal_sum / self.aps, 1) if self.aps else 0,
+            "maxSignal": max(self.signals) if self.signals else 0,
+            "encryption": dict(self.encryption),
+        }
+
+
+def _bump(counts, key, sign):
+    value = counts.get(key, 0) + sign
+    if value:
+        counts[key] = value
+    else:
+        del counts[key]
+
+
+class ChannelAggregates:
+    """Channel and band statistics maintained from scan deltas.
+
+    Each changed network moves its contribution out of the old channel bucket
+    and into the new one, so a tick costs O(changes) rather than O(networks).
+    """
+
+    TRACKED_FIELDS = ('channel', 'signal', 'clients', 'encryption')
+
+    def __init__(self):
+        self.channels = {}
+        self.bands = {}
+        # Bumped whenever the published summary would change
+        self.version = 0
+
+    def apply(self, delta):
+        changed = False
+        for network in delta.added_networks:
+            self._add(network, 1)
+            changed = True
+        for old, new in delta.changed_networks:
+            if any(old[f] != new[f] for f in self.TRACKED_FIELDS):
+                self._add(old, -1)
+                self._add(new, 1)
+                changed = True
+        for network in delta.removed_networks:
+            self._add(network, -1)
+            changed = True
+        if changed:
+            self.version += 1
+
+    def _add(self, network, sign):
+        channel = network['channel']
+        band = band_for_channel(channel)
+        for buckets, key in ((self.channels, channel), (self.bands, band)):
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _Bucket()
+            bucket.add(network, sign)
+            if not bucket.aps:
+                del buckets[key]
+
+    def interference(self, channel):
+        """Adjacent-channel overlap score for a 2.4 GHz channel."""
+        if band_for_channel(channel) != '2.4':
+            return 0.0
+        score = 0.0
+        for distance in range(1, OVERLAP_SPAN):
+            weight = 1 - distance / OVERLAP_SPAN
+            for neighbour in (channel - distance, channel + distance):
+                bucket = self.channels.get(neighbour)
+                if bucket is not None:
+                    score += weight * bucket.aps
+        return round(score, 2)
+
+    def summary(self):
+        channels = []
+        for channel in sorted(self.channels):
+            entry = self.channels[channel].summary()
+            entry["channel"] = channel
+            entry["band"] = band_for_channel(channel)
+            entry["interference"] = self.interference(channel)
+            channels.append(entry)
+        return {
+            "version": self.version,
+            "bands": {band: bucket.summary() for band, bucket in self.bands.items()},
+            "channels": channels,
+        }
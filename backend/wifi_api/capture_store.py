@@ -0,0 +1,367 @@
+# Capture directory lifecycle: rotation, background compression and retention
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import zlib
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+from .ranges import file_crc, iter_read
+
+logger = logging.getLogger(__name__)
+
+CODEC_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+class CaptureStore:
+    """Owns the capture directory.
+
+    A live capture is rotated by sealing the bytes written since the last
+    segment. A segment is a delta (``offset`` > 0) when everything sealed
+    before is still the start of the file. airodump-ng rewrites its CSV in
+    place, so when that prefix has changed the whole file is sealed again as
+    a new base segment. Sealed segments are compressed by a background
+    worker, recorded in ``index.json`` and evicted oldest-first once they
+    exceed the byte quota; the live files do not count against it.
+    """
+
+    def __init__(self, root, max_bytes, rotate_bytes, rotate_seconds, codec='zstd'):
+        self.root = Path(root)
+        self.live_dir = self.root / 'live'
+        self.segment_dir = self.root / 'segments'
+        self.index_path = self.root / 'index.json'
+        self.max_bytes = max_bytes
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        if codec == 'zstd' and zstandard is None:
+            codec = 'gzip'
+        self.codec = codec
+
+        self.live_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        # live file -> (time of last rotation, bytes sealed, CRC32 of them)
+        self._rotations = {}
+        # scan id -> last segment sequence number handed out
+        self._last_seq = {}
+        # (inode, mtime, size) of index.json when it was last read or written
+        self._index_signature = None
+        self._index = []
+        self._refresh_index()
+
+    # Index handling
+
+    def _stat_index(self):
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh_index(self):
+        # Another worker may have rotated or evicted segments since we last
+        # looked; it replaces index.json, so a new inode or mtime means reload.
+        # Call with the lock held.
+        signature = self._stat_index()
+        if signature == self._index_signature:
+            return
+        self._index_signature = signature
+        if signature is None:
+            self._index = []
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Capture index unreadable, starting fresh: {e}")
+            self._index = []
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_signature = self._stat_index()
+
+    def segments(self, scan_id=None):
+        """Return index entries, oldest first, optionally for one scan."""
+        with self._lock:
+            self._refresh_index()
+            entries = list(self._index)
+        if scan_id is not None:
+            entries = [e for e in entries if e['scanId'] == scan_id]
+        return entries
+
+    def get_segment(self, name):
+        with self._lock:
+            self._refresh_index()
+            for entry in self._index:
+                if entry['name'] == name:
+                    return dict(entry)
+        return None
+
+    # Live captures
+
+    def new_capture(self, scan_id):
+        """Return the airodump-ng ``--write`` prefix for a new scan."""
+        return str(self.live_dir / f"scan_{scan_id}")
+
+    def maybe_rotate(self, live_file, scan_id):
+        """Seal a segment if the live file is old or has grown enough."""
+        try:
+            size = os.path.getsize(live_file)
+        except OSError:
+            return None
+
+        now = time.time()
+        with self._lock:
+            last_time, sealed, _ = self._rotations.setdefault(live_file, (now, 0, 0))
+        if now - last_time < self.rotate_seconds and abs(size - sealed) < self.rotate_bytes:
+            return None
+        return self.rotate(live_file, scan_id)
+
+    def rotate(self, live_file, scan_id):
+        """Seal what was written to a live file since its last segment."""
+        with self._lock:
+            self._refresh_index()
+            _, sealed, crc = self._rotations.get(live_file, (None, 0, 0))
+            seq = max(
+                (e['seq'] for e in self._index if e['scanId'] == scan_id),
+                default=self._last_seq.get(scan_id, 0)
+            ) + 1
+            self._last_seq[scan_id] = seq
+        name = f"scan_{scan_id}_{seq:05d}{Path(live_file).suffix}"
+        target = self.segment_dir / name
+        try:
+            with open(live_file, 'rb') as src:
+                size = os.fstat(src.fileno()).st_size
+                if sealed and file_crc(src, 0, sealed) != crc:
+                    # Rewritten in place: start a new base
+                    sealed, crc = 0, 0
+                if sealed and size == sealed:
+                    with self._lock:
+                        self._rotations[live_file] = (time.time(), sealed, crc)
+                    return None
+                with open(target, 'wb') as dst:
+                    for chunk in iter_read(src, sealed, size, close=False):
+                        dst.write(chunk)
+                        crc = zlib.crc32(chunk, crc)
+        except OSError as e:
+            logger.error(f"Failed to rotate {live_file}: {e}")
+            return None
+
+        raw_bytes = target.stat().st_size
+        entry = {
+            'name': name,
+            'scanId': scan_id,
+            'seq': seq,
+            'file': name,
+            'createdAt': time.time(),
+            'offset': sealed,
+            'base': sealed == 0,
+            'rawBytes': raw_bytes,
+            'bytes': raw_bytes,
+            'codec': None,
+        }
+        with self._lock:
+            self._refresh_index()
+            self._index.append(entry)
+            self._rotations[live_file] = (time.time(), sealed + raw_bytes, crc)
+            self._save_index()
+
+        self._submit(name)
+        return entry
+
+    def finish(self, prefix, scan_id):
+        """Seal the final state of a scan and remove its live files."""
+        live_prefix = Path(prefix)
+        for path in sorted(live_prefix.parent.glob(live_prefix.name + '-*')):
+            if path.suffix == '.csv':
+                self.rotate(str(path), scan_id)
+            with self._lock:
+                self._rotations.pop(str(path), None)
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self.enforce_quota()
+
+    # Compression worker
+
+    def _submit(self, name):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, daemon=True)
+                self._worker.start()
+        self._queue.put(name)
+
+    def _run_worker(self):
+        while True:
+            name = self._queue.get()
+            try:
+                self._compress(name)
+                self.enforce_quota()
+            except Exception as e:
+                logger.error(f"Error compressing capture segment {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _compress(self, name):
+        entry = self.get_segment(name)
+        if entry is None or entry['codec'] is not None:
+            return
+
+        source = self.segment_dir / entry['file']
+        compressed_name = entry['file'] + CODEC_SUFFIXES[self.codec]
+        target = self.segment_dir / compressed_name
+        with open(source, 'rb') as src, self._open_writer(target) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        with self._lock:
+            self._refresh_index()
+            for current in self._index:
+                if current['name'] == name:
+                    current['file'] = compressed_name
+                    current['codec'] = self.codec
+                    current['bytes'] = target.stat().st_size
+                    break
+            else:
+                # Evicted while we were compressing
+                target.unlink()
+                return
+            self._save_index()
+        source.unlink()
+
+    def _open_writer(self, path):
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return gzip.open(path, 'wb', compresslevel=6)
+
+    def flush(self):
+        """Block until every queued segment has been compressed."""
+        self._queue.join()
+
+    # Retention
+
+    def disk_usage(self, include_live=True):
+        total = 0
+        directories = (self.live_dir, self.segment_dir) if include_live else (self.segment_dir,)
+        for directory in directories:
+            for path in directory.iterdir():
+                try:
+                    total += path.stat().st_size
+                except OSError:
+                    pass
+        return total
+
+    def enforce_quota(self):
+        """Evict the oldest sealed segments until they fit the quota.
+
+        Deltas that followed an evicted segment of the same scan go with it,
+        since they cannot be read without it.
+        """
+        usage = self.disk_usage(include_live=False)
+        if usage <= self.max_bytes:
+            return []
+
+        evicted = []
+        with self._lock:
+            self._refresh_index()
+            while self._index and usage > self.max_bytes:
+                victims = [self._index.pop(0)]
+                scan_id = victims[0]['scanId']
+                later = [e for e in self._index if e['scanId'] == scan_id]
+                for entry in later:
+                    if entry.get('base', True):
+                        break
+                    self._index.remove(entry)
+                    victims.append(entry)
+                for entry in victims:
+                    path = self.segment_dir / entry['file']
+                    try:
+                        usage -= path.stat().st_size
+                        path.unlink()
+                    except OSError:
+                        pass
+                    evicted.append(entry['name'])
+            self._save_index()
+
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} capture segments to stay under quota")
+        return evicted
+
+    # Reading segments back
+
+    def raw_segment_path(self, name):
+        """Path of a segment that has not been compressed yet, else None."""
+        with self._lock:
+            self._refresh_index()
+            for entry in self._index:
+                if entry['name'] == name:
+                    return self.segment_dir / entry['file'] if entry['codec'] is None else None
+        return None
+
+    def iter_latest(self, scan_id, suffix='.csv'):
+        """Yield the newest sealed state of a scan file: its last base and later deltas."""
+        chain = []
+        for entry in self.segments(scan_id):
+            if entry['name'].endswith(suffix):
+                chain = [entry] if entry.get('base', True) else chain + [entry]
+        for entry in chain:
+            with self.open_segment(entry['name']) as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def open_segment(self, name):
+        """Open a segment for reading as bytes, decompressing transparently."""
+        entry = self.get_segment(name)
+        if entry is None:
+            raise FileNotFoundError(name)
+
+        path = self.segment_dir / entry['file']
+        if entry['codec'] == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd segments")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        if entry['codec'] == 'gzip':
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_capture_store():
+    """Return the process-wide capture store configured in settings."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from django.conf import settings
+            config = settings.CAPTURE_STORE
+            _store = CaptureStore(
+                root=config['ROOT'],
+                max_bytes=config['MAX_BYTES'],
+                rotate_bytes=config['ROTATE_BYTES'],
+                rotate_seconds=config['ROTATE_SECONDS'],
+                codec=config.get('CODEC', 'zstd'),
+            )
+        return _store
@@ -0,0 +1,136 @@
+
+# Crash-safe checkpoints of live scan state: a snapshot plus an append-only log
+import json
+import os
+import struct
+import zlib
+
+from .shared_state import runtime_path
+
+# Every record is length + CRC32 + zlib-compressed JSON, so a record torn by
+# a crash is detected and dropped instead of poisoning the whole log
+FRAME = struct.Struct('<II')
+
+
+def _encode(obj):
+    payload = zlib.compress(json.dumps(obj, separators=(',', ':')).encode(), 1)
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _frames(data):
+    """Yield ``(end offset, object)`` for each intact frame in ``data``."""
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        length, crc = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield offset, json.loads(zlib.decompress(payload))
+
+
+class ScanCheckpoint:
+    """Checkpoints one scan's records so a restarted backend can resume it.
+
+    Each tick appends its delta to a log. Every ``SNAPSHOT_EVERY`` ticks the
+    full state is written as a new snapshot (atomically) and the log starts
+    over. Loading reads the snapshot and replays the log records that are
+    newer than it.
+    """
+
+    SNAPSHOT_EVERY = 120
+
+    def __init__(self, scan_id):
+        self.scan_id = scan_id
+        self.snapshot_path = runtime_path('checkpoints', f'{scan_id}.snap')
+        self.log_path = runtime_path('checkpoints', f'{scan_id}.log')
+        self._log = None
+        self._since_snapshot = 0
+
+    def load(self):
+        """Return ``(generation, networks, clients)``, or None without a checkpoint."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = next(_frames(f.read()), (0, None))[1]
+        except FileNotFoundError:
+            snapshot = None
+        if snapshot is None:
+            return None
+
+        generation = snapshot['generation']
+        networks = {n['bssid']: n for n in snapshot['networks']}
+        clients = {c['mac']: c for c in snapshot['clients']}
+
+        good = 0
+        try:
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        for good, record in _frames(data):
+            if record['generation'] <= generation:
+                continue
+            generation = record['generation']
+            for network in record['networks']:
+                networks[network['bssid']] = network
+            for bssid in record['removedNetworks']:
+                networks.pop(bssid, None)
+            for client in record['clients']:
+                clients[client['mac']] = client
+            for mac in record['removedClients']:
+                clients.pop(mac, None)
+        if good < len(data):
+            # Drop a record torn by the crash so new ones append cleanly
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(good)
+
+        return generation, list(networks.values()), list(clients.values())
+
+    def record(self, state, delta):
+        """Append one tick's delta; snapshot the whole state now and then."""
+        if self._log is None or self._since_snapshot >= self.SNAPSHOT_EVERY:
+            self.snapshot(state)
+            return
+        self._log.write(_encode({
+            'generation': state.generation,
+            'networks': delta.added_networks + [new for old, new in delta.changed_networks],
+            'removedNetworks': [n['bssid'] for n in delta.removed_networks],
+            'clients': delta.added_clients + [new for old, new in delta.changed_clients],
+            'removedClients': [c['mac'] for c in delta.removed_clients],
+        }))
+        # Flushed to the OS only: survives a process crash, not a power cut
+        self._log.flush()
+        self._since_snapshot += 1
+
+    def snapshot(self, state):
+        with state.lock:
+            data = _encode({
+                'generation': state.generation,
+                'networks': list(state.networks.values()),
+                'clients': list(state.clients.values()),
+            })
+        tmp = f'{self.snapshot_path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # Records up to this generation are in the snapshot now
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, 'wb')
+        self._since_snapshot = 0
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def discard(self):
+        self.close()
+        for path in (self.snapshot_path, self.log_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,51 @@
+
+# Version counters and conditional GET (ETag / Last-Modified) support
+import threading
+import time
+import uuid
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Counters are per process, so the ETag carries a process id to keep two
+# workers that happen to be at the same version from matching each other.
+# Versions shared by all workers pass their own ``tag`` instead.
+_PROCESS_TAG = uuid.uuid4().hex[:8]
+
+
+class VersionCounter:
+    """Monotonic version number with the time of the last bump."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+        self.modified = time.time()
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            self.modified = time.time()
+            return self.value
+
+    def snapshot(self):
+        with self._lock:
+            return self.value, self.modified
+
+
+def conditional_response(request, version, modified, build_response, tag=None):
+    """Answer 304 if the client already holds ``version``, else build the body.
+
+    ``build_response`` is only called when the client's copy is stale, so an
+    unchanged poll costs neither the work nor the bytes.
+    """
+    etag = f'"{tag or _PROCESS_TAG}-{version}"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(modified))
+    if not_modified is not None:
+        return not_modified
+
+    response = build_response()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    # Let browsers keep the body but revalidate on every poll
+    response['Cache-Control'] = 'no-cache'
+    return response
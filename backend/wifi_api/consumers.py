@@ -1,118 +1,129 @@
 
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from asgiref.sync import sync_to_async
-import subprocess
-import re
+from .executor import run_coalesced
+from .filters import ScanFilter
+from .groups import LIFECYCLE_GROUP, OVERVIEW_GROUP, parse_scan_ids, scan_group
+from .interfaces import get_interface_inventory
+from .shared_state import get_scan_registry, read_frame, scan_state_for
+from .wire import BINARY_SUBPROTOCOL, ScanEncoder
+
+# The last ring frame decoded for binary sockets, shared by all of them
+_decoded_frame = (None, None)
 
 class ScanConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        # Add the channel to the scan_updates group
-        await self.channel_layer.group_add(
-            "scan_updates",
-            self.channel_name
-        )
-        await self.accept()
+        # No filter until the client subscribes with one
+        self.scan_filter = None
+        # Groups this socket is in; until it names scans it follows the current one
+        self.groups_joined = set()
+        self.following = True
+
+        # Binary scan updates only if the client asks for them
+        self.encoder = None
+        subprotocol = None
+        if BINARY_SUBPROTOCOL in self.scope.get('subprotocols', ()):
+            self.encoder = ScanEncoder()
+            subprotocol = BINARY_SUBPROTOCOL
+
+        await self.follow_current_scan()
+        await self.accept(subprotocol=subprotocol)
         
         # Send initial interface status on connection
         await self.send_interface_status()
 
     async def disconnect(self, close_code):
-        # Remove the channel from the scan_updates group
-        await self.channel_layer.group_discard(
-            "scan_updates",
-            self.channel_name
-        )
+        await self.set_groups(set())
+
+    async def set_groups(self, groups):
+        for group in self.groups_joined - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in groups - self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.groups_joined = set(groups)
+
+    async def follow_current_scan(self, scan_id=None):
+        if scan_id is None:
+            scan = get_scan_registry().current()
+            scan_id = scan['scanId'] if scan else None
+        groups = {LIFECYCLE_GROUP} | (self.groups_joined & {OVERVIEW_GROUP})
+        if scan_id is not None:
+            groups.add(scan_group(scan_id))
+        await self.set_groups(groups)
 
     # Receive message from WebSocket
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            text_data_json = json.loads(text_data) if text_data is not None else None
+        except ValueError:
+            text_data_json = None
+        if not isinstance(text_data_json, dict):
+            await self.send_error("Invalid message: expected a JSON object")
+            return
         message = text_data_json.get('message')
+
+        scan_ids = text_data_json.get('scanIds')
+        if scan_ids is not None and message in ("subscribe", "unsubscribe"):
+            try:
+                scan_ids = parse_scan_ids(scan_ids)
+            except ValueError as e:
+                await self.send_error(f"Invalid scanIds: {str(e)}")
+                return
         
         if message == "subscribe":
-            # Client is subscribing to updates
-            await self.channel_layer.group_add(
-                "scan_updates",
-                self.channel_name
-            )
+            # Optional filter and field projection for scan updates
+            try:
+                scan_filter = ScanFilter.from_message(text_data_json)
+            except ValueError as e:
+                await self.send_error(f"Invalid subscription filter: {str(e)}")
+                return
+            if self.encoder is not None and scan_filter.fields and 'bssid' not in scan_filter.fields:
+                # Binary records are keyed by BSSID
+                scan_filter.fields += ('bssid',)
+            self.scan_filter = None if scan_filter.is_passthrough else scan_filter
+
+            # Client is subscribing to updates, of the named scans only if given
+            if scan_ids:
+                self.following = False
+                groups = {scan_group(scan_id) for scan_id in scan_ids}
+                await self.set_groups(groups | (self.groups_joined & {OVERVIEW_GROUP}))
+            else:
+                self.following = True
+                await self.follow_current_scan()
             
             # Send current interface status when subscribed
             await self.send_interface_status()
+
+        elif message == "unsubscribe":
+            # Stop receiving updates of the named scans (default: all of them)
+            if scan_ids:
+                leaving = {scan_group(scan_id) for scan_id in scan_ids}
+            else:
+                self.following = False
+                leaving = self.groups_joined - {OVERVIEW_GROUP}
+            await self.set_groups(self.groups_joined - leaving)
+
+        elif message == "subscribe_overview":
+            # Aggregate counts of every running scan
+            await self.set_groups(self.groups_joined | {OVERVIEW_GROUP})
+
+        elif message == "unsubscribe_overview":
+            await self.set_groups(self.groups_joined - {OVERVIEW_GROUP})
         
         elif message == "get_interfaces":
             # Client is requesting interface status
             await self.send_interface_status()
 
-    @sync_to_async
-    def get_interface_status(self):
-        interfaces = []
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({
+            'type': 'error',
+            'message': message
+        }))
+
+    async def get_interface_status(self):
         try:
-            # Get all wireless interfaces with their status
-            proc = subprocess.Popen(['iwconfig'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = proc.communicate()
-            output = out.decode('utf-8')
-            
-            # Parse the output to find interfaces
-            interface_sections = output.split('\n\n')
-            for section in interface_sections:
-                if not section.strip():
-                    continue
-                
-                lines = section.strip().split('\n')
-                if not lines:
-                    continue
-                
-                # Get interface name from the first line
-                interface_line = lines[0]
-                interface_match = re.match(r'^(\w+)', interface_line)
-                if not interface_match:
-                    continue
-                
-                interface_name = interface_match.group(1)
-                
-                # Check if in monitor mode
-                is_monitor = "Mode:Monitor" in section
-                
-                # Get driver and chipset information
-                try:
-                    driver_info = subprocess.check_output(
-                        ['ethtool', '-i', interface_name], 
-                        stderr=subprocess.STDOUT
-                    ).decode('utf-8')
-                    
-                    driver_match = re.search(r'driver:\s*(\S+)', driver_info)
-                    driver = driver_match.group(1) if driver_match else "Unknown"
-                    
-                    # Try to get chipset info from device
-                    try:
-                        pci_info = subprocess.check_output(
-                            ['lspci', '-v'], 
-                            stderr=subprocess.STDOUT
-                        ).decode('utf-8')
-                        
-                        for line in pci_info.split('\n'):
-                            if interface_name in line or driver in line:
-                                chipset = line.strip()
-                                break
-                        else:
-                            chipset = "Unknown"
-                    except:
-                        chipset = "Unknown"
-                        
-                except subprocess.CalledProcessError:
-                    driver = "Unknown"
-                    chipset = "Unknown"
-                
-                # Add interface to list
-                interfaces.append({
-                    'name': interface_name,
-                    'driver': driver,
-                    'chipset': chipset,
-                    'status': "monitor" if is_monitor else "normal",
-                    'phy': ""  # Optional field
-                })
-                
-            return interfaces
+            # Concurrent connects share a single refresh on the command pool
+            return await run_coalesced('interfaces', get_interface_inventory().list)
         except Exception as e:
             print(f"Error getting interface status: {str(e)}")
             return []
@@ -125,16 +136,92 @@ class ScanConsumer(AsyncWebsocketConsumer):
             'interfaces': interfaces
         }))
 
-    # Receive message from scan_updates group
+    # A scan started or stopped
+    async def scan_started(self, event):
+        if self.following:
+            await self.follow_current_scan(event['scanId'])
+        await self.send(text_data=json.dumps({
+            'type': 'scan_started',
+            'scanId': event['scanId']
+        }))
+
+    async def scan_stopped(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'scan_stopped',
+            'scanId': event['scanId']
+        }))
+
+    # Per-tick counts from the overview group
+    async def scan_overview(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'scan_overview',
+            'scanId': event['scanId'],
+            'generation': event['generation'],
+            'networks': event['networks'],
+            'clients': event['clients'],
+            'newAlerts': event['newAlerts']
+        }))
+
+    # Receive message from the scan's group
     async def scan_update(self, event):
-        networks = event['networks']
+        await self.send_networks(event.get('scanId'), event['networks'])
+
+    # A scan update already encoded by the scan's parse worker
+    async def scan_frame(self, event):
+        frame = read_frame(event['scanId'], event['seq'], event['offset'], event['length'])
+        if frame is None:
+            # Overwritten before this socket got to it; the next tick follows
+            return
+        if self.scan_filter is None and self.encoder is None:
+            await self.send(text_data=frame.decode())
+        else:
+            await self.send_networks(event['scanId'], self.frame_networks(event, frame))
+
+    @staticmethod
+    def frame_networks(event, frame):
+        global _decoded_frame
+        key = (event['scanId'], event['seq'])
+        if _decoded_frame[0] != key:
+            _decoded_frame = (key, json.loads(frame)['networks'])
+        return _decoded_frame[1]
+
+    async def send_networks(self, scan_id, networks):
+        if self.scan_filter is not None:
+            # Answer from the live indexes, or this worker's mirror of them
+            state = scan_state_for(scan_id)
+            if state is not None:
+                networks = self.scan_filter.select(state)
+            else:
+                networks = [n for n in networks if self.scan_filter.matches(n)]
+            networks = self.scan_filter.project(networks)
+
+        if self.encoder is not None:
+            await self.send(bytes_data=self.encoder.encode(scan_id, networks))
+            return
         
         # Send message to WebSocket
         await self.send(text_data=json.dumps({
             'type': 'scan_update',
+            'scanId': scan_id,
             'networks': networks
         }))
         
+    # Per-channel aggregates published alongside scan updates
+    async def channel_update(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'channel_update',
+            'scanId': event['scanId'],
+            'summary': event['summary']
+        }))
+        
+    # Suspected rogue / evil-twin APs raised by the detection rules
+    async def rogue_alert(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'rogue_alert',
+            'scanId': event['scanId'],
+            'alerts': event['alerts']
+        }))
+        
     # Interface status update handler
     async def interface_update(self, event):
         interfaces = event['interfaces']
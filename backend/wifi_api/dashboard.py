@@ -0,0 +1,104 @@
+
+# Dashboard aggregates over a scan's live records
+#
+# Each aggregate takes the networks and clients of one tick plus normalized
+# parameters and returns a JSON-ready dict. They scan every record, which is
+# why the view memoizes them per scan generation (see memo.py).
+from .aggregates import band_for_channel, encryption_class
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def _in_band(network, band):
+    return band is None or band_for_channel(network['channel']) == band
+
+
+def encryption_counts(networks, clients, band=None, limit=None):
+    counts = {}
+    for network in networks:
+        if _in_band(network, band):
+            key = encryption_class(network['encryption'])
+            counts[key] = counts.get(key, 0) + 1
+    return {"encryption": counts, "total": sum(counts.values())}
+
+
+def _smoothed_signal(network):
+    # None until the smoother has had a reading for the network
+    smoothed = network.get('smoothedSignal')
+    return network['signal'] if smoothed is None else smoothed
+
+
+def strongest_networks(networks, clients, band=None, limit=DEFAULT_LIMIT):
+    ranked = sorted(
+        (n for n in networks if _in_band(n, band)),
+        key=_smoothed_signal,
+        reverse=True,
+    )
+    return {"networks": [
+        {
+            "bssid": network['bssid'],
+            "ssid": network['ssid'],
+            "channel": network['channel'],
+            "signal": network['signal'],
+            "smoothedSignal": _smoothed_signal(network),
+        }
+        for network in ranked[:limit]
+    ]}
+
+
+def busiest_channels(networks, clients, band=None, limit=DEFAULT_LIMIT):
+    channel_of = {}
+    channels = {}
+    for network in networks:
+        if not _in_band(network, band):
+            continue
+        channel_of[network['bssid']] = network['channel']
+        entry = channels.setdefault(network['channel'], {"aps": 0, "stations": 0})
+        entry["aps"] += 1
+    for client in clients:
+        channel = channel_of.get(client['bssid'])
+        if channel is not None:
+            channels[channel]["stations"] += 1
+    ranked = sorted(channels.items(), key=lambda item: (item[1]["aps"] + item[1]["stations"], -item[0]),
+                    reverse=True)
+    return {"channels": [
+        dict(entry, channel=channel, band=band_for_channel(channel))
+        for channel, entry in ranked[:limit]
+    ]}
+
+
+def clients_per_ap(networks, clients, band=None, limit=DEFAULT_LIMIT):
+    by_bssid = {n['bssid']: n for n in networks if _in_band(n, band)}
+    counts = {}
+    for client in clients:
+        if client['bssid'] in by_bssid:
+            counts[client['bssid']] = counts.get(client['bssid'], 0) + 1
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "associated": sum(counts.values()),
+        "unassociated": sum(1 for c in clients if c['bssid'].startswith('(not')),
+        "networks": [
+            {
+                "bssid": bssid,
+                "ssid": by_bssid[bssid]['ssid'],
+                "channel": by_bssid[bssid]['channel'],
+                "clients": count,
+            }
+            for bssid, count in ranked[:limit]
+        ],
+    }
+
+
+AGGREGATES = {
+    'encryption': encryption_counts,
+    'strongest': strongest_networks,
+    'channels': busiest_channels,
+    'clients-per-ap': clients_per_ap,
+}
+
+
+def snapshot(state):
+    """The state's generation and record lists, read together."""
+    with state.lock:
+        return state.generation, list(state.networks.values()), list(state.clients.values())
@@ -0,0 +1,208 @@
+
+# Streaming rogue / evil-twin AP detection over live scan deltas
+import time
+
+from .aggregates import encryption_class
+from .models import RogueAlert
+
+# Higher is stronger; anything unrecognised ranks with WPA
+ENCRYPTION_RANK = {'OPN': 0, 'WEP': 1, 'WPA': 2, 'WPA2': 3, 'WPA3': 4}
+
+SEVERITY_HIGH = 'high'
+SEVERITY_MEDIUM = 'medium'
+SEVERITY_LOW = 'low'
+
+
+def _rank(network):
+    return ENCRYPTION_RANK.get(encryption_class(network['encryption']), ENCRYPTION_RANK['WPA'])
+
+
+def _oui(bssid):
+    return bssid.upper()[:8]
+
+
+def _sibling(bssid, other):
+    # Multi-BSSID APs derive their extra BSSIDs from the radio's address,
+    # changing the first octet (locally administered bit, index bits) and/or
+    # the last one; the four octets in between stay the same
+    return bssid.upper()[3:14] == other.upper()[3:14]
+
+
+class RogueDetector:
+    """Runs the detection rules on each tick's delta.
+
+    Networks are indexed by SSID, so every rule only looks at the APs that
+    changed this tick and at the other BSSIDs advertising the same SSID.
+    Cost follows churn rather than the total number of APs in range. Each
+    (rule, BSSID) pair alerts at most once per scan.
+
+    Rules:
+      * ``encryption_downgrade``: a BSSID advertises an SSID that an
+        earlier-seen BSSID protects with stronger encryption (a classic evil
+        twin), or an AP weakens its own encryption mid-scan.
+      * ``vendor_mismatch``: a new BSSID for an SSID whose OUI matches none of
+        the SSID's earlier BSSIDs and that is not derived from one of them
+        (multi-BSSID APs give their extra SSIDs locally administered
+        addresses next to the radio's own).
+      * ``beacon_anomaly``: a BSSID's beacon count jumps far above its own
+        running rate, as when two radios beacon with the same BSSID.
+    """
+
+    # Ticks of history before a BSSID's beacon rate is trusted
+    BEACON_WARMUP = 5
+    # Jump over the running rate that counts as anomalous
+    BEACON_FACTOR = 3.0
+    # Ignore jumps smaller than this (roughly two seconds of beaconing)
+    BEACON_MIN_JUMP = 20
+    # Weight of the newest tick in the running rate
+    BEACON_ALPHA = 0.2
+
+    def __init__(self):
+        self.by_ssid = {}       # ssid -> {bssid: network}
+        self._beacons = {}      # bssid -> (running rate, ticks seen)
+        self._raised = set()    # (rule, bssid) already alerted
+
+    def mark_raised(self, pairs):
+        """Treat these ``(rule, bssid)`` pairs as already alerted."""
+        self._raised.update(tuple(pair) for pair in pairs)
+
+    def seed(self, networks, raised=()):
+        """Index ``networks`` without running the rules, as after a restart."""
+        self.by_ssid = {}
+        for network in networks:
+            self._index(network)
+        self.mark_raised(raised)
+
+    def apply(self, delta):
+        """Update the indexes from ``delta`` and return any new alerts."""
+        for network in delta.removed_networks:
+            self._unindex(network)
+            self._beacons.pop(network['bssid'], None)
+        for old, new in delta.changed_networks:
+            if old['ssid'] != new['ssid']:
+                self._unindex(old)
+            self._index(new)
+        for network in delta.added_networks:
+            self._index(network)
+
+        # Rules run after the whole tick is indexed, so APs that appear in
+        # the same snapshot are compared with each other too
+        alerts = []
+        for network in delta.added_networks:
+            alerts.extend(self._check_ssid(network))
+        for old, new in delta.changed_networks:
+            if old['ssid'] != new['ssid']:
+                alerts.extend(self._check_ssid(new))
+            elif _rank(new) < _rank(old):
+                alerts.extend(self._raise(
+                    'encryption_downgrade', SEVERITY_HIGH, new,
+                    f"{new['bssid']} dropped from {old['encryption'] or 'OPN'} "
+                    f"to {new['encryption'] or 'OPN'}",
+                    {'previous': old['encryption'], 'current': new['encryption']},
+                ))
+            alerts.extend(self._check_beacons(old, new))
+        return alerts
+
+    def _index(self, network):
+        if network['ssid']:
+            self.by_ssid.setdefault(network['ssid'], {})[network['bssid']] = network
+
+    def _unindex(self, network):
+        bssids = self.by_ssid.get(network['ssid'])
+        if bssids is not None:
+            bssids.pop(network['bssid'], None)
+            if not bssids:
+                del self.by_ssid[network['ssid']]
+
+    def _check_ssid(self, network):
+        if not network['ssid']:
+            return []
+        others = [
+            other for bssid, other in self.by_ssid.get(network['ssid'], {}).items()
+            if bssid != network['bssid']
+        ]
+        alerts = []
+
+        established = [o for o in others if o['firstSeen'] <= network['firstSeen']]
+        if established:
+            strongest = max(established, key=_rank)
+            if _rank(network) < _rank(strongest):
+                alerts.extend(self._raise(
+                    'encryption_downgrade', SEVERITY_HIGH, network,
+                    f"\"{network['ssid']}\" seen from {network['bssid']} with "
+                    f"{network['encryption'] or 'OPN'}, weaker than {strongest['bssid']} "
+                    f"({strongest['encryption'] or 'OPN'})",
+                    {'reference': strongest['bssid'], 'referenceEncryption': strongest['encryption']},
+                ))
+
+        earlier = [o for o in others if o['firstSeen'] < network['firstSeen']]
+        if earlier:
+            ouis = {_oui(o['bssid']) for o in earlier}
+            conflict = _oui(network['bssid']) not in ouis and not any(
+                _sibling(network['bssid'], o['bssid']) for o in earlier
+            )
+            if conflict:
+                alerts.extend(self._raise(
+                    'vendor_mismatch', SEVERITY_MEDIUM, network,
+                    f"\"{network['ssid']}\" seen from {network['bssid']}, whose OUI "
+                    f"matches none of its other BSSIDs ({', '.join(sorted(ouis))})",
+                    {'oui': _oui(network['bssid']), 'expectedOuis': sorted(ouis)},
+                ))
+        return alerts
+
+    def _check_beacons(self, old, new):
+        if 'beacons' not in new or 'beacons' not in old:
+            return []
+        jump = new['beacons'] - old['beacons']
+        if jump < 0:
+            # Counter restarted, e.g. a new capture file; start over
+            self._beacons.pop(new['bssid'], None)
+            return []
+
+        rate, ticks = self._beacons.get(new['bssid'], (float(jump), 0))
+        alerts = []
+        if (ticks >= self.BEACON_WARMUP and jump >= self.BEACON_MIN_JUMP
+                and jump > rate * self.BEACON_FACTOR):
+            alerts = self._raise(
+                'beacon_anomaly', SEVERITY_LOW, new,
+                f"{new['bssid']} sent {jump} beacons in one tick, usually about {rate:.0f}",
+                {'beacons': jump, 'usual': round(rate, 1)},
+            )
+        rate += self.BEACON_ALPHA * (jump - rate)
+        self._beacons[new['bssid']] = (rate, ticks + 1)
+        return alerts
+
+    def _raise(self, rule, severity, network, message, details):
+        if (rule, network['bssid']) in self._raised:
+            return []
+        self._raised.add((rule, network['bssid']))
+        return [{
+            'rule': rule,
+            'severity': severity,
+            'ssid': network['ssid'],
+            'bssid': network['bssid'],
+            'channel': network['channel'],
+            'message': message,
+            'details': details,
+            'timestamp': int(time.time()),
+        }]
+
+
+def record_alerts(session, alerts):
+    """Persist alerts for ``session`` and return them with their ids."""
+    rows = RogueAlert.objects.bulk_create([
+        RogueAlert(
+            session=session,
+            rule=alert['rule'],
+            severity=alert['severity'],
+            ssid=alert['ssid'],
+            bssid=alert['bssid'],
+            channel=alert['channel'],
+            message=alert['message'],
+            details=alert['details'],
+        )
+        for alert in alerts
+    ])
+    for alert, row in zip(alerts, rows):
+        alert['id'] = row.pk
+    return alerts
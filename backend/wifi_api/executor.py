@@ -0,0 +1,72 @@
+
+# Dedicated thread pool for blocking system commands issued from async code
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# (event loop, key) -> future of the call currently running for that key
+_in_flight = {}
+
+
+def get_command_executor():
+    """Return the shared command pool, created on first use.
+
+    ``sync_to_async`` is thread-sensitive by default, so every iwconfig/ethtool
+    call from every socket would queue on Django's single main thread. This
+    pool is separate from it and sized by ``COMMAND_EXECUTOR_WORKERS``.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.COMMAND_EXECUTOR_WORKERS,
+                thread_name_prefix='wifi-command',
+            )
+        return _executor
+
+
+def shutdown_command_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def run_command(func, *args, **kwargs):
+    """Run a blocking call on the command pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_command_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_coalesced(key, func, *args, **kwargs):
+    """Like ``run_command``, but concurrent callers with the same key share one call.
+
+    A burst of N sockets connecting at page load triggers a single inventory
+    refresh; the other N-1 just await its result.
+    """
+    loop = asyncio.get_running_loop()
+    flight = (loop, key)
+    future = _in_flight.get(flight)
+    if future is None:
+        future = loop.create_task(run_command(func, *args, **kwargs))
+        _in_flight[flight] = future
+
+        def done(finished):
+            if _in_flight.get(flight) is finished:
+                del _in_flight[flight]
+            # Keep asyncio quiet if every waiter went away before it failed
+            if not finished.cancelled():
+                finished.exception()
+
+        future.add_done_callback(done)
+    # A disconnecting socket must not cancel the call the others are waiting on
+    return await asyncio.shield(future)
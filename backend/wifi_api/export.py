@@ -0,0 +1,158 @@
+
+# Columnar export of scan sessions to Parquet / Arrow IPC
+import io
+from datetime import datetime, timezone as dt_timezone
+
+from .models import Client, Network
+from .observations import get_observation_store
+
+# pyarrow is optional and slow to import, so it is loaded on first export
+pa = None
+pq = None
+
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+}
+
+# table name -> (model, exported columns); samples come from the observation store
+EXPORT_TABLES = {
+    'networks': (Network, (
+        'bssid', 'ssid', 'channel', 'encryption', 'vendor',
+        'max_signal', 'clients', 'first_seen', 'last_seen',
+    )),
+    'clients': (Client, (
+        'mac', 'bssid', 'probes', 'vendor', 'max_power', 'frames',
+        'first_seen', 'last_seen',
+    )),
+    'samples': (None, (
+        'mac', 'kind', 'timestamp', 'signal',
+    )),
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def _load_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportUnavailable("pyarrow is required for columnar exports")
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def _schema(table):
+    timestamp = pa.timestamp('us', tz='UTC')
+    return {
+        'networks': pa.schema([
+            ('bssid', pa.string()), ('ssid', pa.string()), ('channel', pa.int16()),
+            ('encryption', pa.string()), ('vendor', pa.string()),
+            ('max_signal', pa.int16()), ('clients', pa.int32()),
+            ('first_seen', timestamp), ('last_seen', timestamp),
+        ]),
+        'clients': pa.schema([
+            ('mac', pa.string()), ('bssid', pa.string()), ('probes', pa.list_(pa.string())),
+            ('vendor', pa.string()), ('max_power', pa.int16()), ('frames', pa.int64()),
+            ('first_seen', timestamp), ('last_seen', timestamp),
+        ]),
+        'samples': pa.schema([
+            ('mac', pa.string()), ('kind', pa.dictionary(pa.int8(), pa.string())),
+            ('timestamp', timestamp), ('signal', pa.int16()),
+        ]),
+    }[table]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each batch."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _record_batches(session, table, chunk_rows):
+    model, columns = EXPORT_TABLES[table]
+    schema = _schema(table)
+    if model is None:
+        rows = (
+            (mac, kind, datetime.fromtimestamp(ts, tz=dt_timezone.utc), signal)
+            for mac, kind, ts, signal in get_observation_store().iter_samples(session.pk)
+        )
+    else:
+        rows = (
+            model.objects.filter(session=session)
+            .order_by('pk')
+            .values_list(*columns)
+            .iterator(chunk_size=chunk_rows)
+        )
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield _to_batch(batch, columns, schema)
+            batch = []
+    if batch:
+        yield _to_batch(batch, columns, schema)
+
+
+def _to_batch(rows, columns, schema):
+    arrays = [list(values) for values in zip(*rows)]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=schema.field(name).type) for name, values in zip(columns, arrays)],
+        schema=schema,
+    )
+
+
+def iter_export(session, table, fmt='parquet', chunk_rows=50000):
+    """Yield the encoded bytes of one session table, one row group at a time.
+
+    Only a single chunk of rows is materialized at once, so memory is bounded
+    by ``chunk_rows`` regardless of how long the survey ran.
+    """
+    _load_pyarrow()
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}")
+
+    schema = _schema(table)
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    for batch in _record_batches(session, table, chunk_rows):
+        write(batch)
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
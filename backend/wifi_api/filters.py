@@ -0,0 +1,198 @@
+# Server-side subscription filters for the scan WebSocket
+import fnmatch
+import re
+
+from .aggregates import band_for_channel, encryption_class
+
+# An SSID pattern without these is a plain substring, otherwise a glob
+GLOB_SPECIALS = re.compile(r'[*?\[\]]')
+# SSIDs are at most 32 bytes; anything much longer cannot match
+MAX_SSID_PATTERN = 64
+
+NETWORK_FIELDS = (
+    'id', 'ssid', 'bssid', 'channel', 'signal', 'dbm', 'encryption',
+    'vendor', 'clients', 'beacons', 'firstSeen', 'lastSeen',
+    'smoothedDbm', 'smoothedSignal', 'trend', 'motion',
+)
+
+
+class FilterIndex:
+    """Secondary indexes over live networks: channel and encryption class."""
+
+    def __init__(self):
+        self.by_channel = {}
+        self.by_encryption = {}
+
+    def apply(self, delta):
+        for network in delta.added_networks:
+            self._add(network)
+        for old, new in delta.changed_networks:
+            if old['channel'] != new['channel'] or old['encryption'] != new['encryption']:
+                self._remove(old)
+                self._add(new)
+        for network in delta.removed_networks:
+            self._remove(network)
+
+    def _add(self, network):
+        self.by_channel.setdefault(network['channel'], set()).add(network['bssid'])
+        self.by_encryption.setdefault(
+            encryption_class(network['encryption']), set()
+        ).add(network['bssid'])
+
+    def _remove(self, network):
+        for index, key in ((self.by_channel, network['channel']),
+                           (self.by_encryption, encryption_class(network['encryption']))):
+            bssids = index.get(key)
+            if bssids is not None:
+                bssids.discard(network['bssid'])
+                if not bssids:
+                    del index[key]
+
+
+def _string_list(value, name):
+    if value is not None and (not isinstance(value, list) or not all(isinstance(v, str) for v in value)):
+        raise ValueError(f"{name} must be a list of strings")
+    return value
+
+
+class ScanFilter:
+    """What a socket wants to see: a network filter plus a field projection.
+
+    Channels, bands, encryption and BSSIDs are answered from indexes; the
+    signal threshold and SSID pattern are then checked on the survivors.
+    The SSID pattern is a case-insensitive substring, or a glob (``*``,
+    ``?``, ``[...]``) matched against the whole SSID. It is never a regex,
+    since patterns come from any client and run on every tick.
+    """
+
+    def __init__(self, channels=None, bands=None, encryption=None, min_signal=None,
+                 bssids=None, ssid_pattern=None, fields=None):
+        self.channels = set(channels) if channels else None
+        self.bands = set(bands) if bands else None
+        self.encryption = {e.upper() for e in encryption} if encryption else None
+        self.min_signal = min_signal
+        self.bssids = {b.upper() for b in bssids} if bssids else None
+        self.ssid_pattern = ssid_pattern or None
+        self._ssid_match = self._compile_ssid_pattern(ssid_pattern) if ssid_pattern else None
+        self.fields = tuple(fields) if fields else None
+
+    @staticmethod
+    def _compile_ssid_pattern(pattern):
+        if not isinstance(pattern, str):
+            raise ValueError("ssidPattern must be a string")
+        if len(pattern) > MAX_SSID_PATTERN:
+            raise ValueError(f"ssidPattern is longer than {MAX_SSID_PATTERN} characters")
+        if GLOB_SPECIALS.search(pattern):
+            return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+        folded = pattern.lower()
+        return lambda ssid: folded in ssid.lower()
+
+    def _ssid_literal(self):
+        # The longest run of plain characters, which every match contains
+        if '[' in self.ssid_pattern or ']' in self.ssid_pattern:
+            return ''
+        return max(re.split(r'[*?]', self.ssid_pattern), key=len)
+
+    @classmethod
+    def from_message(cls, data):
+        """Build a filter from a ``subscribe`` message; raises ValueError."""
+        spec = data.get('filter') or {}
+        if not isinstance(spec, dict):
+            raise ValueError("filter must be an object")
+        fields = _string_list(data.get('fields'), 'fields')
+        if fields is not None:
+            unknown = set(fields) - set(NETWORK_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        try:
+            min_signal = spec.get('minSignal')
+            channels = spec.get('channels') or []
+            if not isinstance(channels, list):
+                raise ValueError("channels must be a list")
+            return cls(
+                channels=[int(c) for c in channels],
+                bands=_string_list(spec.get('bands'), 'bands'),
+                encryption=_string_list(spec.get('encryption'), 'encryption'),
+                min_signal=int(min_signal) if min_signal is not None else None,
+                bssids=_string_list(spec.get('bssids'), 'bssids'),
+                ssid_pattern=spec.get('ssidPattern'),
+                fields=fields,
+            )
+        except (TypeError, re.error) as e:
+            raise ValueError(str(e))
+
+    @property
+    def is_passthrough(self):
+        return not any((
+            self.channels, self.bands, self.encryption, self.bssids,
+            self.ssid_pattern, self.fields, self.min_signal is not None,
+        ))
+
+    def matches(self, network):
+        """Plain predicate, used when no indexed state is available."""
+        if self.channels and network['channel'] not in self.channels:
+            return False
+        if self.bands and band_for_channel(network['channel']) not in self.bands:
+            return False
+        if self.encryption and encryption_class(network['encryption']) not in self.encryption:
+            return False
+        if self.bssids and network['bssid'].upper() not in self.bssids:
+            return False
+        return self._residual(network)
+
+    def _residual(self, network):
+        if self.min_signal is not None and network['signal'] < self.min_signal:
+            return False
+        if self._ssid_match and not self._ssid_match(network['ssid']):
+            return False
+        return True
+
+    def _candidates(self, state):
+        # Each indexed criterion narrows the candidate set; None means "all"
+        candidates = None
+
+        def narrow(bssids):
+            nonlocal candidates
+            candidates = set(bssids) if candidates is None else candidates & bssids
+
+        if self.channels or self.bands:
+            bssids = set()
+            for channel, members in state.filter_index.by_channel.items():
+                if self.channels and channel not in self.channels:
+                    continue
+                if self.bands and band_for_channel(channel) not in self.bands:
+                    continue
+                bssids |= members
+            narrow(bssids)
+        if self.encryption:
+            bssids = set()
+            for cls in self.encryption:
+                bssids |= state.filter_index.by_encryption.get(cls, set())
+            narrow(bssids)
+        if self.bssids:
+            # Live BSSIDs are keyed upper case, as airodump-ng writes them
+            narrow({b for b in self.bssids if b in state.networks})
+        literal = self._ssid_literal() if self.ssid_pattern else ''
+        if literal:
+            bssids = set()
+            for members in state.search.ssids_containing(literal).values():
+                bssids |= members
+            narrow(bssids)
+        return candidates
+
+    def select(self, state):
+        """Return matching networks from a LiveScanState, strongest first."""
+        with state.lock:
+            candidates = self._candidates(state)
+            if candidates is None:
+                records = list(state.networks.values())
+            else:
+                records = [state.networks[b] for b in candidates if b in state.networks]
+            records = [r for r in records if self._residual(r)]
+        records.sort(key=lambda r: -r['signal'])
+        return records
+
+    def project(self, records):
+        if not self.fields:
+            return records
+        return [{field: record[field] for field in self.fields} for record in records]
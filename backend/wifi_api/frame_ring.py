@@ -0,0 +1,103 @@
+
+# Shared-memory ring buffer of pre-encoded WebSocket frames
+import mmap
+import os
+import struct
+
+# magic, capacity, head (total bytes ever written), reserved (end of the
+# write in progress)
+RING_HEADER = struct.Struct('<4sQQQ')
+RING_MAGIC = b'WFR2'
+# sequence number, payload length
+RECORD_HEADER = struct.Struct('<QI')
+
+
+class FrameRing:
+    """Single-writer ring of byte frames in an mmap-backed file.
+
+    The writer appends frames and announces ``(seq, offset, length)`` through
+    the channel layer; any process on the host can then copy the frame out.
+    Offsets only grow, so a reader can tell that the writer has lapped a
+    frame it was too slow to copy and drop it rather than send torn data.
+    Like a seqlock, the writer announces how far it is about to write before
+    copying and moves the head once done, and a reader checks the reserved
+    end after its copy, so a frame overwritten mid-copy is caught even
+    before the head moves.
+    """
+
+    def __init__(self, path, capacity=None):
+        self.path = path
+        if capacity is not None:
+            # A fresh file is swapped in, never truncated under a reader's mapping
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w+b') as f:
+                f.truncate(RING_HEADER.size + capacity)
+                self._map = mmap.mmap(f.fileno(), 0)
+                self._inode = os.fstat(f.fileno()).st_ino
+            RING_HEADER.pack_into(self._map, 0, RING_MAGIC, capacity, 0, 0)
+            os.replace(tmp, path)
+            self._seq = 0
+        else:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._inode = os.fstat(f.fileno()).st_ino
+        magic, self.capacity, _, _ = RING_HEADER.unpack_from(self._map, 0)
+        if magic != RING_MAGIC:
+            raise ValueError(f"{path} is not a frame ring")
+
+    def _head(self):
+        return RING_HEADER.unpack_from(self._map, 0)[2]
+
+    def _reserved(self):
+        return RING_HEADER.unpack_from(self._map, 0)[3]
+
+    def _copy_in(self, position, data):
+        start = RING_HEADER.size + position % self.capacity
+        first = min(len(data), RING_HEADER.size + self.capacity - start)
+        self._map[start:start + first] = data[:first]
+        if first < len(data):
+            self._map[RING_HEADER.size:RING_HEADER.size + len(data) - first] = data[first:]
+
+    def _copy_out(self, position, length):
+        start = RING_HEADER.size + position % self.capacity
+        first = min(length, RING_HEADER.size + self.capacity - start)
+        data = self._map[start:start + first]
+        if first < length:
+            data += self._map[RING_HEADER.size:RING_HEADER.size + length - first]
+        return data
+
+    def fits(self, payload):
+        # Leave room so a reader has at least a few ticks to copy a frame
+        return RECORD_HEADER.size + len(payload) <= self.capacity // 4
+
+    def write(self, payload):
+        """Append a frame; return ``(seq, offset, length)`` for readers."""
+        self._seq += 1
+        offset = self._head()
+        end = offset + RECORD_HEADER.size + len(payload)
+        RING_HEADER.pack_into(self._map, 0, RING_MAGIC, self.capacity, offset, end)
+        self._copy_in(offset, RECORD_HEADER.pack(self._seq, len(payload)) + payload)
+        RING_HEADER.pack_into(self._map, 0, RING_MAGIC, self.capacity, end, end)
+        return self._seq, offset, len(payload)
+
+    def read(self, seq, offset, length):
+        """Return the frame's bytes, or None if it has been overwritten."""
+        record = self._copy_out(offset, RECORD_HEADER.size + length)
+        # Checked after copying: if the writer has reached a full lap past
+        # the frame, even with a write still in progress, the copy may be torn
+        if self._reserved() - offset > self.capacity:
+            return None
+        stored_seq, stored_length = RECORD_HEADER.unpack_from(record, 0)
+        if stored_seq != seq or stored_length != length:
+            return None
+        return record[RECORD_HEADER.size:]
+
+    def replaced(self):
+        """True once a new writer has swapped in another file at ``path``."""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,41 @@
+
+# Channel layer groups that scan events are published to
+#
+# Every scan has its own group, so a tick is only delivered to the sockets
+# watching that scan. Aggregate counts for all scans go to the overview group,
+# and scan start/stop notices to the lifecycle group, which sockets following
+# "the current scan" use to move to a new scan's group.
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+OVERVIEW_GROUP = 'scan_overview'
+LIFECYCLE_GROUP = 'scan_lifecycle'
+
+# Scan ids end up in group names, which the channel layer limits to ASCII
+# letters, digits, '-', '_' and '.', shorter than 100 characters
+SCAN_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+# Scans one socket may name in a message
+MAX_SCAN_IDS = 32
+
+
+def scan_group(scan_id):
+    return f'scan_{scan_id}'
+
+
+def parse_scan_ids(value):
+    """Validate a message's ``scanIds``: a list of scan ids; raises ValueError."""
+    if not isinstance(value, list):
+        raise ValueError("scanIds must be a list")
+    if len(value) > MAX_SCAN_IDS:
+        raise ValueError(f"At most {MAX_SCAN_IDS} scanIds")
+    for scan_id in value:
+        if not isinstance(scan_id, str) or not SCAN_ID_RE.match(scan_id):
+            raise ValueError(f"Invalid scan id: {str(scan_id)[:64]!r}")
+    return value
+
+
+def publish(group, event):
+    """Send ``event`` to ``group`` from synchronous code."""
+    async_to_sync(get_channel_layer().group_send)(group, event)
@@ -0,0 +1,177 @@
+
+# History store: merges parsed scan records into the database
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+from .models import Client, Network
+from .observations import get_observation_store
+
+
+def _to_datetime(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds or 0, tz=dt_timezone.utc)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def merge_observations(session, networks, clients, batch_size=500):
+    """Merge parsed networks and clients into a session's history.
+
+    Records are matched by BSSID/MAC: existing rows are widened (first/last
+    seen, strongest signal, probe list) and a signal sample is appended only
+    when a record's ``lastSeen`` moved forward, so re-merging the same data is
+    a no-op. Everything happens in one transaction with batched queries.
+    Returns the number of rows written.
+    """
+    written = 0
+    with transaction.atomic():
+        for batch in _chunks(networks, batch_size):
+            written += _merge_networks(session, batch)
+        for batch in _chunks(clients, batch_size):
+            written += _merge_clients(session, batch)
+    return written
+
+
+def ingest_stream(session, records, batch_size=500):
+    """Merge a stream of ``(kind, record)`` pairs in fixed-size batches.
+
+    Only one batch is held in memory at a time, so arbitrarily large capture
+    files can be loaded. ``('packets', {channel: count})`` pairs are summed
+    rather than stored. Returns ``(rows written, packets per channel)``.
+    """
+    written = 0
+    channel_packets = {}
+    networks, clients = [], []
+
+    with transaction.atomic():
+        for kind, record in records:
+            if kind == 'network':
+                networks.append(record)
+            elif kind == 'client':
+                clients.append(record)
+            else:
+                # A network's packet total already includes its clients
+                for channel, packets in record.items():
+                    channel_packets[channel] = channel_packets.get(channel, 0) + packets
+
+            if len(networks) >= batch_size:
+                written += _merge_networks(session, networks)
+                networks = []
+            if len(clients) >= batch_size:
+                written += _merge_clients(session, clients)
+                clients = []
+
+        if networks:
+            written += _merge_networks(session, networks)
+        if clients:
+            written += _merge_clients(session, clients)
+
+    return written, channel_packets
+
+
+def _merge_networks(session, records):
+    # The last record wins if a BSSID appears twice in one batch
+    records = {r['bssid']: r for r in records if r.get('bssid')}
+    existing = {
+        n.bssid: n for n in Network.objects.filter(session=session, bssid__in=list(records))
+    }
+
+    created, updated, samples = [], [], []
+    for bssid, record in records.items():
+        first_seen = _to_datetime(record['firstSeen'])
+        last_seen = _to_datetime(record['lastSeen'])
+        network = existing.get(bssid)
+
+        if network is None:
+            created.append(Network(
+                session=session,
+                bssid=bssid,
+                ssid=record['ssid'],
+                channel=record['channel'],
+                encryption=record['encryption'],
+                vendor=record['vendor'],
+                max_signal=record['signal'],
+                clients=record['clients'],
+                first_seen=first_seen,
+                last_seen=last_seen,
+            ))
+        elif last_seen > network.last_seen or first_seen < network.first_seen:
+            network.first_seen = min(network.first_seen, first_seen)
+            if last_seen > network.last_seen:
+                network.last_seen = last_seen
+                network.ssid = record['ssid'] or network.ssid
+                network.channel = record['channel'] or network.channel
+                network.encryption = record['encryption'] or network.encryption
+                network.clients = record['clients']
+            network.max_signal = max(network.max_signal, record['signal'])
+            updated.append(network)
+        else:
+            continue
+
+        samples.append((
+            str(session.pk), bssid, 'network', int(record['lastSeen'] or 0),
+            record['signal'], record.get('beacons', 0),
+        ))
+
+    Network.objects.bulk_create(created)
+    Network.objects.bulk_update(
+        updated,
+        ['ssid', 'channel', 'encryption', 'max_signal', 'clients', 'first_seen', 'last_seen'],
+    )
+    get_observation_store().add_samples(samples)
+    return len(created) + len(updated) + len(samples)
+
+
+def _merge_clients(session, records):
+    records = {r['mac']: r for r in records if r.get('mac')}
+    existing = {
+        c.mac: c for c in Client.objects.filter(session=session, mac__in=list(records))
+    }
+
+    created, updated, samples = [], [], []
+    for mac, record in records.items():
+        first_seen = _to_datetime(record['firstSeen'])
+        last_seen = _to_datetime(record['lastSeen'])
+        client = existing.get(mac)
+
+        if client is None:
+            created.append(Client(
+                session=session,
+                mac=mac,
+                bssid=record['bssid'],
+                probes=list(record.get('probe', [])),
+                vendor=record.get('vendor', ''),
+                max_power=record['power'],
+                frames=record['frames'],
+                first_seen=first_seen,
+                last_seen=last_seen,
+            ))
+        elif last_seen > client.last_seen or first_seen < client.first_seen:
+            client.first_seen = min(client.first_seen, first_seen)
+            if last_seen > client.last_seen:
+                client.last_seen = last_seen
+                client.bssid = record['bssid']
+            client.frames = max(client.frames, record['frames'])
+            client.max_power = max(client.max_power, record['power'])
+            client.probes = client.probes + [
+                p for p in record.get('probe', []) if p not in client.probes
+            ]
+            updated.append(client)
+        else:
+            continue
+
+        samples.append((
+            str(session.pk), mac, 'client', int(record['lastSeen'] or 0),
+            record['power'], record['frames'],
+        ))
+
+    Client.objects.bulk_create(created)
+    Client.objects.bulk_update(
+        updated,
+        ['bssid', 'probes', 'max_power', 'frames', 'first_seen', 'last_seen'],
+    )
+    get_observation_store().add_samples(samples)
+    return len(created) + len(updated) + len(samples)
@@ -0,0 +1,241 @@
+# Adaptive channel hopping: dwell time follows where new devices show up
+#
+# airodump-ng's own hopper gives every channel the same dwell, so a radio
+# spends most of its time listening to empty channels. Here the hop cycle is
+# split by each channel's recent discovery rate (new APs and stations per
+# second of dwell), with a floor so quiet channels are still visited.
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .iface_control import InterfaceControlError, InterfaceController, NetlinkBackend, get_interface_controller
+
+logger = logging.getLogger(__name__)
+
+
+class HoppingScheduler:
+    """Decides how long each channel gets in one hop cycle.
+
+    The hopper reports dwell with ``record_dwell()`` and the scan runner
+    reports what was found with ``record_discoveries()``; ``rebalance()``
+    folds both into per-channel rates and recomputes ``plan``.
+    """
+
+    # Pseudo-discoveries per channel, so one lucky or unlucky visit does not
+    # decide a channel's share on its own
+    PRIOR = 0.5
+
+    def __init__(self, channels, cycle_seconds, min_dwell, decay=0.5):
+        if min_dwell * len(channels) > cycle_seconds:
+            raise ValueError("cycle_seconds is too short for min_dwell on every channel")
+        self.channels = list(channels)
+        self.cycle_seconds = cycle_seconds
+        self.min_dwell = min_dwell
+        self.decay = decay
+        self.rates = dict.fromkeys(self.channels, 0.0)
+        self._dwell = dict.fromkeys(self.channels, 0.0)
+        self._found = dict.fromkeys(self.channels, 0.0)
+        self._lock = threading.Lock()
+        self.plan = self._split()
+
+    def record_dwell(self, channel, seconds):
+        with self._lock:
+            if channel in self._dwell:
+                self._dwell[channel] += seconds
+
+    def drop(self, channel):
+        """Stop visiting ``channel``, e.g. because the radio refuses it."""
+        with self._lock:
+            if channel not in self.rates:
+                return
+            self.channels.remove(channel)
+            for values in (self.rates, self._dwell, self._found):
+                del values[channel]
+            self.plan = self._split()
+
+    def record_discoveries(self, counts):
+        with self._lock:
+            for channel, count in counts.items():
+                if channel in self._found:
+                    self._found[channel] += count
+
+    def _split(self):
+        spare = self.cycle_seconds - self.min_dwell * len(self.channels)
+        total = sum(self.rates.values())
+        plan = []
+        for channel in self.channels:
+            share = self.rates[channel] / total if total else 1 / len(self.channels)
+            plan.append((channel, self.min_dwell + spare * share))
+        return plan
+
+    def rebalance(self):
+        """Update rates from what happened since the last call; return the new plan."""
+        with self._lock:
+            for channel in self.channels:
+                dwell = self._dwell[channel]
+                if dwell <= 0:
+                    # Not visited: keep the old estimate
+                    continue
+                observed = (self._found[channel] + self.PRIOR) / (dwell + self.PRIOR)
+                self.rates[channel] = self.decay * self.rates[channel] + (1 - self.decay) * observed
+                self._dwell[channel] = 0.0
+                self._found[channel] = 0.0
+            self.plan = self._split()
+            return self.plan
+
+    def summary(self):
+        with self._lock:
+            return [
+                {'channel': channel, 'dwell': round(dwell, 3), 'rate': round(self.rates[channel], 3)}
+                for channel, dwell in self.plan
+            ]
+
+
+def discoveries_by_channel(delta, networks, dwell):
+    """Attribute a tick's new APs and stations to channels.
+
+    APs carry their channel and associated stations inherit their AP's.
+    Unassociated stations are only heard probing, so they are split over the
+    channels by the time the radio spent on each (``dwell``) since the
+    previous tick.
+    """
+    counts = {}
+    for network in delta.added_networks:
+        counts[network['channel']] = counts.get(network['channel'], 0) + 1
+    unassociated = 0
+    for client in delta.added_clients:
+        network = networks.get(client['bssid'])
+        if network is not None:
+            counts[network['channel']] = counts.get(network['channel'], 0) + 1
+        else:
+            unassociated += 1
+    total = sum(dwell.values())
+    if unassociated and total:
+        for channel, seconds in dwell.items():
+            counts[channel] = counts.get(channel, 0) + unassociated * seconds / total
+    return counts
+
+
+class ChannelHopper:
+    """Walks the scheduler's plan on one interface in a background thread.
+
+    A channel that cannot be set is dropped from the plan, and the thread
+    ends once no channel is left. ``on_stop`` runs once the thread has
+    finished.
+    """
+
+    def __init__(self, scheduler, set_channel, rebalance_seconds, on_stop=None):
+        self.scheduler = scheduler
+        self._set_channel = set_channel
+        self.rebalance_seconds = rebalance_seconds
+        self._on_stop = on_stop
+        self._stop = threading.Event()
+        self._thread = None
+        # Dwell since the scan runner last asked, for attributing discoveries
+        self._recent = {}
+        self._recent_lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='channel-hopper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        elif self._on_stop is not None:
+            self._on_stop()
+
+    def take_recent_dwell(self):
+        with self._recent_lock:
+            recent, self._recent = self._recent, {}
+        return recent
+
+    def _run(self):
+        try:
+            self._hop()
+        finally:
+            if self._on_stop is not None:
+                self._on_stop()
+
+    def _hop(self):
+        rebalanced_at = time.monotonic()
+        while not self._stop.is_set():
+            if not self.scheduler.plan:
+                # Every channel failed, e.g. the interface went away
+                logger.warning("No channel left to hop to, channel hopping stopped")
+                return
+            for channel, dwell in self.scheduler.plan:
+                try:
+                    self._set_channel(channel)
+                except Exception as e:
+                    logger.warning("Could not hop to channel %s, dropping it: %s", channel, e)
+                    self.scheduler.drop(channel)
+                    continue
+                started = time.monotonic()
+                if self._stop.wait(dwell):
+                    return
+                spent = time.monotonic() - started
+                self.scheduler.record_dwell(channel, spent)
+                with self._recent_lock:
+                    self._recent[channel] = self._recent.get(channel, 0) + spent
+            if time.monotonic() - rebalanced_at >= self.rebalance_seconds:
+                self.scheduler.rebalance()
+                rebalanced_at = time.monotonic()
+
+
+def make_scheduler(channels=None):
+    config = settings.CHANNEL_HOPPING
+    return HoppingScheduler(
+        channels or config['CHANNELS'],
+        config['CYCLE_SECONDS'],
+        config['MIN_DWELL_SECONDS'],
+    )
+
+
+def adaptive_hopping_enabled():
+    """True if scans should hop with ``ChannelHopper`` rather than airodump-ng.
+
+    Hopping several times a second needs in-process netlink, so the sudo
+    helper and the ``ip``/``iw`` fallback keep airodump-ng's own hopper.
+    """
+    if settings.CHANNEL_HOPPING['MODE'] != 'adaptive':
+        return False
+    controller = get_interface_controller()
+    return isinstance(controller, InterfaceController) and isinstance(controller.backend, NetlinkBackend)
+
+
+def start_hopper(interface, backend=None):
+    """Hop ``interface`` over the configured channels its radio supports.
+
+    The hopper sets channels on a netlink backend of its own (``backend``,
+    mostly for tests), without the controller's lock or a state query per
+    hop. Returns None if none of the channels can be used.
+    """
+    if backend is None:
+        backend = NetlinkBackend()
+    channels = settings.CHANNEL_HOPPING['CHANNELS']
+    try:
+        allowed = set(backend.channels(interface))
+    except InterfaceControlError as e:
+        logger.warning("Could not list the channels of %s, hopping all of them: %s", interface, e)
+    else:
+        unsupported = [channel for channel in channels if channel not in allowed]
+        if unsupported:
+            logger.info("%s does not support channels %s", interface, unsupported)
+        channels = [channel for channel in channels if channel in allowed]
+    if not channels:
+        logger.warning("None of the hopping channels are supported by %s", interface)
+        backend.close()
+        return None
+
+    hopper = ChannelHopper(
+        make_scheduler(channels),
+        lambda channel: backend.set_channel(interface, channel),
+        settings.CHANNEL_HOPPING['REBALANCE_SECONDS'],
+        on_stop=backend.close,
+    )
+    hopper.start()
+    return hopper
@@ -0,0 +1,401 @@
+
+# Interface mode and link state changes over nl80211/rtnetlink
+#
+# Switching a card between managed and monitor mode used to take three sudo
+# shell-outs plus an iwconfig call to check the result. The controller here
+# does down/set type/up in one go through a backend, and reports the state the
+# kernel ends up in. Without root, the same controller runs once per request
+# inside a small privileged helper: a root-owned copy of ``iface_helper``
+# installed by ``manage.py install_iface_helper``.
+import json
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# nl80211 interface types (include/uapi/linux/nl80211.h)
+IFTYPES = {
+    'managed': 2,
+    'monitor': 6,
+}
+IFTYPE_NAMES = {value: name for name, value in IFTYPES.items()}
+IFF_UP = 0x1
+# Most adapters are slow to reconfigure (firmware reloads), so a batch
+# touches this many of them at once
+CONFIGURE_WORKERS = 8
+# Where install_iface_helper puts the helper by default
+HELPER_PATH = '/usr/local/sbin/wifi-iface-helper'
+
+
+class InterfaceControlError(Exception):
+    pass
+
+
+def channel_frequency(channel):
+    if channel == 14:
+        return 2484
+    if 1 <= channel <= 13:
+        return 2407 + 5 * channel
+    if 32 <= channel <= 177:
+        return 5000 + 5 * channel
+    raise InterfaceControlError(f"Unsupported channel: {channel}")
+
+
+def frequency_channel(frequency):
+    if frequency == 2484:
+        return 14
+    if 2412 <= frequency <= 2472:
+        return (frequency - 2407) // 5
+    if 5160 <= frequency <= 5885:
+        return (frequency - 5000) // 5
+    return None
+
+
+def phy_channels(phy):
+    """Channels ``phy`` supports in the current regulatory domain.
+
+    Parsed from ``iw phy PHY info``; channels marked disabled are left out.
+    """
+    try:
+        info = subprocess.check_output(['iw', 'phy', phy, 'info'], stderr=subprocess.STDOUT).decode('utf-8')
+    except FileNotFoundError:
+        raise InterfaceControlError("iw is not installed")
+    except subprocess.CalledProcessError as e:
+        raise InterfaceControlError(e.output.decode('utf-8').strip() or str(e))
+    return [
+        int(channel) for channel, flags in re.findall(r'^\s*\* [\d.]+ MHz \[(\d+)\](.*)$', info, re.M)
+        if 'disabled' not in flags
+    ]
+
+
+class NetlinkBackend:
+    """Talks nl80211 and rtnetlink in-process through pyroute2.
+
+    Needs CAP_NET_ADMIN for changes; reading state works unprivileged.
+    """
+
+    def __init__(self):
+        from pyroute2 import IPRoute, IW
+        self._ipr = IPRoute()
+        self._iw = IW()
+
+    def _index(self, name):
+        indexes = self._ipr.link_lookup(ifname=name)
+        if not indexes:
+            raise InterfaceControlError(f"No such interface: {name}")
+        return indexes[0]
+
+    def state(self, name):
+        index = self._index(name)
+        link = self._ipr.link('get', index=index)[0]
+        info = self._iw.get_interface_by_ifindex(index)
+        if not info:
+            raise InterfaceControlError(f"{name} is not a wireless interface")
+        iftype = info[0].get_attr('NL80211_ATTR_IFTYPE')
+        frequency = info[0].get_attr('NL80211_ATTR_WIPHY_FREQ')
+        return {
+            'name': name,
+            'mode': IFTYPE_NAMES.get(iftype, 'other'),
+            'up': bool(link['flags'] & IFF_UP),
+            'phy': f"phy{info[0].get_attr('NL80211_ATTR_WIPHY')}",
+            'channel': frequency_channel(frequency) if frequency else None,
+        }
+
+    def set_link(self, name, up):
+        try:
+            self._ipr.link('set', index=self._index(name), state='up' if up else 'down')
+        except OSError as e:
+            raise InterfaceControlError(f"Could not bring {name} {'up' if up else 'down'}: {e}")
+
+    def _request(self, command, attrs):
+        from pyroute2.netlink import NLM_F_ACK, NLM_F_REQUEST
+        from pyroute2.netlink.nl80211 import NL80211_NAMES, nl80211cmd
+
+        msg = nl80211cmd()
+        msg['cmd'] = NL80211_NAMES[command]
+        msg['attrs'] = attrs
+        self._iw.nlm_request(msg, msg_type=self._iw.prid, msg_flags=NLM_F_REQUEST | NLM_F_ACK)
+
+    def set_mode(self, name, mode):
+        try:
+            self._request('NL80211_CMD_SET_INTERFACE', [
+                ['NL80211_ATTR_IFINDEX', self._index(name)],
+                ['NL80211_ATTR_IFTYPE', IFTYPES[mode]],
+            ])
+        except OSError as e:
+            raise InterfaceControlError(f"Could not set {name} to {mode} mode: {e}")
+
+    def set_channel(self, name, channel):
+        try:
+            self._request('NL80211_CMD_SET_WIPHY', [
+                ['NL80211_ATTR_IFINDEX', self._index(name)],
+                ['NL80211_ATTR_WIPHY_FREQ', channel_frequency(channel)],
+            ])
+        except OSError as e:
+            raise InterfaceControlError(f"Could not set {name} to channel {channel}: {e}")
+
+    def channels(self, name):
+        return phy_channels(self.state(name)['phy'])
+
+    def close(self):
+        self._iw.close()
+        self._ipr.close()
+
+
+class IpCommandBackend:
+    """Fallback for when pyroute2 is not installed: ``ip`` and ``iw``.
+
+    Still only used from an already privileged process, so no sudo per call.
+    """
+
+    def _run(self, command):
+        try:
+            return subprocess.check_output(command, stderr=subprocess.STDOUT).decode('utf-8')
+        except FileNotFoundError:
+            raise InterfaceControlError(f"{command[0]} is not installed")
+        except subprocess.CalledProcessError as e:
+            raise InterfaceControlError(e.output.decode('utf-8').strip() or str(e))
+
+    def state(self, name):
+        link = self._run(['ip', '-o', 'link', 'show', 'dev', name])
+        flags = re.search(r'<([^>]*)>', link)
+        info = self._run(['iw', 'dev', name, 'info'])
+        iftype = re.search(r'\btype (\S+)', info)
+        phy = re.search(r'\bwiphy (\d+)', info)
+        channel = re.search(r'\bchannel (\d+)', info)
+        return {
+            'name': name,
+            'mode': iftype.group(1) if iftype and iftype.group(1) in IFTYPES else 'other',
+            'up': bool(flags) and 'UP' in flags.group(1).split(','),
+            'phy': f"phy{phy.group(1)}" if phy else "",
+            'channel': int(channel.group(1)) if channel else None,
+        }
+
+    def set_link(self, name, up):
+        self._run(['ip', 'link', 'set', 'dev', name, 'up' if up else 'down'])
+
+    def set_mode(self, name, mode):
+        self._run(['iw', 'dev', name, 'set', 'type', mode])
+
+    def set_channel(self, name, channel):
+        self._run(['iw', 'dev', name, 'set', 'channel', str(channel)])
+
+    def channels(self, name):
+        return phy_channels(self.state(name)['phy'])
+
+    def close(self):
+        pass
+
+
+class FakeNetlinkBackend:
+    """In-memory interfaces for development and tests.
+
+    Behaves like most drivers: the type of an interface that is up cannot
+    change. Every call is appended to ``calls``; names in ``fail`` raise.
+    An interface supports the channels in its ``channels`` entry, 1-13 by
+    default.
+    """
+
+    def __init__(self, interfaces=None):
+        if interfaces is None:
+            interfaces = {'wlan0': {'mode': 'managed', 'up': True, 'phy': 'phy0', 'channel': None}}
+        self.interfaces = {name: dict(state) for name, state in interfaces.items()}
+        self.calls = []
+        self.fail = set()
+
+    def _get(self, name):
+        if name in self.fail:
+            raise InterfaceControlError(f"Injected failure on {name}")
+        if name not in self.interfaces:
+            raise InterfaceControlError(f"No such interface: {name}")
+        return self.interfaces[name]
+
+    def state(self, name):
+        return dict(self._get(name), name=name)
+
+    def set_link(self, name, up):
+        self.calls.append(('set_link', name, up))
+        self._get(name)['up'] = up
+
+    def set_mode(self, name, mode):
+        self.calls.append(('set_mode', name, mode))
+        interface = self._get(name)
+        if interface['up']:
+            raise InterfaceControlError(f"Could not set {name} to {mode} mode: Device or resource busy")
+        interface['mode'] = mode
+
+    def set_channel(self, name, channel):
+        self.calls.append(('set_channel', name, channel))
+        channel_frequency(channel)
+        interface = self._get(name)
+        if channel not in self.channels(name):
+            raise InterfaceControlError(f"Could not set {name} to channel {channel}: Invalid argument")
+        interface['channel'] = channel
+
+    def channels(self, name):
+        return list(self._get(name).get('channels', range(1, 14)))
+
+    def close(self):
+        pass
+
+
+def local_backend():
+    try:
+        return NetlinkBackend()
+    except ImportError:
+        return IpCommandBackend()
+
+
+class InterfaceController:
+    """Changes interface modes and channels and reports the result.
+
+    ``backend_factory`` returns a backend. Netlink sockets are not safe to
+    share between threads, so single changes go through one shared backend
+    and each change in a batch gets a backend of its own.
+    """
+
+    def __init__(self, backend_factory):
+        self._factory = backend_factory
+        self.backend = backend_factory()
+        self._lock = threading.Lock()
+        # Two requests must not interleave down/set/up on the same interface
+        self._interface_locks = {}
+        self._interface_locks_lock = threading.Lock()
+
+    def _interface_lock(self, name):
+        with self._interface_locks_lock:
+            return self._interface_locks.setdefault(name, threading.Lock())
+
+    def state(self, name):
+        with self._lock:
+            return self.backend.state(name)
+
+    def _configure(self, backend, name, mode, channel):
+        if mode not in IFTYPES:
+            raise InterfaceControlError(f"Unsupported mode: {mode}")
+        with self._interface_lock(name):
+            current = backend.state(name)
+            changed = False
+            if current['mode'] != mode or not current['up']:
+                backend.set_link(name, False)
+                try:
+                    backend.set_mode(name, mode)
+                finally:
+                    # Never leave the card down, even if the type change failed
+                    backend.set_link(name, True)
+                changed = True
+                current = backend.state(name)
+            if channel is not None and current['channel'] != channel:
+                backend.set_channel(name, channel)
+                changed = True
+                current = backend.state(name)
+            return dict(current, changed=changed)
+
+    def configure(self, name, mode, channel=None):
+        """Put ``name`` in ``mode`` (and on ``channel``) with its link up.
+
+        Returns the resulting state, with ``changed`` False if the interface
+        was already there and nothing was touched.
+        """
+        with self._lock:
+            return self._configure(self.backend, name, mode, channel)
+
+    def set_mode(self, name, mode):
+        return self.configure(name, mode)
+
+    def configure_many(self, changes):
+        """Apply ``[(name, mode, channel), ...]`` concurrently.
+
+        Returns, in order, a state dict or ``{'name', 'error'}`` per change.
+        """
+        def apply(change):
+            backend = self._factory()
+            try:
+                return self._configure(backend, *change)
+            except InterfaceControlError as e:
+                return {'name': change[0], 'error': str(e)}
+            finally:
+                backend.close()
+
+        if len(changes) <= 1:
+            return [apply(change) for change in changes]
+        workers = min(len(changes), CONFIGURE_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='iface-config') as pool:
+            return list(pool.map(apply, changes))
+
+
+class HelperController:
+    """Runs ``InterfaceController`` in the privileged helper, once per request.
+
+    One ``sudo -n`` spawn covers any number of interfaces, configured
+    concurrently inside the helper. ``path`` is the root-owned helper
+    script, which is all the sudoers rule grants, e.g.
+    ``user ALL=(root) NOPASSWD: /usr/local/sbin/wifi-iface-helper``. Nothing
+    from the (user-writable) checkout runs as root.
+    """
+
+    TIMEOUT = 15
+
+    def __init__(self, path=HELPER_PATH):
+        self.path = path
+
+    def _run(self, args):
+        command = ['sudo', '-n', self.path] + args
+        try:
+            out = subprocess.run(command, capture_output=True, timeout=self.TIMEOUT)
+        except FileNotFoundError:
+            raise InterfaceControlError("sudo is not installed")
+        except subprocess.TimeoutExpired:
+            raise InterfaceControlError("Interface helper timed out")
+        try:
+            result = json.loads(out.stdout)
+        except ValueError:
+            raise InterfaceControlError(out.stderr.decode('utf-8').strip() or "Interface helper failed")
+        if isinstance(result, dict) and 'error' in result:
+            raise InterfaceControlError(result['error'])
+        return result
+
+    def state(self, name):
+        return self._run(['state', name])
+
+    def configure(self, name, mode, channel=None):
+        result = self.configure_many([(name, mode, channel)])[0]
+        if 'error' in result:
+            raise InterfaceControlError(result['error'])
+        return result
+
+    def set_mode(self, name, mode):
+        return self.configure(name, mode)
+
+    def configure_many(self, changes):
+        args = []
+        for name, mode, channel in changes:
+            args.append(f"{name}={mode}" if channel is None else f"{name}={mode}:{channel}")
+        return self._run(['configure'] + args)
+
+
+def make_controller(kind='auto', helper_path=HELPER_PATH):
+    """Build a controller: ``auto``, ``netlink``, ``helper`` or ``fake``."""
+    if kind == 'fake':
+        fake = FakeNetlinkBackend()
+        return InterfaceController(lambda: fake)
+    if kind == 'helper' or (kind == 'auto' and os.geteuid() != 0):
+        return HelperController(helper_path)
+    return InterfaceController(local_backend)
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_interface_controller():
+    global _controller
+    from django.conf import settings
+
+    with _controller_lock:
+        if _controller is None:
+            _controller = make_controller(
+                settings.INTERFACE_CONTROL_BACKEND, settings.INTERFACE_HELPER_PATH
+            )
+        return _controller
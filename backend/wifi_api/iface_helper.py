@@ -0,0 +1,80 @@
+
+# Privileged helper: applies interface mode changes and prints the result
+#
+#   wifi-iface-helper configure wlan0=monitor[:CHANNEL] [wlan1=managed ...]
+#   wifi-iface-helper state wlan0
+#
+# Output is JSON on stdout; {"error": ...} with exit status 1 on failure.
+#
+# It runs as root through sudo, so it is never run from the checkout:
+# ``install`` copies this module and iface_control (which only needs the
+# standard library and optionally pyroute2) into a root-owned directory and
+# writes a script that runs them with an isolated interpreter.
+import json
+import os
+import shutil
+import sys
+
+from .iface_control import InterfaceControlError, InterfaceController, local_backend
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] not in ('configure', 'state'):
+        print(json.dumps({'error': "usage: iface_helper configure NAME=MODE[:CHANNEL]... | state NAME"}))
+        return 1
+
+    try:
+        controller = InterfaceController(local_backend)
+        if argv[0] == 'state':
+            result = controller.state(argv[1])
+        else:
+            changes = []
+            for change in argv[1:]:
+                name, _, target = change.partition('=')
+                mode, _, channel = target.partition(':')
+                changes.append((name, mode, int(channel) if channel else None))
+            result = controller.configure_many(changes)
+    except (InterfaceControlError, ValueError) as e:
+        print(json.dumps({'error': str(e)}))
+        return 1
+
+    print(json.dumps(result))
+    return 0
+
+
+SCRIPT = """#!{python} -I
+# Installed by manage.py install_iface_helper; runs as root through sudo
+import sys
+sys.path.insert(0, {library!r})
+from wifi_iface_helper.iface_helper import main
+sys.exit(main(sys.argv[1:]))
+"""
+
+
+def install(path, library, python):
+    """Install the helper script at ``path`` and its modules under ``library``."""
+    package = os.path.join(library, 'wifi_iface_helper')
+    os.makedirs(package, mode=0o755, exist_ok=True)
+    source = os.path.dirname(os.path.abspath(__file__))
+    for name in ('__init__.py', 'iface_control.py', 'iface_helper.py'):
+        target = os.path.join(package, name)
+        if name == '__init__.py':
+            open(target, 'w').close()
+        else:
+            shutil.copyfile(os.path.join(source, name), target)
+        os.chown(target, 0, 0)
+        os.chmod(target, 0o644)
+    for directory in (package, library):
+        os.chown(directory, 0, 0)
+        os.chmod(directory, 0o755)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(SCRIPT.format(python=python, library=library))
+    os.chown(tmp_path, 0, 0)
+    os.chmod(tmp_path, 0o755)
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,141 @@
+
+# Wireless interface inventory shared by the REST views and the WebSocket consumer
+import re
+import subprocess
+import threading
+import time
+
+from .conditional import VersionCounter
+
+
+class InterfaceInventory:
+    """Cached view of the wireless interfaces on this machine.
+
+    ``lspci -v`` is by far the slowest command involved and its output only
+    changes when hardware does, so it is kept for ``PCI_TTL`` seconds. The
+    interface list itself is cheap to rebuild and is kept for ``max_age``
+    seconds, or until ``invalidate()`` is called after a mode change.
+    """
+
+    PCI_TTL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes refreshes so threads arriving mid-refresh reuse its result
+        self._refresh_lock = threading.Lock()
+        self._interfaces = None
+        self._refreshed_at = 0
+        self._pci_info = None
+        self._pci_at = 0
+        # Bumped only when a refresh finds something different
+        self.version = VersionCounter()
+
+    def _pci_listing(self):
+        now = time.monotonic()
+        if self._pci_info is None or now - self._pci_at > self.PCI_TTL:
+            try:
+                self._pci_info = subprocess.check_output(
+                    ['lspci', '-v'],
+                    stderr=subprocess.STDOUT
+                ).decode('utf-8')
+            except Exception:
+                self._pci_info = ""
+            self._pci_at = now
+        return self._pci_info
+
+    def refresh(self):
+        """Rebuild the interface list from iwconfig/ethtool/lspci."""
+        interfaces = []
+
+        # First, get all wireless interfaces
+        proc = subprocess.Popen(['iwconfig'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        output = out.decode('utf-8')
+
+        # Parse the output to find interfaces
+        for section in output.split('\n\n'):
+            if not section.strip():
+                continue
+
+            # Get interface name from the first line
+            interface_match = re.match(r'^(\w+)', section.strip())
+            if not interface_match:
+                continue
+
+            interface_name = interface_match.group(1)
+
+            # Check if in monitor mode
+            is_monitor = "Mode:Monitor" in section
+
+            # Get driver and chipset information
+            try:
+                driver_info = subprocess.check_output(
+                    ['ethtool', '-i', interface_name],
+                    stderr=subprocess.STDOUT
+                ).decode('utf-8')
+
+                driver_match = re.search(r'driver:\s*(\S+)', driver_info)
+                driver = driver_match.group(1) if driver_match else "Unknown"
+
+                # Try to get chipset info from device
+                chipset = "Unknown"
+                for line in self._pci_listing().split('\n'):
+                    if interface_name in line or driver in line:
+                        chipset = line.strip()
+                        break
+            except subprocess.CalledProcessError:
+                driver = "Unknown"
+                chipset = "Unknown"
+
+            interfaces.append({
+                'name': interface_name,
+                'driver': driver,
+                'chipset': chipset,
+                'status': "monitor" if is_monitor else "normal",
+                'phy': ""  # Optional field
+            })
+
+        with self._lock:
+            if interfaces != self._interfaces:
+                self.version.bump()
+            self._interfaces = interfaces
+            self._refreshed_at = time.monotonic()
+        return interfaces
+
+    def _cached(self, max_age):
+        with self._lock:
+            if self._interfaces is not None and time.monotonic() - self._refreshed_at <= max_age:
+                return self._interfaces
+        return None
+
+    def list(self, max_age=2.0):
+        """Return the cached interface list, refreshing it if too old."""
+        interfaces = self._cached(max_age)
+        if interfaces is not None:
+            return interfaces
+        with self._refresh_lock:
+            # Someone else may have refreshed while we waited
+            interfaces = self._cached(max_age)
+            if interfaces is not None:
+                return interfaces
+            return self.refresh()
+
+    def snapshot(self, max_age=2.0):
+        """Return ``(interfaces, version, modified)``, refreshing if too old."""
+        self.list(max_age)
+        # Read list and version together so the ETag always matches the body
+        with self._lock:
+            version, modified = self.version.snapshot()
+            return self._interfaces, version, modified
+
+    def invalidate(self):
+        """Force the next ``list()`` to re-query the system."""
+        with self._lock:
+            self._refreshed_at = 0
+
+
+_inventory = InterfaceInventory()
+
+
+def get_interface_inventory():
+    return _inventory
@@ -0,0 +1,56 @@
+
+# ASGI lifespan handling: warms caches in the background at server startup
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Pay one-off startup costs before the first request does."""
+    started = time.perf_counter()
+    try:
+        # Importing the URLconf pulls in the views and everything they use
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+
+        from .interfaces import get_interface_inventory
+        get_interface_inventory().refresh()
+
+        # Keep the history rollups current while the server runs
+        from django.conf import settings
+        from .observations import get_observation_store
+        get_observation_store().start_compactor(settings.HISTORY_STORE['COMPACT_SECONDS'])
+
+        # Pick up a scan that was running when the backend went down, or
+        # whose owner dies later
+        from .scan_runner import start_scan_watcher
+        start_scan_watcher()
+    except Exception as e:
+        logger.error(f"Startup warm-up failed: {e}")
+        return
+    finally:
+        from django.db import connection
+        connection.close()
+    logger.info(f"Startup warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
+class LifespanApp:
+    """Answers ASGI lifespan events.
+
+    Startup completes immediately; the warm-up runs on a daemon thread so the
+    server starts accepting connections without waiting for subprocesses.
+    """
+
+    async def __call__(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                threading.Thread(target=warm_up, daemon=True).start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                from .executor import shutdown_command_executor
+                shutdown_command_executor()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
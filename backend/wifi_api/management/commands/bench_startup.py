@@ -0,0 +1,96 @@
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so every measurement is a true cold start
+CHILD_SCRIPT = r'''
+import asyncio, json, os, sys, time
+
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wifi_framework.settings')
+from wifi_framework.asgi import application
+timings = {'import': time.perf_counter() - started}
+
+async def lifespan_startup():
+    queue = asyncio.Queue()
+    done = asyncio.Event()
+    async def send(message):
+        if message['type'] == 'lifespan.startup.complete':
+            done.set()
+    await queue.put({'type': 'lifespan.startup'})
+    asyncio.ensure_future(application({'type': 'lifespan'}, queue.get, send))
+    await done.wait()
+
+async def get(path):
+    body_sent = False
+    status = []
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.sleep(3600)
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 5000),
+    }
+    await application(scope, receive, send)
+    return status[0] if status else None
+
+async def main(warm_wait):
+    t = time.perf_counter()
+    await lifespan_startup()
+    timings['lifespan'] = time.perf_counter() - t
+    await asyncio.sleep(warm_wait)
+    for name, path in (('status', '/api/status/'), ('interfaces', '/api/interfaces/')):
+        t = time.perf_counter()
+        await get(path)
+        timings[name] = time.perf_counter() - t
+
+asyncio.run(main(float(sys.argv[1])))
+timings['total'] = time.perf_counter() - started
+print(json.dumps(timings))
+'''
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time of the ASGI application and its first requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--warm-wait', type=float, default=0.0,
+                            help="Seconds to wait after lifespan startup before the first "
+                                 "request, to see the effect of the background warm-up")
+
+    def handle(self, *args, **options):
+        results = []
+        for run in range(options['runs']):
+            out = subprocess.run(
+                [sys.executable, '-c', CHILD_SCRIPT, str(options['warm_wait'])],
+                cwd=settings.BASE_DIR,
+                env=dict(os.environ),
+                capture_output=True,
+                text=True,
+            )
+            if out.returncode != 0:
+                self.stderr.write(out.stderr)
+                return
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'phase':<12}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+        for phase in ('import', 'lifespan', 'status', 'interfaces', 'total'):
+            values = [r[phase] * 1000 for r in results]
+            self.stdout.write(
+                f"{phase:<12}{min(values):>10.1f}{statistics.median(values):>12.1f}{max(values):>10.1f}"
+            )
@@ -0,0 +1,149 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from wifi_api.frame_ring import FrameRing
+
+
+def _write_csv(path, networks, clients, seed):
+    rng = random.Random(seed)
+    seen = time.strftime('%Y-%m-%d %H:%M:%S')
+    lines = ['', 'BSSID, First time seen, Last time seen, channel, Speed, Privacy, Cipher, '
+                 'Authentication, Power, # beacons, # IV, LAN IP, ID-length, ESSID, Key']
+    for i in range(networks):
+        lines.append(
+            f"02:00:{i >> 16 & 255:02X}:{i >> 8 & 255:02X}:{i & 255:02X}:01, {seen}, {seen}, "
+            f"{rng.choice((1, 6, 11, 36, 149))}, 54, WPA2, CCMP, PSK, {-rng.randint(30, 90)}, "
+            f"{rng.randint(0, 9999)}, 0, 0.0.0.0, 6, net{i}, "
+        )
+    lines += ['', 'Station MAC, First time seen, Last time seen, Power, # packets, BSSID, Probed ESSIDs']
+    for i in range(clients):
+        lines.append(
+            f"06:00:{i >> 16 & 255:02X}:{i >> 8 & 255:02X}:{i & 255:02X}:02, {seen}, {seen}, "
+            f"{-rng.randint(30, 90)}, {rng.randint(0, 999)}, (not associated) ,probe{i % 50}"
+        )
+    with open(path, 'w', newline='') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+
+
+def _tick_loop(settings_module, csv_files, ring_path, tick_seconds, stop, frames):
+    """The scan runner's per-tick work, minus the database and channel layer."""
+    if settings_module is not None:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+        import django
+        django.setup()
+    import json
+
+    from wifi_api.parsers import parse_airodump_csv
+    from wifi_api.scan_state import LiveScanState
+
+    state = LiveScanState('bench')
+    ring = FrameRing(ring_path, settings.SCAN_FRAME_RING_BYTES)
+    tick = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        networks, clients = parse_airodump_csv(csv_files[tick % len(csv_files)])
+        state.update(networks, clients)
+        frame = json.dumps({'type': 'scan_update', 'networks': networks}).encode()
+        frames.put(ring.write(frame))
+        tick += 1
+        stop.wait(max(0, tick_seconds - (time.perf_counter() - started)))
+    ring.close()
+
+
+async def _serve(frames, ring_path, interval, seconds):
+    """Stand-in for a worker serving sockets: copy out frames, time the loop."""
+    reader = None
+    lateness = []
+    sent = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lateness.append(time.perf_counter() - expected)
+        while True:
+            try:
+                location = frames.get_nowait()
+            except queue.Empty:
+                break
+            if reader is None or reader.replaced():
+                reader = FrameRing(ring_path)
+            frame = reader.read(*location)
+            if frame is not None:
+                frame.decode()
+                sent += 1
+    return lateness, sent
+
+
+class Command(BaseCommand):
+    help = "Compare event-loop jitter with the scan tick loop in a thread vs a worker process"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--networks', type=int, default=5000)
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--tick-ms', type=float, default=1000.0,
+                            help="Scan tick interval (the runner uses 1s)")
+        parser.add_argument('--interval-ms', type=float, default=5.0,
+                            help="How often the event loop wakes up")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='tick-jitter-')
+        csv_files = []
+        for seed in range(2):
+            # Two variants so every tick has changes to diff and publish
+            path = os.path.join(workdir, f'scan{seed}.csv')
+            _write_csv(path, options['networks'], options['clients'], seed)
+            csv_files.append(path)
+        ring_path = os.path.join(workdir, 'bench.ring')
+        interval = options['interval_ms'] / 1000
+        tick_seconds = options['tick_ms'] / 1000
+
+        self.stdout.write(
+            f"{options['networks']} networks, {options['clients']} clients, "
+            f"{options['seconds']:.0f}s, tick {options['tick_ms']:.0f} ms, "
+            f"loop wake-up {options['interval_ms']:.0f} ms"
+        )
+        self.stdout.write(f"{'mode':<10}{'frames':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+        for mode in ('thread', 'process'):
+            if mode == 'thread':
+                stop = threading.Event()
+                frames = queue.Queue()
+                runner = threading.Thread(
+                    target=_tick_loop,
+                    args=(None, csv_files, ring_path, tick_seconds, stop, frames),
+                )
+            else:
+                context = multiprocessing.get_context('spawn')
+                stop = context.Event()
+                frames = context.Queue()
+                runner = context.Process(
+                    target=_tick_loop,
+                    args=(settings.SETTINGS_MODULE, csv_files, ring_path, tick_seconds, stop, frames),
+                )
+            runner.start()
+            # Let the runner get through start-up before measuring
+            frames.get(timeout=60)
+            lateness, sent = asyncio.run(_serve(frames, ring_path, interval, options['seconds']))
+            stop.set()
+            runner.join()
+
+            lateness = sorted(value * 1000 for value in lateness)
+            self.stdout.write(
+                f"{mode:<10}{sent:>8}{statistics.median(lateness):>10.2f}"
+                f"{lateness[int(len(lateness) * 0.99)]:>10.2f}{lateness[-1]:>10.2f}"
+            )
+
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
@@ -0,0 +1,42 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wifi_api.observations import get_observation_store
+
+
+class Command(BaseCommand):
+    help = "Roll raw signal samples up into 1-minute/1-hour buckets and drop old day partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop-older-than', type=int, metavar='DAYS',
+                            help="Drop partitions older than this many days "
+                                 "(default: HISTORY_STORE['RETENTION_DAYS'])")
+        parser.add_argument('--list', action='store_true', help="List partitions and exit")
+
+    def handle(self, *args, **options):
+        store = get_observation_store()
+
+        if options['list']:
+            for day, path in store.partitions().items():
+                self.stdout.write(f"{day}  {os.path.getsize(path) / 1e6:8.1f} MB  {path}")
+            return
+
+        started = time.perf_counter()
+        rebuilt = store.compact()
+        self.stdout.write(
+            f"Rebuilt rollups for {rebuilt} minute buckets in {time.perf_counter() - started:.2f}s"
+        )
+
+        days = options['drop_older_than']
+        if days is not None:
+            if days < 0:
+                raise CommandError("--drop-older-than must not be negative")
+            cutoff = datetime.now(dt_timezone.utc) - timedelta(days=days)
+            dropped = store.drop_before(cutoff.strftime('%Y%m%d'))
+        else:
+            dropped = store.apply_retention()
+        if dropped:
+            self.stdout.write(f"Dropped partitions: {', '.join(dropped)}")
@@ -0,0 +1,46 @@
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wifi_api.export import EXPORT_FORMATS, EXPORT_TABLES, ExportUnavailable, iter_export
+from wifi_api.models import ScanSession
+
+
+class Command(BaseCommand):
+    help = "Export a scan session's networks, clients and signal samples as Parquet or Arrow IPC"
+
+    def add_arguments(self, parser):
+        parser.add_argument('session', help="ScanSession id")
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='parquet')
+        parser.add_argument('--output-dir', default='.')
+        parser.add_argument('--tables', nargs='+', choices=sorted(EXPORT_TABLES),
+                            default=list(EXPORT_TABLES))
+        parser.add_argument('--chunk-rows', type=int, default=50000,
+                            help="Rows per row group / record batch")
+
+    def handle(self, *args, **options):
+        try:
+            session = ScanSession.objects.get(pk=options['session'])
+        except (ScanSession.DoesNotExist, ValueError):
+            raise CommandError(f"Unknown scan session {options['session']}")
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        extension = EXPORT_FORMATS[options['format']][1]
+
+        for table in options['tables']:
+            path = os.path.join(options['output_dir'], f"session_{session.id}_{table}{extension}")
+            started = time.monotonic()
+            written = 0
+            try:
+                with open(path, 'wb') as f:
+                    for chunk in iter_export(session, table, options['format'], options['chunk_rows']):
+                        f.write(chunk)
+                        written += len(chunk)
+            except ExportUnavailable as e:
+                raise CommandError(str(e))
+
+            self.stdout.write(
+                f"{table}: {written} bytes -> {path} ({time.monotonic() - started:.1f}s)"
+            )
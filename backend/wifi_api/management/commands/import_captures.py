@@ -0,0 +1,163 @@
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from wifi_api.history import ingest_stream, merge_observations
+from wifi_api.models import ImportedCapture, ScanSession
+from wifi_api.parsers import capture_parser_for, capture_stream_for, sniff_capture
+
+
+def parse_capture(path):
+    """Parse one capture file; runs inside a worker process"""
+    parser = capture_parser_for(path)
+    networks, clients = parser(path)
+    return path, networks, clients
+
+
+class Command(BaseCommand):
+    help = "Import archived airodump-ng/Kismet capture files into the history store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Directory to search for capture files")
+        parser.add_argument('--session', help="Merge into an existing ScanSession id")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Number of parser processes (default: CPU count)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Rows per batched insert")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-import files that were already imported")
+        parser.add_argument('--stream-threshold', type=int, default=64 * 1024 * 1024,
+                            help="Files larger than this many bytes are streamed in-process "
+                                 "instead of being parsed whole by a worker")
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory")
+
+        paths = self.find_captures(directory)
+        if not options['force']:
+            paths = self.skip_imported(paths)
+        if not paths:
+            self.stdout.write("No new capture files to import")
+            return
+
+        if options['session']:
+            try:
+                session = ScanSession.objects.get(pk=options['session'])
+            except (ScanSession.DoesNotExist, ValueError):
+                raise CommandError(f"Unknown scan session {options['session']}")
+        else:
+            session = ScanSession.objects.create(
+                interface=f"import:{os.path.basename(os.path.abspath(directory))}",
+                is_active=False,
+            )
+
+        self.stdout.write(f"Importing {len(paths)} capture files into session {session.id}")
+        started = time.monotonic()
+        total_rows = 0
+        done = 0
+
+        # Huge files would have to be shipped back from a worker as one list,
+        # so they are streamed straight into the database instead
+        large = [p for p in paths if os.path.getsize(p) > options['stream_threshold']]
+        streamed = set(large)
+        small = [p for p in paths if p not in streamed]
+
+        def report(path, rows):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"[{done}/{len(paths)}] {path}: {rows} rows "
+                f"({done / elapsed:.1f} files/s, {total_rows / elapsed:.0f} rows/s)"
+            )
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(parse_capture, path) for path in small]
+
+            for path in large:
+                try:
+                    rows = self.stream(session, path, options['batch_size'])
+                except Exception as e:
+                    self.stderr.write(f"Failed to stream {path}: {e}")
+                    continue
+                total_rows += rows
+                done += 1
+                report(path, rows)
+
+            for future in as_completed(futures):
+                try:
+                    path, networks, clients = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Failed to parse capture: {e}")
+                    continue
+
+                rows = self.store(session, path, networks, clients, options['batch_size'])
+                total_rows += rows
+                done += 1
+                report(path, rows)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {done} files, {total_rows} rows in {elapsed:.1f}s"
+        ))
+
+    def find_captures(self, directory):
+        paths = []
+        for root, dirs, files in os.walk(directory):
+            for name in files:
+                path = os.path.abspath(os.path.join(root, name))
+                # Any CSV matches by name; only take files that look like captures
+                if sniff_capture(path):
+                    paths.append(path)
+        # Parse the largest files first so they do not straggle at the end
+        paths.sort(key=os.path.getsize, reverse=True)
+        return paths
+
+    def skip_imported(self, paths):
+        imported = {
+            c.path: (c.size, c.mtime)
+            for c in ImportedCapture.objects.filter(path__in=paths)
+        }
+        fresh = []
+        for path in paths:
+            stat = os.stat(path)
+            if imported.get(path) != (stat.st_size, stat.st_mtime):
+                fresh.append(path)
+        skipped = len(paths) - len(fresh)
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} already imported files")
+        return fresh
+
+    def store(self, session, path, networks, clients, batch_size):
+        with transaction.atomic():
+            rows = merge_observations(session, networks, clients, batch_size=batch_size)
+            self.mark_imported(session, path, rows)
+        return rows
+
+    def stream(self, session, path, batch_size):
+        records = capture_stream_for(path)(path)
+        with transaction.atomic():
+            rows, channel_packets = ingest_stream(session, records, batch_size=batch_size)
+            self.mark_imported(session, path, rows)
+        if any(channel_packets.values()):
+            busiest = sorted(channel_packets.items(), key=lambda item: -item[1])[:5]
+            self.stdout.write("  packets by channel: " + ", ".join(
+                f"ch{channel}={packets}" for channel, packets in busiest
+            ))
+        return rows
+
+    def mark_imported(self, session, path, rows):
+        stat = os.stat(path)
+        ImportedCapture.objects.update_or_create(
+            path=path,
+            defaults={
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'session': session,
+                'rows': rows,
+            },
+        )
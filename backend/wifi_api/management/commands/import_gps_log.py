@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wifi_api.models import ScanSession
+from wifi_api.survey import iter_gps_log, record_locations
+
+
+class Command(BaseCommand):
+    help = "Attach a recorded GPS log (NMEA or gpsd JSON) to a scan session for heatmaps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('session', help="ScanSession id")
+        parser.add_argument('log', help="NMEA sentences or gpsd JSON reports, one per line")
+        parser.add_argument('--offset', type=float, default=0.0,
+                            help="Seconds to add to GPS times to match the capture host's clock")
+
+    def handle(self, *args, **options):
+        try:
+            session = ScanSession.objects.get(pk=options['session'])
+        except (ScanSession.DoesNotExist, ValueError):
+            raise CommandError(f"Unknown scan session {options['session']}")
+
+        started = time.monotonic()
+        try:
+            with open(options['log'], 'rb') as f:
+                fixes = [(ts + options['offset'], lon, lat) for ts, lat, lon in iter_gps_log(f)]
+        except OSError as e:
+            raise CommandError(str(e))
+        if not fixes:
+            raise CommandError(f"No valid fixes in {options['log']}")
+
+        stored = record_locations(session, fixes, 'gps', 'log')
+        self.stdout.write(
+            f"{stored} fixes from {fixes[0][0]:.0f} to {fixes[-1][0]:.0f} "
+            f"({time.monotonic() - started:.1f}s)"
+        )
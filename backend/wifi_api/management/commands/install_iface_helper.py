@@ -0,0 +1,26 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wifi_api.iface_helper import install
+
+
+class Command(BaseCommand):
+    help = "Install the root-owned interface helper that the sudo backend runs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.INTERFACE_HELPER_PATH,
+                            help="Helper script (default: INTERFACE_HELPER_PATH)")
+        parser.add_argument('--library', default='/usr/local/lib/wifi-iface-helper',
+                            help="Root-owned directory for the helper's modules")
+        parser.add_argument('--python', default='/usr/bin/python3',
+                            help="Interpreter the helper runs with; must not be user-writable")
+
+    def handle(self, *args, **options):
+        if os.geteuid() != 0:
+            raise CommandError("Run this as root, e.g. sudo python manage.py install_iface_helper")
+        install(options['path'], options['library'], options['python'])
+        user = os.environ.get('SUDO_USER', 'youruser')
+        self.stdout.write(f"Installed {options['path']}. Sudoers rule:")
+        self.stdout.write(f"{user} ALL=(root) NOPASSWD: {options['path']}")
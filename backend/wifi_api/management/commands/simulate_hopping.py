@@ -0,0 +1,167 @@
+import math
+import os
+import random
+import statistics
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wifi_api.capture_store import get_capture_store
+from wifi_api.hopping import HoppingScheduler
+from wifi_api.parsers import capture_parser_for
+
+# Frame rates are estimated from the capture's counters; clamp them so a
+# device seen for a second or one that barely talked does not skew things
+MIN_RATE = 0.05
+MAX_RATE = 10.0
+
+
+class Device:
+    __slots__ = ('first', 'last', 'rate', 'channel')
+
+    def __init__(self, first, last, frames, channel):
+        self.first = first
+        self.last = last
+        self.rate = min(MAX_RATE, max(MIN_RATE, frames / max(1, last - first)))
+        # None: a probing station, heard on whatever channel it probes
+        self.channel = channel
+
+
+def load_devices(networks, clients):
+    channels = {}
+    devices = []
+    for network in networks:
+        channels[network['bssid']] = network['channel']
+        devices.append(Device(network['firstSeen'], network['lastSeen'],
+                              network.get('beacons', 0), network['channel']))
+    for client in clients:
+        devices.append(Device(client['firstSeen'], client['lastSeen'],
+                              client.get('frames', 0), channels.get(client['bssid'])))
+    return devices
+
+
+def simulate(devices, plan_source, start, end, hop_seconds, seed):
+    """Replay ``devices`` against a hopping plan; return discovery times.
+
+    A device active for ``t`` seconds of a dwell on its channel is heard with
+    probability ``1 - exp(-rate * t)``. ``plan_source`` is a fixed plan or a
+    ``HoppingScheduler``, which is fed what the simulated radio finds.
+    """
+    rng = random.Random(seed)
+    by_channel = {}
+    anywhere = []
+    for device in devices:
+        if device.channel is None:
+            anywhere.append(device)
+        else:
+            by_channel.setdefault(device.channel, []).append(device)
+
+    scheduler = plan_source if isinstance(plan_source, HoppingScheduler) else None
+    found = {}
+    now = start
+    rebalanced_at = start
+    while now < end:
+        plan = scheduler.plan if scheduler else plan_source
+        for channel, dwell in plan:
+            until = now + dwell
+            heard = 0
+            for pool in (by_channel.get(channel, ()), anywhere):
+                for device in pool:
+                    if device in found:
+                        continue
+                    overlap = min(until, device.last + 1) - max(now, device.first)
+                    if overlap > 0 and rng.random() < 1 - math.exp(-device.rate * overlap):
+                        found[device] = max(now, device.first)
+                        heard += 1
+            if scheduler:
+                scheduler.record_dwell(channel, dwell)
+                scheduler.record_discoveries({channel: heard})
+            now = until + hop_seconds
+        if scheduler and now - rebalanced_at >= settings.CHANNEL_HOPPING['REBALANCE_SECONDS']:
+            scheduler.rebalance()
+            rebalanced_at = now
+    return found
+
+
+class Command(BaseCommand):
+    help = "Replay recorded captures against fixed and adaptive channel hopping"
+
+    def add_arguments(self, parser):
+        parser.add_argument('captures', nargs='*',
+                            help="airodump-ng or Kismet capture files to replay")
+        parser.add_argument('--scan-id', help="Replay the last sealed segment of a stored scan")
+        parser.add_argument('--channels', help="Comma-separated channels "
+                                               "(default: CHANNEL_HOPPING['CHANNELS'])")
+        parser.add_argument('--cycle', type=float,
+                            default=settings.CHANNEL_HOPPING['CYCLE_SECONDS'])
+        parser.add_argument('--min-dwell', type=float,
+                            default=settings.CHANNEL_HOPPING['MIN_DWELL_SECONDS'])
+        parser.add_argument('--hop-ms', type=float, default=5.0,
+                            help="Time lost per channel switch")
+        parser.add_argument('--duration', type=float,
+                            help="Seconds to simulate (default: the capture's time span)")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        networks, clients = [], []
+        for path in options['captures']:
+            parser = capture_parser_for(path)
+            if parser is None:
+                raise CommandError(f"Unsupported capture file: {path}")
+            parsed = parser(path)
+            networks += parsed[0]
+            clients += parsed[1]
+        if options['scan_id']:
+            parsed = self.load_segment(options['scan_id'])
+            networks += parsed[0]
+            clients += parsed[1]
+        devices = load_devices(networks, clients)
+        if not devices:
+            raise CommandError("No devices to replay; pass capture files or --scan-id")
+
+        if options['channels']:
+            channels = [int(channel) for channel in options['channels'].split(',')]
+        else:
+            channels = settings.CHANNEL_HOPPING['CHANNELS']
+        listed = set(channels)
+        reachable = [d for d in devices if d.channel is None or d.channel in listed]
+
+        start = min(d.first for d in devices)
+        end = start + options['duration'] if options['duration'] else max(d.last for d in devices) + 1
+        hop_seconds = options['hop_ms'] / 1000
+        equal = [(channel, options['cycle'] / len(channels)) for channel in channels]
+        strategies = (
+            ('equal', equal),
+            ('adaptive', HoppingScheduler(channels, options['cycle'], options['min_dwell'])),
+        )
+
+        self.stdout.write(
+            f"{len(devices)} devices ({len(reachable)} on listed channels), "
+            f"{end - start:.0f}s simulated, {len(channels)} channels, {options['cycle']:.1f}s cycle"
+        )
+        self.stdout.write(f"{'strategy':<10}{'found':>8}{'found %':>9}"
+                          f"{'median s':>10}{'p90 s':>10}{'in 60s':>8}")
+        for name, plan_source in strategies:
+            found = simulate(reachable, plan_source, start, end, hop_seconds, options['seed'])
+            latency = sorted(at - device.first for device, at in found.items())
+            early = sum(1 for value in latency if value <= 60)
+            self.stdout.write(
+                f"{name:<10}{len(found):>8}{100 * len(found) / max(1, len(reachable)):>8.1f}%"
+                f"{statistics.median(latency) if latency else 0:>10.1f}"
+                f"{latency[int(len(latency) * 0.9)] if latency else 0:>10.1f}{early:>8}"
+            )
+
+    def load_segment(self, scan_id):
+        store = get_capture_store()
+        if not any(e['name'].endswith('.csv') for e in store.segments(scan_id)):
+            raise CommandError(f"No sealed segments for scan {scan_id}")
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            # airodump-ng rewrites the whole file, so the newest state has everything
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in store.iter_latest(scan_id):
+                    f.write(chunk)
+            return capture_parser_for(path)(path)
+        finally:
+            os.remove(path)
@@ -0,0 +1,108 @@
+
+# Memoized dashboard results, keyed by scan generation
+#
+# Dashboards poll the same aggregates from many tabs. A result is computed
+# and JSON-encoded once per scan tick: entries are keyed by scan, the scan
+# state's generation and the normalized query, so a tick makes every older
+# entry of that scan unreachable and it is dropped on the next store.
+# Concurrent misses for one key wait for the first caller's result instead
+# of all computing it.
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ResultCache:
+    """LRU of encoded results bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # scan id -> newest generation stored
+        self._generations = {}
+        # key -> Event set when its computation finishes
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, scan_id, generation, params, compute):
+        """Return ``(body, hit)`` for one query.
+
+        ``compute()`` returns ``(generation, body)``: the generation the data
+        was read at, which may be newer than the one looked up, and the
+        encoded result.
+        """
+        key = (scan_id, generation, params)
+        while True:
+            with self._lock:
+                body = self._entries.get(key)
+                if body is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, True
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            pending.wait()
+
+        try:
+            computed_generation, body = compute()
+            self._store((scan_id, computed_generation, params), body)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+        return body, False
+
+    def _store(self, key, body):
+        scan_id, generation = key[0], key[1]
+        size = len(body)
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            newest = self._generations.get(scan_id, -1)
+            if generation > newest:
+                self._generations[scan_id] = generation
+                self._drop_older(scan_id, generation)
+            elif generation < newest:
+                # A tick landed while this was computed
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _drop_older(self, scan_id, generation):
+        for key in [k for k in self._entries if k[0] == scan_id and k[1] < generation]:
+            self._bytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = settings.RESULT_CACHE
+            _cache = ResultCache(config['MAX_ENTRIES'], config['MAX_BYTES'])
+        return _cache
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:14
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttackSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('attack_type', models.CharField(max_length=50)),
+                ('target_bssid', models.CharField(max_length=50)),
+                ('target_client', models.CharField(blank=True, max_length=50, null=True)),
+                ('interface', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScanSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('interface', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportedCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('mtime', models.FloatField()),
+                ('rows', models.IntegerField(default=0)),
+                ('imported_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='wifi_api.scansession')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Network',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bssid', models.CharField(max_length=50)),
+                ('ssid', models.CharField(blank=True, max_length=64)),
+                ('channel', models.IntegerField(default=0)),
+                ('encryption', models.CharField(blank=True, max_length=50)),
+                ('vendor', models.CharField(blank=True, max_length=100)),
+                ('max_signal', models.IntegerField(default=0)),
+                ('clients', models.IntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='networks', to='wifi_api.scansession')),
+            ],
+            options={
+                'unique_together': {('session', 'bssid')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Client',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mac', models.CharField(max_length=50)),
+                ('bssid', models.CharField(blank=True, max_length=50)),
+                ('probes', models.JSONField(default=list)),
+                ('vendor', models.CharField(blank=True, max_length=100)),
+                ('max_power', models.IntegerField(default=0)),
+                ('frames', models.IntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clients', to='wifi_api.scansession')),
+            ],
+            options={
+                'unique_together': {('session', 'mac')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SignalSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mac', models.CharField(max_length=50)),
+                ('kind', models.CharField(max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('signal', models.IntegerField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='wifi_api.scansession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'mac', 'timestamp'], name='wifi_api_si_session_72fb2c_idx')],
+            },
+        ),
+    ]
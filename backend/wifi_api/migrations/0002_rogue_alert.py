@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wifi_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RogueAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(max_length=50)),
+                ('severity', models.CharField(max_length=10)),
+                ('ssid', models.CharField(blank=True, max_length=64)),
+                ('bssid', models.CharField(max_length=50)),
+                ('channel', models.IntegerField(default=0)),
+                ('message', models.CharField(max_length=255)),
+                ('details', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='wifi_api.scansession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'created_at'], name='wifi_api_ro_session_b65a26_idx')],
+            },
+        ),
+    ]
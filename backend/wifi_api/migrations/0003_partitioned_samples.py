@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:33
+
+from django.db import migrations
+
+
+def move_samples(apps, schema_editor):
+    # Carry existing samples over to the day-partitioned observation store
+    from wifi_api.observations import get_observation_store
+
+    SignalSample = apps.get_model('wifi_api', 'SignalSample')
+    store = get_observation_store()
+    batch = []
+    rows = SignalSample.objects.order_by('pk').values_list(
+        'session_id', 'mac', 'kind', 'timestamp', 'signal'
+    ).iterator(chunk_size=5000)
+    for session_id, mac, kind, timestamp, signal in rows:
+        batch.append((str(session_id), mac, kind, int(timestamp.timestamp()), signal, 0))
+        if len(batch) >= 5000:
+            store.add_samples(batch)
+            batch = []
+    if batch:
+        store.add_samples(batch)
+    store.compact()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wifi_api', '0002_rogue_alert'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_samples, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='SignalSample',
+        ),
+    ]
@@ -23,3 +23,68 @@ class AttackSession(models.Model):
 
     def __str__(self):
         return f"{self.attack_type} Attack on {self.target_bssid} ({self.id})"
+
+class Network(models.Model):
+    session = models.ForeignKey(ScanSession, on_delete=models.CASCADE, related_name='networks')
+    bssid = models.CharField(max_length=50)
+    ssid = models.CharField(max_length=64, blank=True)
+    channel = models.IntegerField(default=0)
+    encryption = models.CharField(max_length=50, blank=True)
+    vendor = models.CharField(max_length=100, blank=True)
+    max_signal = models.IntegerField(default=0)
+    clients = models.IntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('session', 'bssid')
+
+    def __str__(self):
+        return f"{self.ssid or '<hidden>'} ({self.bssid})"
+
+class Client(models.Model):
+    session = models.ForeignKey(ScanSession, on_delete=models.CASCADE, related_name='clients')
+    mac = models.CharField(max_length=50)
+    bssid = models.CharField(max_length=50, blank=True)
+    probes = models.JSONField(default=list)
+    vendor = models.CharField(max_length=100, blank=True)
+    max_power = models.IntegerField(default=0)
+    frames = models.IntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('session', 'mac')
+
+    def __str__(self):
+        return f"Client {self.mac} ({self.bssid})"
+
+class RogueAlert(models.Model):
+    session = models.ForeignKey(ScanSession, on_delete=models.CASCADE, related_name='alerts')
+    rule = models.CharField(max_length=50)
+    severity = models.CharField(max_length=10)
+    ssid = models.CharField(max_length=64, blank=True)
+    bssid = models.CharField(max_length=50)
+    channel = models.IntegerField(default=0)
+    message = models.CharField(max_length=255)
+    details = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} on {self.bssid} ({self.severity})"
+
+class ImportedCapture(models.Model):
+    path = models.CharField(max_length=1024, unique=True)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    session = models.ForeignKey(ScanSession, on_delete=models.SET_NULL, null=True, blank=True)
+    rows = models.IntegerField(default=0)
+    imported_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Imported {self.path} ({self.rows} rows)"
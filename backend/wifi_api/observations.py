@@ -0,0 +1,457 @@
+
+# Day-partitioned observation store with 1-minute and 1-hour rollups
+#
+# Signal samples grow without bound, so they live outside db.sqlite3: one
+# SQLite file per UTC day under HISTORY_STORE['ROOT']. Queries ATTACH only
+# the partitions their time range touches, and dropping a day is deleting
+# its file.
+#
+# Every process that has a partition open holds a shared flock on its file
+# (SQLite itself uses fcntl locks, which are separate), and a partition is
+# only dropped under an exclusive one, so a day is never deleted under a
+# reader or writer in another worker. Compaction and retention run in one
+# process at a time, the holder of the history root's compactor lock.
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    session TEXT NOT NULL, mac TEXT NOT NULL, kind TEXT NOT NULL,
+    ts INTEGER NOT NULL, signal INTEGER NOT NULL, frames INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_mac_ts ON samples (mac, ts);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+-- minute buckets with new samples since the last compaction
+CREATE TABLE IF NOT EXISTS dirty (bucket INTEGER PRIMARY KEY);
+-- survey positions: lon/lat for frame 'gps', meters on a floor plan for 'plan'
+CREATE TABLE IF NOT EXISTS locations (
+    session TEXT NOT NULL, ts REAL NOT NULL, x REAL NOT NULL, y REAL NOT NULL,
+    frame TEXT NOT NULL, source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS locations_session_ts ON locations (session, ts);
+"""
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    session TEXT NOT NULL, mac TEXT NOT NULL, kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL, samples INTEGER NOT NULL,
+    min_signal INTEGER NOT NULL, max_signal INTEGER NOT NULL, sum_signal INTEGER NOT NULL,
+    min_frames INTEGER NOT NULL, max_frames INTEGER NOT NULL,
+    PRIMARY KEY (mac, bucket, session, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_bucket ON {table} (bucket);
+"""
+
+# resolution -> (table, bucket seconds)
+RESOLUTIONS = {
+    'raw': ('samples', 1),
+    '1m': ('rollup_1m', 60),
+    '1h': ('rollup_1h', 3600),
+}
+
+# Ranges longer than this read hourly rollups when no resolution is given
+AUTO_HOURLY_AFTER = 2 * 86400
+
+# SQLite's default limit on attached databases
+MAX_ATTACHED = 10
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc).strftime('%Y%m%d')
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    # Import workers and the scan tailer may write the same day concurrently
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _hold(path):
+    """Open ``path`` with a shared flock marking it in use; raises FileNotFoundError."""
+    fd = os.open(path, os.O_RDONLY)
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    return fd
+
+
+@contextmanager
+def _in_use(path):
+    fd = _hold(path)
+    try:
+        yield
+    finally:
+        os.close(fd)
+
+
+class ObservationStore:
+    """Raw signal samples partitioned by day, plus materialized rollups."""
+
+    # Write connections kept open; scans rarely span more than two days
+    OPEN_PARTITIONS = 4
+
+    def __init__(self, root, retention_days=None):
+        self.root = str(root)
+        self.retention_days = retention_days
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connections = {}
+        # day -> fd holding the shared flock of a writer connection
+        self._holds = {}
+        self._compactor = None
+        # fd of the compactor lock once this process holds it
+        self._election = None
+
+    def partition_path(self, day):
+        return os.path.join(self.root, f'obs-{day}.sqlite3')
+
+    def partitions(self):
+        """Return ``{day: path}`` for every partition on disk."""
+        result = {}
+        for name in os.listdir(self.root):
+            if name.startswith('obs-') and name.endswith('.sqlite3'):
+                result[name[4:-8]] = os.path.join(self.root, name)
+        return dict(sorted(result.items()))
+
+    def _writer(self, day):
+        conn = self._connections.pop(day, None)
+        if conn is None:
+            path = self.partition_path(day)
+            conn = _connect(path)
+            self._holds[day] = _hold(path)
+            conn.executescript(SCHEMA)
+            for table in ('rollup_1m', 'rollup_1h'):
+                conn.executescript(ROLLUP_SCHEMA.format(table=table))
+            while len(self._connections) >= self.OPEN_PARTITIONS:
+                self._close_writer(next(iter(self._connections)))
+        # Most recently used last
+        self._connections[day] = conn
+        return conn
+
+    def _close_writer(self, day):
+        conn = self._connections.pop(day, None)
+        if conn is not None:
+            conn.close()
+        fd = self._holds.pop(day, None)
+        if fd is not None:
+            os.close(fd)
+
+    def add_samples(self, samples):
+        """Append ``(session, mac, kind, ts, signal, frames)`` rows."""
+        by_day = {}
+        for sample in samples:
+            by_day.setdefault(_day(sample[3]), []).append(sample)
+
+        with self._lock:
+            for day, rows in by_day.items():
+                conn = self._writer(day)
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)', rows)
+                    conn.executemany(
+                        'INSERT OR IGNORE INTO dirty VALUES (?)',
+                        {(row[3] // 60 * 60,) for row in rows},
+                    )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+
+    def add_locations(self, locations):
+        """Append ``(session, ts, x, y, frame, source)`` position fixes."""
+        by_day = {}
+        for location in locations:
+            by_day.setdefault(_day(location[1]), []).append(location)
+
+        with self._lock:
+            for day, rows in by_day.items():
+                conn = self._writer(day)
+                conn.executemany('INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    # -- compaction ---------------------------------------------------------
+
+    def compact(self):
+        """Rebuild rollups for every minute with new samples.
+
+        Each partition's ``dirty`` table says what needs rebuilding, whoever
+        wrote the samples; partitions without dirty minutes are only read.
+        File times are no guide, since new samples land in the WAL file.
+        Minutes are recomputed from raw samples and their hours from the
+        minutes, so late imports into old days are rolled up correctly.
+        Returns the number of minute buckets rebuilt.
+        """
+        rebuilt = 0
+        for day, path in self.partitions().items():
+            with self._lock:
+                conn = self._connections.get(day)
+                if conn is not None:
+                    rebuilt += self._compact_partition(conn)
+                    continue
+            # Not written by this process: a short-lived connection, so the
+            # writers in use here are not evicted
+            try:
+                with _in_use(path):
+                    conn = _connect(path)
+                    try:
+                        rebuilt += self._compact_partition(conn)
+                    finally:
+                        conn.close()
+            except FileNotFoundError:
+                continue
+        return rebuilt
+
+    def _compact_partition(self, conn):
+        if conn.execute('SELECT NOT EXISTS (SELECT 1 FROM dirty)').fetchone()[0]:
+            return 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            minutes = conn.execute('SELECT COUNT(*) FROM dirty').fetchone()[0]
+            if not minutes:
+                conn.execute('COMMIT')
+                return 0
+            conn.execute('DELETE FROM rollup_1m WHERE bucket IN (SELECT bucket FROM dirty)')
+            conn.execute("""
+                INSERT INTO rollup_1m
+                SELECT s.session, s.mac, s.kind, d.bucket, COUNT(*),
+                       MIN(s.signal), MAX(s.signal), SUM(s.signal),
+                       MIN(s.frames), MAX(s.frames)
+                FROM dirty d JOIN samples s ON s.ts >= d.bucket AND s.ts < d.bucket + 60
+                GROUP BY s.session, s.mac, s.kind, d.bucket
+            """)
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS dirty_hours (bucket INTEGER PRIMARY KEY)
+            """)
+            conn.execute('DELETE FROM dirty_hours')
+            conn.execute('INSERT OR IGNORE INTO dirty_hours SELECT bucket / 3600 * 3600 FROM dirty')
+            conn.execute('DELETE FROM rollup_1h WHERE bucket IN (SELECT bucket FROM dirty_hours)')
+            conn.execute("""
+                INSERT INTO rollup_1h
+                SELECT m.session, m.mac, m.kind, h.bucket, SUM(m.samples),
+                       MIN(m.min_signal), MAX(m.max_signal), SUM(m.sum_signal),
+                       MIN(m.min_frames), MAX(m.max_frames)
+                FROM dirty_hours h JOIN rollup_1m m ON m.bucket >= h.bucket AND m.bucket < h.bucket + 3600
+                GROUP BY m.session, m.mac, m.kind, h.bucket
+            """)
+            conn.execute('DELETE FROM dirty')
+            conn.execute('COMMIT')
+            return minutes
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def drop_before(self, day):
+        """Delete every partition older than ``day`` (YYYYMMDD); O(1) each.
+
+        Partitions another process still has open are skipped, and dropped
+        on a later pass.
+        """
+        dropped = []
+        with self._lock:
+            for partition_day, path in self.partitions().items():
+                if partition_day >= day:
+                    break
+                self._close_writer(partition_day)
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    continue
+                try:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        logger.info(f"History partition {partition_day} is in use, not dropped yet")
+                        continue
+                    for suffix in ('', '-wal', '-shm'):
+                        try:
+                            os.remove(path + suffix)
+                        except FileNotFoundError:
+                            pass
+                    dropped.append(partition_day)
+                finally:
+                    os.close(fd)
+        return dropped
+
+    def apply_retention(self):
+        if not self.retention_days:
+            return []
+        cutoff = datetime.now(dt_timezone.utc) - timedelta(days=self.retention_days)
+        return self.drop_before(cutoff.strftime('%Y%m%d'))
+
+    def run_maintenance(self):
+        """One compaction pass, then retention."""
+        rebuilt = self.compact()
+        dropped = self.apply_retention()
+        return rebuilt, dropped
+
+    def elect_compactor(self):
+        """Take the compactor lock if no other process holds it.
+
+        Once taken it is held until this process exits.
+        """
+        if self._election is None:
+            fd = os.open(os.path.join(self.root, 'compactor.lock'), os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._election = fd
+        return True
+
+    def start_compactor(self, interval):
+        """Run ``run_maintenance`` every ``interval`` seconds on a daemon thread.
+
+        Every worker starts one, but only the process holding the compactor
+        lock does any work; if it exits, the next to try the lock takes over.
+        """
+        if self._compactor is not None:
+            return
+
+        def loop():
+            while True:
+                if self.elect_compactor():
+                    try:
+                        self.run_maintenance()
+                    except Exception as e:
+                        logger.error(f"History compaction failed: {e}")
+                time.sleep(interval)
+
+        self._compactor = threading.Thread(target=loop, name='history-compactor', daemon=True)
+        self._compactor.start()
+
+    # -- queries ------------------------------------------------------------
+
+    def _attached(self, start, end):
+        """Yield ``(connection, aliases)`` with the partitions for the range attached."""
+        days = []
+        day = datetime.fromtimestamp(start, tz=dt_timezone.utc).date()
+        last = datetime.fromtimestamp(end, tz=dt_timezone.utc).date()
+        while day <= last:
+            path = self.partition_path(day.strftime('%Y%m%d'))
+            if os.path.exists(path):
+                days.append(path)
+            day += timedelta(days=1)
+
+        conn = sqlite3.connect('file::memory:', uri=True)
+        try:
+            for offset in range(0, len(days), MAX_ATTACHED):
+                aliases = []
+                holds = []
+                try:
+                    for path in days[offset:offset + MAX_ATTACHED]:
+                        try:
+                            holds.append(_hold(path))
+                        except FileNotFoundError:
+                            # Dropped since it was listed
+                            continue
+                        alias = f'p{len(aliases)}'
+                        conn.execute(f"ATTACH DATABASE ? AS {alias}", (f'file:{path}?mode=ro',))
+                        aliases.append(alias)
+                    yield conn, aliases
+                    for alias in aliases:
+                        conn.execute(f'DETACH DATABASE {alias}')
+                finally:
+                    for fd in holds:
+                        os.close(fd)
+        finally:
+            conn.close()
+
+    def trend(self, mac, start, end, resolution=None, session=None):
+        """Signal/frame trend of one device between two POSIX times.
+
+        Reads the 1-minute or 1-hour rollups unless ``resolution='raw'``;
+        with no resolution the span picks one. Returns the resolution used
+        and a list of ``{t, samples, min, max, avg, frames}`` points.
+        """
+        if resolution is None:
+            resolution = '1h' if end - start > AUTO_HOURLY_AFTER else '1m'
+        table, bucket_seconds = RESOLUTIONS[resolution]
+
+        if table == 'samples':
+            # Raw points carry the frame counter itself rather than a delta
+            select = ("SELECT ts, 1, signal, signal, signal, 0, frames FROM {db}.samples "
+                      "WHERE mac = ? AND ts >= ? AND ts <= ?")
+        else:
+            select = ("SELECT bucket, samples, min_signal, max_signal, sum_signal, min_frames, max_frames "
+                      "FROM {db}.%s WHERE mac = ? AND bucket >= ? AND bucket <= ?" % table)
+        # Include the bucket that ``start`` falls into
+        params = [mac, start - start % bucket_seconds, end]
+        if session is not None:
+            select += " AND session = ?"
+            params.append(str(session))
+
+        points = []
+        for conn, aliases in self._attached(start, end):
+            if not aliases:
+                continue
+            sql = " UNION ALL ".join(select.format(db=alias) for alias in aliases) + " ORDER BY 1"
+            for t, count, low, high, total, min_frames, max_frames in conn.execute(sql, params * len(aliases)):
+                points.append({
+                    't': t,
+                    'samples': count,
+                    'min': low,
+                    'max': high,
+                    'avg': round(total / count, 1),
+                    'frames': max_frames - min_frames,
+                })
+        return resolution, points
+
+    def iter_samples(self, session, mac=None):
+        """Yield ``(mac, kind, ts, signal)`` for one session across all partitions."""
+        sql = 'SELECT mac, kind, ts, signal FROM samples WHERE session = ?'
+        params = (str(session),)
+        if mac is not None:
+            sql += ' AND mac = ?'
+            params += (mac,)
+        for path in self.partitions().values():
+            try:
+                with _in_use(path):
+                    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+                    try:
+                        yield from conn.execute(sql + ' ORDER BY ts', params)
+                    finally:
+                        conn.close()
+            except FileNotFoundError:
+                continue
+
+    def iter_locations(self, session):
+        """Yield ``(ts, x, y, frame, source)`` fixes of one session in time order."""
+        for path in self.partitions().values():
+            try:
+                with _in_use(path):
+                    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+                    try:
+                        yield from conn.execute(
+                            'SELECT ts, x, y, frame, source FROM locations WHERE session = ? ORDER BY ts',
+                            (str(session),),
+                        )
+                    except sqlite3.OperationalError:
+                        # Partition written before locations were recorded
+                        continue
+                    finally:
+                        conn.close()
+            except FileNotFoundError:
+                continue
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_observation_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = settings.HISTORY_STORE
+            _store = ObservationStore(config['ROOT'], retention_days=config.get('RETENTION_DAYS'))
+        return _store
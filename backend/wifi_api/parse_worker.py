@@ -0,0 +1,31 @@
+
+# Entry point of the per-scan worker process that parses, diffs and encodes
+import os
+import sys
+
+
+def run(settings_module, scan_id, session_id, output_file, resume, stop):
+    """Tail one scan inside a freshly spawned interpreter.
+
+    ``stop`` is set by the server once the airodump-ng process has exited.
+    If the server itself goes away the worker stops too, leaving the
+    checkpoint for whichever worker re-adopts the scan. Exits with status 1
+    if the tick loop failed, so the server restarts it.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from .models import ScanSession
+    from .scan_runner import tail_scan_here
+
+    parent = os.getppid()
+    session = ScanSession.objects.get(pk=session_id)
+    finished = tail_scan_here(
+        scan_id, session, output_file,
+        is_running=lambda: not stop.is_set(),
+        resume=resume,
+        abandoned=lambda: os.getppid() != parent,
+    )
+    if not finished:
+        sys.exit(1)
@@ -0,0 +1,451 @@
+
+# Parsers for capture files written by airodump-ng
+#
+# Every parser returns ``(networks, clients)`` using the same record layout the
+# scan API and WebSocket stream use, so captures from any source can be merged
+# into the history store interchangeably.
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from functools import lru_cache
+
+KISMET_MONTHS = {
+    name: number for number, name in enumerate(
+        ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1
+    )
+}
+
+def parse_airodump_csv(csv_file):
+    """Parse airodump-ng CSV output file and return networks and clients"""
+    networks = []
+    clients = []
+    
+    try:
+        # newline='' keeps the \r\n row terminators the sections are split on
+        with open(csv_file, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            content = f.read()
+            
+        # Split the file into networks and clients sections
+        # (airodump-ng starts the file with an empty line)
+        sections = content.strip().split('\r\n\r\n')
+        if len(sections) < 2:
+            return networks, clients
+            
+        networks_section = sections[0]
+        clients_section = sections[1]
+        
+        # Parse networks
+        network_lines = networks_section.split('\r\n')
+        if len(network_lines) > 1:
+            headers = network_lines[0].split(',')
+            
+            for line in network_lines[1:]:
+                if not line.strip():
+                    continue
+                    
+                fields = line.split(',')
+                if len(fields) < 14:
+                    continue
+                    
+                # Extract network data
+                bssid = fields[0].strip()
+                first_seen = int(datetime.strptime(fields[1].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
+                last_seen = int(datetime.strptime(fields[2].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
+                channel = int(fields[3].strip()) if fields[3].strip().isdigit() else 0
+                speed = fields[4].strip()
+                privacy = fields[5].strip()
+                cipher = fields[6].strip()
+                authentication = fields[7].strip()
+                power = int(fields[8].strip()) if fields[8].strip().lstrip('-').isdigit() else 0
+                beacons = int(fields[9].strip()) if fields[9].strip().isdigit() else 0
+                iv = int(fields[10].strip()) if fields[10].strip().isdigit() else 0
+                lan_ip = fields[11].strip()
+                id_length = int(fields[12].strip()) if fields[12].strip().isdigit() else 0
+                essid = fields[13].strip()
+                
+                # Normalize signal strength (convert negative dBm to percentage)
+                signal = min(100, max(0, int((100 + power) * 2))) if power < 0 else 0
+                
+                # Get vendor from MAC address (first 3 bytes)
+                vendor = "Unknown"
+                if bssid and len(bssid) >= 8:
+                    oui = bssid.replace(':', '').upper()[:6]
+                    # In a real implementation, you would look up the OUI in a database
+                    # For now, we'll just use a placeholder
+                    vendor = get_vendor_from_mac(bssid)
+                
+                networks.append({
+                    'id': bssid.replace(':', ''),
+                    'bssid': bssid,
+                    'ssid': essid,
+                    'channel': channel,
+                    'signal': signal,
+                    'dbm': power,
+                    'encryption': privacy,
+                    'vendor': vendor,
+                    'clients': 0,  # Will be updated later
+                    'beacons': beacons,
+                    'firstSeen': first_seen,
+                    'lastSeen': last_seen
+                })
+        
+        # Parse clients
+        client_lines = clients_section.split('\r\n')
+        if len(client_lines) > 1:
+            headers = client_lines[0].split(',')
+            
+            for line in client_lines[1:]:
+                if not line.strip():
+                    continue
+                    
+                fields = line.split(',')
+                if len(fields) < 7:
+                    continue
+                    
+                # Extract client data
+                mac = fields[0].strip()
+                first_seen = int(datetime.strptime(fields[1].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
+                last_seen = int(datetime.strptime(fields[2].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
+                power = int(fields[3].strip()) if fields[3].strip().lstrip('-').isdigit() else 0
+                packets = int(fields[4].strip()) if fields[4].strip().isdigit() else 0
+                bssid = fields[5].strip()
+                # Probed ESSIDs are themselves comma separated
+                probed_essids = ','.join(fields[6:]).strip()
+                
+                # Normalize signal strength
+                signal = min(100, max(0, int((100 + power) * 2))) if power < 0 else 0
+                
+                # Get vendor from MAC
+                vendor = get_vendor_from_mac(mac)
+                
+                # Parse probed networks
+                probes = [p.strip() for p in probed_essids.split(',') if p.strip()]
+                
+                clients.append({
+                    'mac': mac,
+                    'bssid': bssid,
+                    'power': signal,
+                    'dbm': power,
+                    'rate': '0-0',  # Not provided by airodump CSV
+                    'lost': 0,      # Not provided by airodump CSV
+                    'frames': packets,
+                    'probe': probes,
+                    'vendor': vendor,
+                    'firstSeen': first_seen,
+                    'lastSeen': last_seen
+                })
+                
+                # Update client count for the associated network
+                if bssid != '(not associated)':
+                    for network in networks:
+                        if network['bssid'] == bssid:
+                            network['clients'] += 1
+                            break
+        
+        return networks, clients
+    except Exception as e:
+        print(f"Error parsing CSV: {str(e)}")
+        return [], []
+
+# Vendor index keyed by the first byte of the MAC address. In a real
+# implementation this would be an OUI database; it is built once at import.
+VENDOR_PREFIXES = {
+    '00': 'Xerox',
+    '08': 'Apple',
+    '18': 'Cisco',
+    '28': 'Netgear',
+    '30': 'Dell',
+    '40': 'Huawei',
+    '44': 'Google',
+    '50': 'Amazon',
+    '60': 'Intel',
+    '70': 'Samsung',
+    '80': 'Sony',
+    '90': 'Microsoft',
+    'A0': 'Lenovo',
+    'B0': 'HP',
+    'C0': 'TP-Link',
+    'D0': 'D-Link',
+    'E0': 'Ubiquiti',
+    'F0': 'Belkin'
+}
+
+def get_vendor_from_mac(mac):
+    """Get vendor name from MAC address"""
+    if not mac or len(mac) < 2:
+        return "Unknown"
+        
+    first_byte = mac.split(':')[0].upper()
+    return VENDOR_PREFIXES.get(first_byte, "Unknown")
+
+def signal_from_power(power):
+    """Normalize a dBm reading to the 0-100 scale used by the frontend"""
+    return min(100, max(0, int((100 + power) * 2))) if power < 0 else 0
+
+def _parse_int(value, default=0):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+@lru_cache(maxsize=4096)
+def _parse_kismet_time(value):
+    # ctime style, e.g. "Wed Jan  3 09:15:02 2024". Devices seen in the same
+    # second share a timestamp, so the cache absorbs most calls and strptime
+    # is avoided since it dominates parse time on large files.
+    try:
+        _, month, day, clock, year = value.split()
+        hour, minute, second = clock.split(':')
+        return int(datetime(
+            int(year), KISMET_MONTHS[month], int(day), int(hour), int(minute), int(second)
+        ).timestamp())
+    except (AttributeError, KeyError, ValueError):
+        return 0
+
+def normalize_encryption(tokens):
+    """Collapse Kismet encryption strings into airodump-style privacy"""
+    found = []
+    for proto in ('WPA3', 'WPA2', 'WPA', 'WEP'):
+        for token in tokens:
+            token = token.upper()
+            if token.startswith(proto) and not (proto == 'WPA' and token[3:4].isdigit()):
+                found.append(proto)
+                break
+    return ' '.join(found) if found else 'OPN'
+
+def channel_from_freq(mhz):
+    """Map a centre frequency in MHz to its 802.11 channel number, 0 if unknown"""
+    if mhz == 2484:
+        return 14
+    if 2412 <= mhz <= 2472:
+        return (mhz - 2407) // 5
+    if 5955 <= mhz <= 7115:
+        return (mhz - 5950) // 5
+    if 5000 <= mhz < 5955:
+        return (mhz - 5000) // 5
+    return 0
+
+def iter_kismet_csv(csv_file):
+    """Yield network records from an airodump-ng ``.kismet.csv`` file one row at a time.
+
+    Each network is followed by a ``('packets', {channel: count})`` pair with
+    its packet total, which is not part of the record schema.
+    """
+    with open(csv_file, 'r', encoding='utf-8', errors='ignore') as f:
+        header = f.readline().strip().rstrip(';').split(';')
+        columns = {name: i for i, name in enumerate(header)}
+        if 'BSSID' not in columns:
+            return
+
+        for line in f:
+            fields = line.rstrip('\r\n').split(';')
+            if len(fields) < len(header):
+                continue
+
+            def field(name):
+                return fields[columns[name]].strip() if name in columns else ''
+
+            bssid = field('BSSID')
+            if not bssid:
+                continue
+
+            power = _parse_int(field('BestSignal'))
+            channel = _parse_int(field('Channel'))
+            yield 'network', {
+                'id': bssid.replace(':', ''),
+                'bssid': bssid,
+                'ssid': field('ESSID'),
+                'channel': channel,
+                'signal': signal_from_power(power),
+                'dbm': power,
+                'encryption': normalize_encryption(field('Encryption').split(',')),
+                'vendor': get_vendor_from_mac(bssid),
+                'clients': 0,
+                'beacons': _parse_int(field('Beacon')),
+                'firstSeen': _parse_kismet_time(field('FirstTime')),
+                'lastSeen': _parse_kismet_time(field('LastTime'))
+            }
+            yield 'packets', {channel: _parse_int(field('Total'))}
+
+def parse_kismet_csv(csv_file):
+    """Parse an airodump-ng ``.kismet.csv`` file (networks only)"""
+    try:
+        return [record for kind, record in iter_kismet_csv(csv_file) if kind == 'network'], []
+    except Exception as e:
+        print(f"Error parsing Kismet CSV: {str(e)}")
+        return [], []
+
+def _netxml_client(el, bssid, associated):
+    mac = (el.findtext('client-mac') or '').strip()
+    if not mac:
+        return None
+    # Probe requests carry one <SSID> block per probed network
+    probes = []
+    for ssid_el in el.findall('SSID'):
+        name = (ssid_el.findtext('ssid') or '').strip()
+        if name and name not in probes:
+            probes.append(name)
+
+    power = _parse_int(el.findtext('snr-info/last_signal_dbm'))
+    return {
+        'mac': mac,
+        'bssid': bssid if associated else '(not associated)',
+        'power': signal_from_power(power),
+        'dbm': power,
+        'rate': '0-0',
+        'lost': 0,
+        'frames': _parse_int(el.findtext('packets/total')),
+        'probe': probes,
+        'vendor': (el.findtext('client-manuf') or '').strip() or get_vendor_from_mac(mac),
+        'firstSeen': _parse_kismet_time(el.get('first-time')),
+        'lastSeen': _parse_kismet_time(el.get('last-time'))
+    }
+
+def _netxml_channel_packets(el, channel):
+    # One <freqmhz>FREQ PACKETS</freqmhz> per frequency the network was heard on
+    counts = {}
+    for freq_el in el.findall('freqmhz'):
+        try:
+            mhz, packets = (freq_el.text or '').split()
+            mhz, packets = int(mhz), int(packets)
+        except ValueError:
+            continue
+        heard_on = channel_from_freq(mhz) or channel
+        counts[heard_on] = counts.get(heard_on, 0) + packets
+    if not counts:
+        counts[channel] = _parse_int(el.findtext('packets/total'))
+    return counts
+
+def iter_kismet_netxml(xml_file):
+    """Yield network and client records from a ``.kismet.netxml`` file.
+
+    The document is read with ``iterparse`` and every ``<wireless-network>``
+    element is cleared once its records have been yielded, so memory stays
+    flat regardless of file size. Each network also yields a
+    ``('packets', {channel: count})`` pair from its ``<freqmhz>`` entries.
+    """
+    depth = 0
+    root = None
+    for event, el in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = el
+            if el.tag == 'wireless-network':
+                depth += 1
+            continue
+
+        # Only top level networks are records; skip nested copies
+        if el.tag != 'wireless-network':
+            continue
+        depth -= 1
+        if depth:
+            continue
+
+        bssid = (el.findtext('BSSID') or '').strip()
+        if bssid:
+            associated = el.get('type') != 'probe'
+            clients = []
+            for client_el in el.findall('wireless-client'):
+                client = _netxml_client(client_el, bssid, associated)
+                if client is not None:
+                    clients.append(client)
+
+            if associated:
+                ssid_el = el.find('SSID')
+                essid = ''
+                encryption = []
+                if ssid_el is not None:
+                    essid = (ssid_el.findtext('essid') or '').strip()
+                    encryption = [e.text or '' for e in ssid_el.findall('encryption')]
+
+                power = _parse_int(el.findtext('snr-info/last_signal_dbm'))
+                channel = _parse_int(el.findtext('channel'))
+                yield 'network', {
+                    'id': bssid.replace(':', ''),
+                    'bssid': bssid,
+                    'ssid': essid,
+                    'channel': channel,
+                    'signal': signal_from_power(power),
+                    'dbm': power,
+                    'encryption': normalize_encryption(encryption),
+                    'vendor': (el.findtext('manuf') or '').strip() or get_vendor_from_mac(bssid),
+                    'clients': len(clients),
+                    # airodump-ng writes its beacon count as the LLC packets
+                    'beacons': _parse_int(el.findtext('packets/LLC')),
+                    'firstSeen': _parse_kismet_time(el.get('first-time')),
+                    'lastSeen': _parse_kismet_time(el.get('last-time'))
+                }
+                yield 'packets', _netxml_channel_packets(el, channel)
+
+            for client in clients:
+                yield 'client', client
+
+        # Drop the finished network and anything the root still references
+        el.clear()
+        root.clear()
+
+def parse_kismet_netxml(xml_file):
+    """Parse an airodump-ng ``.kismet.netxml`` file"""
+    networks = []
+    clients = []
+    try:
+        for kind, record in iter_kismet_netxml(xml_file):
+            if kind == 'network':
+                networks.append(record)
+            elif kind == 'client':
+                clients.append(record)
+    except (ET.ParseError, OSError) as e:
+        print(f"Error parsing Kismet netxml: {str(e)}")
+        return [], []
+    return networks, clients
+
+def iter_airodump_csv(csv_file):
+    """Yield records from an airodump-ng CSV file.
+
+    airodump-ng rewrites the whole file every interval and it only holds one
+    line per device, so it is parsed in one go and then yielded.
+    """
+    networks, clients = parse_airodump_csv(csv_file)
+    for network in networks:
+        yield 'network', network
+    for client in clients:
+        yield 'client', client
+
+# (suffix, list parser, streaming parser, what the start of the file holds)
+CAPTURE_PARSERS = (
+    ('.kismet.netxml', parse_kismet_netxml, iter_kismet_netxml, b'<detection-run'),
+    ('.kismet.csv', parse_kismet_csv, iter_kismet_csv, b'BSSID;'),
+    ('.csv', parse_airodump_csv, iter_airodump_csv, b'BSSID, First time seen'),
+)
+
+# Enough to get past an XML prolog to the root element
+SNIFF_BYTES = 4096
+
+def _lookup_parser(path):
+    name = os.path.basename(path)
+    for entry in CAPTURE_PARSERS:
+        if name.endswith(entry[0]):
+            return entry
+    return None
+
+def capture_parser_for(path):
+    """Return the parser for a capture file name, or None if unsupported"""
+    entry = _lookup_parser(path)
+    return entry[1] if entry else None
+
+def capture_stream_for(path):
+    """Return the streaming parser for a capture file name, or None"""
+    entry = _lookup_parser(path)
+    return entry[2] if entry else None
+
+def sniff_capture(path):
+    """True if the file starts the way its capture format does, not just named so"""
+    entry = _lookup_parser(path)
+    if entry is None:
+        return False
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return False
+    return entry[3] in head
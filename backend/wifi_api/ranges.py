@@ -0,0 +1,240 @@
+
+# Streaming, HTTP Range and incremental reads of capture files
+#
+# Files are sent in fixed-size chunks instead of being read whole. Sealed
+# segments never change, so they are memory-mapped and chunks are sliced
+# straight out of the page cache. The live CSV is rewritten in place by
+# airodump-ng every second, and touching a mapped page past a shrunken end
+# of file raises SIGBUS, so it is read with pread() instead.
+#
+# ``?since=N&crc=C`` lets a client follow a file: if the FOLLOW_WINDOW bytes
+# before N still hash to C (the X-Content-CRC32 the client got with its copy),
+# only the bytes from N on are sent, as a 206 (204 if there are none).
+# Otherwise the whole file comes back with a 200. Only the window is hashed,
+# so a poll costs the same however long the file has grown.
+#
+# A live file can also shrink while it is sent. Its reads then stop short of
+# the declared Content-Length, and the response is aborted rather than
+# finished with a short body.
+#
+# Under ASGI, Django reads a synchronous streaming iterator to the end before
+# sending anything, so streamed bodies go through streaming_response(), which
+# hands ASGI an async iterator that pulls one chunk at a time.
+import codecs
+import io
+import json
+import mmap
+import os
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+CHUNK_BYTES = 256 * 1024
+FOLLOW_WINDOW = 64 * 1024
+
+
+_DONE = object()
+
+
+async def aiter_sync(chunks):
+    """Iterate a synchronous iterator from async code, one chunk per thread hop.
+
+    The calls share the request's thread, so an open database cursor or
+    file stays with one thread.
+    """
+    iterator = iter(chunks)
+    pull = sync_to_async(next)
+    try:
+        while True:
+            chunk = await pull(iterator, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, chunks, **kwargs):
+    """StreamingHttpResponse over ``chunks`` that streams under WSGI and ASGI alike."""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = aiter_sync(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+class ShortRead(OSError):
+    """The file shrank below the length promised to the client."""
+
+
+def parse_range(header, size):
+    """``(start, end)`` for a single ``bytes=`` range, end exclusive.
+
+    Returns None when the whole file should be sent (no header, or several
+    ranges, which are allowed to be ignored).
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[6:].strip()
+    if ',' in spec:
+        return None
+    first, _, last = spec.partition('-')
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - length), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size)
+
+
+def iter_mapped(f, start, end):
+    """Yield ``f[start:end]`` in chunks from a read-only mapping; closes ``f``."""
+    try:
+        if end <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(start, end, CHUNK_BYTES):
+                    yield bytes(view[offset:min(offset + CHUNK_BYTES, end)])
+            finally:
+                view.release()
+    finally:
+        f.close()
+
+
+def iter_read(f, start, end, close=True, exact=False):
+    """Yield ``f[start:end]`` in chunks with positional reads.
+
+    Stops early if the file shrinks under the reader, or raises ShortRead
+    if ``exact``.
+    """
+    try:
+        offset = start
+        while offset < end:
+            chunk = os.pread(f.fileno(), min(CHUNK_BYTES, end - offset), offset)
+            if not chunk:
+                if exact:
+                    raise ShortRead(f"file ended at {offset} of {end} bytes")
+                break
+            offset += len(chunk)
+            yield chunk
+    finally:
+        if close:
+            f.close()
+
+
+def file_crc(f, start, end, crc=0):
+    """CRC32 of ``f[start:end]`` continued from ``crc``, or None if ``f`` is shorter."""
+    read = 0
+    for chunk in iter_read(f, start, end, close=False):
+        crc = zlib.crc32(chunk, crc)
+        read += len(chunk)
+    return crc if read == end - start else None
+
+
+def tail_crc(f, end):
+    """CRC32 of the FOLLOW_WINDOW bytes before ``end``, or None if ``f`` is shorter."""
+    return file_crc(f, max(0, end - FOLLOW_WINDOW), end)
+
+
+def file_response(request, path, content_type, immutable=False):
+    """Stream ``path`` honouring Range, If-Range and ``?since=&crc=``.
+
+    The file is opened before returning, so a file removed afterwards is
+    still sent whole; a missing file raises FileNotFoundError.
+    """
+    f = open(path, 'rb')
+    try:
+        return _file_response(request, f, content_type, immutable)
+    except BaseException:
+        f.close()
+        raise
+
+
+def _file_response(request, f, content_type, immutable):
+    stat = os.fstat(f.fileno())
+    size = stat.st_size
+    etag = f'"{stat.st_ino:x}-{size:x}-{stat.st_mtime_ns:x}"'
+
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    # A range of an older version of the file is no use to the client
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range and if_range != etag:
+        byte_range = None
+
+    since = request.GET.get('since')
+    crc = None
+    if byte_range is None and since is not None:
+        try:
+            offset = int(since)
+            expected = int(request.GET.get('crc', ''))
+        except ValueError:
+            offset, expected = -1, None
+        if 0 <= offset <= size and tail_crc(f, offset) == expected:
+            byte_range = (offset, size)
+        crc = tail_crc(f, size)
+
+    start, end = byte_range or (0, size)
+    if byte_range and end == start:
+        # Following and nothing was added
+        f.close()
+        response = HttpResponse(status=204)
+    else:
+        if immutable:
+            chunks = iter_mapped(f, start, end)
+        else:
+            chunks = iter_read(f, start, end, exact=True)
+        response = streaming_response(request, chunks, content_type=content_type,
+                                      status=206 if byte_range else 200)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+        response['Content-Length'] = str(end - start)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['X-Content-Size'] = str(size)
+    if crc is not None:
+        # For the client's next ?since=&crc=
+        response['X-Content-CRC32'] = str(crc)
+    return response
+
+
+def iter_json_text(chunks, key):
+    """Wrap byte chunks of UTF-8 text as ``{key: "<text>"}``, chunk by chunk.
+
+    Newlines are translated as by ``open(path, 'r')``.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder('utf-8')(errors='replace'), translate=True
+    )
+    yield ('{%s: "' % json.dumps(key)).encode()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield json.dumps(text, ensure_ascii=False)[1:-1].encode()
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield json.dumps(text, ensure_ascii=False)[1:-1].encode()
+    yield b'"}'
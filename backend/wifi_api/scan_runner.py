@@ -0,0 +1,278 @@
+
+# Tails a running airodump-ng scan: parse, index, store, publish, checkpoint
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import parse_worker
+from .capture_store import get_capture_store
+from .checkpoints import ScanCheckpoint
+from .detection import record_alerts
+from .frame_ring import FrameRing
+from .groups import LIFECYCLE_GROUP, OVERVIEW_GROUP, publish, scan_group
+from .history import merge_observations
+from .hopping import adaptive_hopping_enabled, discoveries_by_channel, start_hopper
+from .models import RogueAlert, ScanSession
+from .parsers import parse_airodump_csv
+from .scan_state import get_scan_state
+from .shared_state import SnapshotWriter, frame_ring_path, get_scan_registry, scan_ownership
+
+
+def pid_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except OSError:
+        return False
+    # An exited child that its parent has not reaped yet still takes signals
+    try:
+        with open(f'/proc/{int(pid)}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def tail_scan(scan_id, session, output_file, is_running, resume=False):
+    """Follow one scan's CSV until its process exits.
+
+    Only the worker that wins the scan's ownership lock does any work.
+    With ``resume`` the live state is first restored from the scan's
+    checkpoint, so a restarted backend carries on where it stopped. With
+    ``SCAN_PARSE_WORKER`` the tick loop runs in a child process and this
+    thread only watches the airodump-ng process.
+    """
+    with scan_ownership(scan_id) as owned:
+        # Only one worker tails a scan; the others read its snapshot
+        if owned:
+            if settings.SCAN_PARSE_WORKER:
+                _tail_in_worker(scan_id, session, output_file, is_running, resume)
+            else:
+                tail_scan_here(scan_id, session, output_file, is_running, resume)
+    connection.close()
+
+
+def _tail_in_worker(scan_id, session, output_file, is_running, resume):
+    context = multiprocessing.get_context('spawn')
+    restarts = 0
+    while True:
+        stop = context.Event()
+        worker = context.Process(
+            target=parse_worker.run,
+            args=(settings.SETTINGS_MODULE, scan_id, str(session.pk), output_file, resume, stop),
+            name=f'scan-{scan_id}',
+            daemon=True,
+        )
+        worker.start()
+        while worker.is_alive():
+            if not is_running():
+                stop.set()
+            worker.join(1)
+
+        if not is_running() or restarts >= 5:
+            return
+        # The worker died or failed mid-scan: carry on from its checkpoint
+        print(f"Scan worker for {scan_id} exited with {worker.exitcode}, restarting")
+        restarts += 1
+        resume = True
+
+
+def _restore(scan_state, checkpoint, session):
+    started = time.perf_counter()
+    loaded = checkpoint.load()
+    if loaded is None:
+        return
+    generation, networks, clients = loaded
+    # Alerts raised before the restart must not fire again
+    raised = RogueAlert.objects.filter(session=session).values_list('rule', 'bssid')
+    scan_state.restore(generation, networks, clients, raised)
+    print(f"Resumed scan {scan_state.scan_id}: {len(networks)} networks, {len(clients)} clients "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def tail_scan_here(scan_id, session, output_file, is_running, resume=False, abandoned=None):
+    """The tick loop itself: parse, index, store, checkpoint and publish.
+
+    Stops when ``is_running()`` turns false, which also closes the scan out,
+    or when ``abandoned()`` turns true, which leaves it to be resumed.
+    Returns False if the loop failed, in which case the checkpoint is kept too.
+    """
+    failed = False
+    store = get_capture_store()
+    registry = get_scan_registry()
+    scan_state = get_scan_state(scan_id)
+    checkpoint = ScanCheckpoint(scan_id)
+    if resume:
+        _restore(scan_state, checkpoint, session)
+    else:
+        time.sleep(2)  # Wait for airodump to create the file
+    snapshot = SnapshotWriter(scan_id)
+    ring = FrameRing(frame_ring_path(scan_id), settings.SCAN_FRAME_RING_BYTES)
+    group = scan_group(scan_id)
+    # airodump-ng was started on a fixed channel; hop it from here
+    hopper = start_hopper(session.interface) if adaptive_hopping_enabled() else None
+
+    try:
+        while True:
+            # Check if process is still running
+            if not is_running() or (abandoned is not None and abandoned()):
+                break
+
+            # Read and parse CSV file
+            csv_file = f"{output_file}-01.csv"
+            if os.path.exists(csv_file):
+                store.maybe_rotate(csv_file, scan_id)
+                networks, clients = parse_airodump_csv(csv_file)
+                channels_version = scan_state.channels.version
+                delta = scan_state.update(networks, clients)
+                if hopper is not None:
+                    dwell = hopper.take_recent_dwell()
+                    if delta:
+                        hopper.scheduler.record_discoveries(
+                            discoveries_by_channel(delta, scan_state.networks, dwell)
+                        )
+                if delta:
+                    checkpoint.record(scan_state, delta)
+                    snapshot.write(scan_state.generation, json.dumps({
+                        "networks": networks,
+                        "clients": clients
+                    }).encode())
+                merge_observations(session, networks, clients)
+                alerts = record_alerts(session, delta.alerts) if delta.alerts else []
+
+                # Send updates via WebSocket: encoded once here, and sockets
+                # only copy the frame out of the ring
+                frame = json.dumps({'type': 'scan_update', 'scanId': scan_id, 'networks': networks}).encode()
+                if ring.fits(frame):
+                    seq, offset, length = ring.write(frame)
+                    event = {
+                        "type": "scan_frame",
+                        "scanId": scan_id,
+                        "seq": seq,
+                        "offset": offset,
+                        "length": length
+                    }
+                else:
+                    event = {
+                        "type": "scan_update",
+                        "scanId": scan_id,
+                        "networks": networks,
+                        "clients": clients
+                    }
+                publish(group, event)
+
+                # Channel aggregates go out separately and only when they move
+                if scan_state.channels.version != channels_version:
+                    publish(group, {
+                        "type": "channel_update",
+                        "scanId": scan_id,
+                        "summary": scan_state.channel_summary()
+                    })
+
+                # Suspected rogue APs get their own message type
+                if alerts:
+                    publish(group, {
+                        "type": "rogue_alert",
+                        "scanId": scan_id,
+                        "alerts": alerts
+                    })
+
+                # Only counts go to the overview, for dashboards of all scans
+                if delta:
+                    publish(OVERVIEW_GROUP, {
+                        "type": "scan_overview",
+                        "scanId": scan_id,
+                        "generation": scan_state.generation,
+                        "networks": len(networks),
+                        "clients": len(clients),
+                        "newAlerts": len(alerts)
+                    })
+
+            time.sleep(1)  # Update interval
+    except Exception as e:
+        print(f"Error in CSV processing thread: {str(e)}")
+        failed = True
+    finally:
+        if hopper is not None:
+            hopper.stop()
+        snapshot.close()
+        ring.close()
+        if not is_running() and not failed:
+            # Seal the final snapshot and clear the live files
+            store.finish(output_file, scan_id)
+            ScanSession.objects.filter(pk=session.pk).update(is_active=False)
+            registry.clear(scan_id)
+            checkpoint.discard()
+            publish(LIFECYCLE_GROUP, {"type": "scan_stopped", "scanId": scan_id})
+        else:
+            # Keep the checkpoint so the next owner can resume from it
+            checkpoint.close()
+    return not failed
+
+
+def adopt_scan():
+    """Take over the scan recorded in the registry, if it needs an owner.
+
+    A scan whose airodump-ng process is still alive is resumed from its
+    checkpoint if this worker wins its ownership lock, and tailed on the
+    calling thread until it stops or the process exits. One that died while
+    nobody was watching is closed out. Returns without doing anything when
+    another worker owns the scan.
+    """
+    registry = get_scan_registry()
+    scan = registry.current()
+    if not scan:
+        return
+
+    session = ScanSession.objects.filter(pk=scan['sessionId']).first()
+    output_file = scan['outputFile'][:-len('-01.csv')]
+    if session is None:
+        registry.clear(scan['scanId'])
+        return
+
+    if not pid_alive(scan['pid']):
+        with scan_ownership(scan['scanId']) as owned:
+            if owned:
+                get_capture_store().finish(output_file, scan['scanId'])
+                ScanSession.objects.filter(pk=session.pk).update(is_active=False)
+                registry.clear(scan['scanId'])
+                ScanCheckpoint(scan['scanId']).discard()
+                publish(LIFECYCLE_GROUP, {"type": "scan_stopped", "scanId": scan['scanId']})
+        connection.close()
+        return
+
+    tail_scan(scan['scanId'], session, output_file, lambda: pid_alive(scan['pid']), resume=True)
+
+
+def watch_scans(interval=2.0):
+    """Keep trying to adopt the running scan, so a worker takes over when its owner dies.
+
+    The owner's flock is released by the kernel when it exits; the next
+    attempt in a surviving worker then wins it and resumes the scan from its
+    checkpoint. Runs forever; start it on a daemon thread.
+    """
+    while True:
+        try:
+            adopt_scan()
+        except Exception as e:
+            print(f"Error adopting scan: {str(e)}")
+            connection.close()
+        time.sleep(interval)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_scan_watcher(interval=2.0):
+    """Start this process's scan watcher thread once."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch_scans, args=(interval,),
+                                        name='scan-watcher', daemon=True)
+            _watcher.start()
+        return _watcher
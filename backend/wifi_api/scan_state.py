@@ -0,0 +1,133 @@
+
+# Live scan state: keeps the latest records of each running scan and turns
+# every parsed snapshot into a delta for the incremental indexes
+import threading
+
+from .aggregates import ChannelAggregates
+from .detection import RogueDetector
+from .filters import FilterIndex
+from .search import SearchIndex
+from .smoothing import SignalSmoother
+
+
+class ScanDelta:
+    """Records that appeared, changed or disappeared between two ticks.
+
+    ``changed_*`` hold ``(old, new)`` pairs; ``removed_*`` hold the last
+    known record. ``alerts`` lists what the rogue AP rules raised this tick.
+    """
+
+    def __init__(self):
+        self.added_networks = []
+        self.changed_networks = []
+        self.removed_networks = []
+        self.added_clients = []
+        self.changed_clients = []
+        self.removed_clients = []
+        self.alerts = []
+
+    def __bool__(self):
+        return any((
+            self.added_networks, self.changed_networks, self.removed_networks,
+            self.added_clients, self.changed_clients, self.removed_clients,
+        ))
+
+
+def _diff(previous, records, key):
+    current = {}
+    added, changed = [], []
+    for record in records:
+        record_key = record[key]
+        current[record_key] = record
+        old = previous.get(record_key)
+        if old is None:
+            added.append(record)
+        elif old != record:
+            changed.append((old, record))
+    removed = [old for record_key, old in previous.items() if record_key not in current]
+    return current, added, changed, removed
+
+
+class LiveScanState:
+    def __init__(self, scan_id, detect=True, smooth=True):
+        self.scan_id = scan_id
+        self.networks = {}
+        self.clients = {}
+        # Bumped whenever a tick changes anything
+        self.generation = 0
+        self.search = SearchIndex()
+        self.channels = ChannelAggregates()
+        self.filter_index = FilterIndex()
+        # Mirrors in non-owner workers leave alerting to the owner
+        self.detector = RogueDetector() if detect else None
+        # Mirrors get records already smoothed by the owner
+        self.smoother = SignalSmoother() if smooth else None
+        # Held while a delta is applied; readers of the indexes take it too
+        self.lock = threading.Lock()
+
+    def channel_summary(self):
+        with self.lock:
+            return self.channels.summary()
+
+    def restore(self, generation, networks, clients, raised=()):
+        """Rebuild the state and its indexes from a checkpoint.
+
+        Checkpointed records already carry their smoothed values, and their
+        alerts were handled before the restart, so the smoother and the
+        detector are seeded from them rather than run over them again.
+        """
+        if self.smoother is not None:
+            self.smoother.seed(networks, clients)
+        delta = self._apply(networks, clients, detect=False)
+        with self.lock:
+            if self.detector is not None:
+                self.detector.seed(self.networks.values(), raised)
+            self.generation = generation
+        return delta
+
+    def update(self, networks, clients):
+        """Apply a freshly parsed snapshot and return what changed."""
+        if self.smoother is not None:
+            self.smoother.apply(networks, clients)
+        return self._apply(networks, clients)
+
+    def _apply(self, networks, clients, detect=True):
+        delta = ScanDelta()
+        with self.lock:
+            (self.networks, delta.added_networks,
+             delta.changed_networks, delta.removed_networks) = _diff(self.networks, networks, 'bssid')
+            (self.clients, delta.added_clients,
+             delta.changed_clients, delta.removed_clients) = _diff(self.clients, clients, 'mac')
+            if delta:
+                self.generation += 1
+                self.search.apply(delta)
+                self.channels.apply(delta)
+                self.filter_index.apply(delta)
+                if self.detector is not None and detect:
+                    delta.alerts = self.detector.apply(delta)
+        return delta
+
+
+# Finished scans stay queryable until this many newer scans have started
+MAX_SCAN_STATES = 8
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_scan_state(scan_id, create=True):
+    with _states_lock:
+        state = _states.get(scan_id)
+        if state is None and create:
+            state = _states[scan_id] = LiveScanState(scan_id)
+            while len(_states) > MAX_SCAN_STATES:
+                del _states[next(iter(_states))]
+        return state
+
+
+def latest_scan_state():
+    """Return the most recently started scan's state, if any."""
+    with _states_lock:
+        if not _states:
+            return None
+        return next(reversed(_states.values()))
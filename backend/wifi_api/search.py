@@ -0,0 +1,183 @@
+
+# Incremental inverted index over SSIDs and client probe lists
+import heapq
+import threading
+
+# Substrings and prefixes up to this long are indexed directly; longer
+# queries intersect the postings of their trigrams
+GRAM = 3
+
+
+def _grams(term):
+    """Every substring of ``term`` of length 1 to GRAM."""
+    return {term[i:i + n] for n in range(1, GRAM + 1) for i in range(len(term) - n + 1)}
+
+
+def _heads(term):
+    return {term[:n] for n in range(1, min(len(term), GRAM) + 1)}
+
+
+class _TermIndex:
+    """Maps terms to sets of MACs, with prefix and substring lookup.
+
+    Exact lookups are one dict access. Every lowercased term is also filed
+    under its prefixes and substrings of up to three characters, so prefix
+    and short substring lookups are one dict access as well. Longer
+    substrings intersect the posting sets of the query's trigrams and verify
+    the few surviving candidates. Adding or removing a term touches only its
+    own entries.
+    """
+
+    def __init__(self):
+        self.postings = {}      # term -> set of MACs
+        self._folded = {}       # lowercased term -> set of terms
+        self._heads = {}        # prefix -> set of lowercased terms
+        self._grams = {}        # substring -> set of lowercased terms
+
+    def add(self, term, mac):
+        macs = self.postings.get(term)
+        if macs is None:
+            macs = self.postings[term] = set()
+            self._add_term(term)
+        macs.add(mac)
+
+    def remove(self, term, mac):
+        macs = self.postings.get(term)
+        if macs is None:
+            return
+        macs.discard(mac)
+        if not macs:
+            del self.postings[term]
+            self._remove_term(term)
+
+    def _add_term(self, term):
+        folded = term.lower()
+        variants = self._folded.get(folded)
+        if variants is None:
+            variants = self._folded[folded] = set()
+            for table, keys in ((self._heads, _heads(folded)), (self._grams, _grams(folded))):
+                for key in keys:
+                    table.setdefault(key, set()).add(folded)
+        variants.add(term)
+
+    def _remove_term(self, term):
+        folded = term.lower()
+        variants = self._folded[folded]
+        variants.discard(term)
+        if variants:
+            return
+        del self._folded[folded]
+        for table, keys in ((self._heads, _heads(folded)), (self._grams, _grams(folded))):
+            for key in keys:
+                terms = table[key]
+                terms.discard(folded)
+                if not terms:
+                    del table[key]
+
+    def exact(self, query):
+        folded = query.lower()
+        return self._folded.get(folded, set())
+
+    def prefix(self, query, limit):
+        folded = query.lower()
+        candidates = self._heads.get(folded[:GRAM], ()) if folded else self._folded
+        if len(folded) > GRAM:
+            candidates = (c for c in candidates if c.startswith(folded))
+        # The alphabetically first matches, as a sorted term list would give
+        matches = set()
+        for candidate in heapq.nsmallest(limit, candidates):
+            matches |= self._folded[candidate]
+        return matches
+
+    def substring(self, query, limit):
+        folded = query.lower()
+        if not folded:
+            candidates = self._folded
+        elif len(folded) <= GRAM:
+            candidates = self._grams.get(folded, ())
+        else:
+            grams = sorted(
+                {folded[i:i + GRAM] for i in range(len(folded) - GRAM + 1)},
+                key=lambda g: len(self._grams.get(g, ())),
+            )
+            candidates = set(self._grams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self._grams.get(gram, set())
+
+        matches = set()
+        for candidate in candidates:
+            if folded in candidate:
+                matches |= self._folded[candidate]
+                if len(matches) >= limit:
+                    break
+        return matches
+
+
+class SearchIndex:
+    """SSID -> BSSIDs and probed SSID -> stations, kept current per tick."""
+
+    MODES = ('exact', 'prefix', 'substring')
+
+    def __init__(self):
+        self.ssids = _TermIndex()
+        self.probes = _TermIndex()
+        self._lock = threading.Lock()
+
+    def apply(self, delta):
+        with self._lock:
+            for network in delta.added_networks:
+                self._add_network(network)
+            for old, new in delta.changed_networks:
+                if old['ssid'] != new['ssid']:
+                    self._remove_network(old)
+                    self._add_network(new)
+            for network in delta.removed_networks:
+                self._remove_network(network)
+
+            for client in delta.added_clients:
+                self._set_probes(client['mac'], (), client.get('probe', ()))
+            for old, new in delta.changed_clients:
+                self._set_probes(new['mac'], old.get('probe', ()), new.get('probe', ()))
+            for client in delta.removed_clients:
+                self._set_probes(client['mac'], client.get('probe', ()), ())
+
+    def _add_network(self, network):
+        if network['ssid']:
+            self.ssids.add(network['ssid'], network['bssid'])
+
+    def _remove_network(self, network):
+        if network['ssid']:
+            self.ssids.remove(network['ssid'], network['bssid'])
+
+    def _set_probes(self, mac, old_probes, new_probes):
+        old_probes, new_probes = set(old_probes), set(new_probes)
+        for probe in old_probes - new_probes:
+            self.probes.remove(probe, mac)
+        for probe in new_probes - old_probes:
+            self.probes.add(probe, mac)
+
+    def ssids_containing(self, text):
+        """Return ``{ssid: set of BSSIDs}`` for every SSID containing ``text``."""
+        with self._lock:
+            terms = self.ssids.substring(text, limit=len(self.ssids.postings) + 1)
+            return {term: set(self.ssids.postings[term]) for term in terms}
+
+    def search(self, query, mode='substring', kinds=('ssid', 'probe'), limit=100):
+        """Return ``{"ssids": {ssid: [bssid]}, "probes": {ssid: [mac]}}``."""
+        result = {}
+        with self._lock:
+            for kind, index in (('ssid', self.ssids), ('probe', self.probes)):
+                if kind not in kinds:
+                    continue
+                if mode == 'exact':
+                    terms = index.exact(query)
+                elif mode == 'prefix':
+                    terms = index.prefix(query, limit)
+                else:
+                    terms = index.substring(query, limit)
+                result[kind + 's'] = {
+                    term: sorted(index.postings[term]) for term in sorted(terms)[:limit]
+                }
+        return result
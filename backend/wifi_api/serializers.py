@@ -39,6 +39,44 @@ class ScanResultSerializer(serializers.Serializer):
 class MonitorModeSerializer(serializers.Serializer):
     interface = serializers.CharField()
 
+class InterfaceConfigSerializer(serializers.Serializer):
+    interface = serializers.CharField()
+    mode = serializers.ChoiceField(choices=['managed', 'monitor'])
+    channel = serializers.IntegerField(required=False, min_value=1, max_value=177)
+
+class InterfaceBatchSerializer(serializers.Serializer):
+    interfaces = InterfaceConfigSerializer(many=True, allow_empty=False)
+
+    def validate_interfaces(self, value):
+        names = [config['interface'] for config in value]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError("Each interface may only be listed once")
+        return value
+
+class WaypointSerializer(serializers.Serializer):
+    # Floor-plan meters, or a GPS position
+    x = serializers.FloatField(required=False)
+    y = serializers.FloatField(required=False)
+    lat = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    lon = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    timestamp = serializers.FloatField(required=False)
+
+    def validate(self, data):
+        plan = 'x' in data and 'y' in data
+        gps = 'lat' in data and 'lon' in data
+        if plan == gps:
+            raise serializers.ValidationError("Give either x and y or lat and lon")
+        return data
+
+class LocationBatchSerializer(serializers.Serializer):
+    waypoints = WaypointSerializer(many=True, required=False)
+    log = serializers.CharField(required=False)
+
+    def validate(self, data):
+        if not data.get('waypoints') and not data.get('log'):
+            raise serializers.ValidationError("Give waypoints or a GPS log")
+        return data
+
 class DeauthAttackSerializer(serializers.Serializer):
     bssid = serializers.CharField()
     clientMac = serializers.CharField(allow_blank=True, required=False)
@@ -0,0 +1,308 @@
+
+# Cross-worker scan coordination for multi-process ASGI deployments
+#
+# With several uvicorn/daphne workers, only one process may tail a scan's CSV.
+# That owner publishes each tick into an mmap-backed snapshot file, and the
+# other workers answer REST queries from it without reparsing anything.
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .frame_ring import FrameRing
+from .scan_state import MAX_SCAN_STATES, LiveScanState, get_scan_state, latest_scan_state
+
+
+def runtime_path(*parts):
+    path = os.path.join(str(settings.SCAN_RUNTIME_DIR), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+class ScanRegistry:
+    """The running scan, as every worker sees it.
+
+    A small JSON file replaced atomically on each write, with writers
+    serialized by an flock. ``revision`` grows on every write, so it works as
+    a status version that is the same in all workers; ``boot`` changes when
+    the runtime directory is recreated (e.g. /dev/shm after a reboot).
+    """
+
+    def __init__(self):
+        self.path = runtime_path('scan.json')
+        self._lock_path = runtime_path('scan.lock')
+
+    def snapshot(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'revision': 0, 'modified': 0, 'boot': '', 'scan': None}
+
+    def current(self):
+        return self.snapshot()['scan']
+
+    def _write(self, update):
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self.snapshot()
+            scan = update(state['scan'])
+            if scan is state['scan'] and state['boot']:
+                return state
+            state = {
+                'revision': state['revision'] + 1,
+                'modified': time.time(),
+                'boot': state['boot'] or uuid.uuid4().hex[:8],
+                'scan': scan,
+            }
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+            return state
+
+    def start(self, scan_id, pid, output_file, session_id):
+        return self._write(lambda scan: {
+            'scanId': scan_id,
+            'pid': pid,
+            'outputFile': output_file,
+            'sessionId': session_id,
+            'ownerPid': os.getpid(),
+            'startedAt': time.time(),
+        })
+
+    def clear(self, scan_id=None):
+        """Forget the running scan (only if it is still ``scan_id``, when given)."""
+        return self._write(
+            lambda scan: None if scan and (scan_id is None or scan['scanId'] == scan_id) else scan
+        )
+
+
+@contextmanager
+def scan_ownership(scan_id):
+    """Yield True if this process won the right to tail ``scan_id``.
+
+    The flock is released by the kernel if the owner dies, so another
+    worker's scan watcher can take over the scan without any cleanup.
+    """
+    fd = os.open(runtime_path('owners', f'{scan_id}.lock'), os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+# magic, sequence, generation, payload length
+SNAPSHOT_HEADER = struct.Struct('<4sQQQ')
+SNAPSHOT_MAGIC = b'WSS1'
+SNAPSHOT_MIN_BYTES = 256 * 1024
+
+
+def _snapshot_path(scan_id):
+    return runtime_path('snapshots', f'{scan_id}.snap')
+
+
+class SnapshotWriter:
+    """Publishes one scan's latest records through a shared mmap (seqlock).
+
+    The sequence number is odd while a write is in progress; readers retry
+    until they see the same even number before and after copying. When a
+    snapshot outgrows the mapping, a bigger file is swapped in with
+    ``os.replace`` and readers remap on the inode change.
+    """
+
+    def __init__(self, scan_id):
+        self.path = _snapshot_path(scan_id)
+        self._map = None
+        self._sequence = 0
+        _prune_snapshots()
+
+    def write(self, generation, payload):
+        needed = SNAPSHOT_HEADER.size + len(payload)
+        if self._map is None or needed > len(self._map):
+            self._grow(generation, payload, needed)
+            return
+        self._sequence += 1
+        SNAPSHOT_HEADER.pack_into(self._map, 0, SNAPSHOT_MAGIC, self._sequence, generation, len(payload))
+        self._map[SNAPSHOT_HEADER.size:needed] = payload
+        self._sequence += 1
+        SNAPSHOT_HEADER.pack_into(self._map, 0, SNAPSHOT_MAGIC, self._sequence, generation, len(payload))
+
+    def _grow(self, generation, payload, needed):
+        capacity = max(SNAPSHOT_MIN_BYTES, needed * 2)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w+b') as f:
+            f.truncate(capacity)
+            new_map = mmap.mmap(f.fileno(), capacity)
+        self._sequence += 2
+        SNAPSHOT_HEADER.pack_into(new_map, 0, SNAPSHOT_MAGIC, self._sequence, generation, len(payload))
+        new_map[SNAPSHOT_HEADER.size:needed] = payload
+        os.replace(tmp, self.path)
+        if self._map is not None:
+            self._map.close()
+        self._map = new_map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class SnapshotReader:
+    """Reads a scan snapshot published by another worker."""
+
+    RETRIES = 1000
+
+    def __init__(self, scan_id):
+        self.path = _snapshot_path(scan_id)
+        self._map = None
+        self._inode = None
+
+    def _remap(self):
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode != self._inode:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = inode
+        return True
+
+    def read(self, known_generation=None):
+        """Return ``(generation, payload)``, or None if nothing is published.
+
+        ``payload`` is None when the generation equals ``known_generation``,
+        so an unchanged snapshot is never copied.
+        """
+        if not self._remap():
+            return None
+        for _ in range(self.RETRIES):
+            magic, sequence, generation, length = SNAPSHOT_HEADER.unpack_from(self._map, 0)
+            if magic != SNAPSHOT_MAGIC:
+                return None
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            payload = None
+            if generation != known_generation:
+                payload = self._map[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + length]
+            if SNAPSHOT_HEADER.unpack_from(self._map, 0)[1] == sequence:
+                return generation, payload
+        return None
+
+
+def _snapshot_ids():
+    try:
+        names = os.listdir(os.path.dirname(_snapshot_path('x')))
+    except FileNotFoundError:
+        return []
+    # Scan ids are timestamps, so names sort oldest first
+    return sorted(name[:-5] for name in names if name.endswith('.snap'))
+
+
+def frame_ring_path(scan_id):
+    return runtime_path('rings', f'{scan_id}.ring')
+
+
+def _prune_snapshots():
+    # Owner lock files are never removed: a process that opened the old file
+    # could still lock it while another locks a new one at the same path
+    for scan_id in _snapshot_ids()[:-MAX_SCAN_STATES]:
+        for path in (_snapshot_path(scan_id), frame_ring_path(scan_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# scan id -> [reader, mirrored state, shared generation it reflects]
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+
+def scan_state_for(scan_id=None):
+    """Return the indexed state of ``scan_id`` (default: newest scan) in any worker.
+
+    The owning worker answers from its live state. Others keep a mirror that
+    is brought up to date from the shared snapshot when its generation moves.
+    """
+    if scan_id is None:
+        ids = _snapshot_ids()
+        if not ids:
+            return latest_scan_state()
+        scan_id = ids[-1]
+
+    state = get_scan_state(scan_id, create=False)
+    if state is not None:
+        return state
+
+    with _mirrors_lock:
+        mirror = _mirrors.get(scan_id)
+        if mirror is None:
+            mirror = _mirrors[scan_id] = [SnapshotReader(scan_id), LiveScanState(scan_id, detect=False, smooth=False), None]
+            while len(_mirrors) > MAX_SCAN_STATES:
+                del _mirrors[next(iter(_mirrors))]
+        reader, state, known = mirror
+        published = reader.read(known)
+        if published is None:
+            return None if known is None else state
+        generation, payload = published
+        if payload is not None:
+            snapshot = json.loads(payload)
+            state.update(snapshot['networks'], snapshot['clients'])
+            mirror[2] = generation
+        return state
+
+
+# scan id -> reader's view of that scan's frame ring
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+def read_frame(scan_id, seq, offset, length):
+    """Copy one pre-encoded WebSocket frame out of a scan's ring.
+
+    Returns None if the ring is gone or the frame was already overwritten.
+    """
+    with _rings_lock:
+        ring = _rings.get(scan_id)
+        if ring is not None and ring.replaced():
+            ring.close()
+            ring = None
+        if ring is None:
+            try:
+                ring = _rings[scan_id] = FrameRing(frame_ring_path(scan_id))
+            except (FileNotFoundError, ValueError):
+                _rings.pop(scan_id, None)
+                return None
+            while len(_rings) > MAX_SCAN_STATES:
+                _rings.pop(next(iter(_rings))).close()
+        return ring.read(seq, offset, length)
+
+
+_registry = None
+
+
+def get_scan_registry():
+    global _registry
+    if _registry is None:
+        _registry = ScanRegistry()
+    return _registry
@@ -0,0 +1,233 @@
+# Per-device signal smoothing and trend estimation for the live scan
+#
+# airodump-ng reports one noisy power reading per device per CSV rewrite.
+# Every tick, the devices with a new reading are filtered together: their
+# state lives in parallel arrays indexed by a per-device slot, and one step
+# of a constant-velocity Kalman filter (or Holt's double exponential
+# smoothing) is applied to all of them at once. The level is the smoothed
+# dBm and the velocity its slope, positive while a device gets closer.
+import math
+
+from django.conf import settings
+
+from .parsers import signal_from_power
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; the same steps run per device without it
+    numpy = None
+
+# airodump-ng writes -1 when it has no reading for a device
+NO_READING = -1
+
+# What apply() writes into every record; None until a device has a reading
+ANNOTATIONS = ('smoothedDbm', 'smoothedSignal', 'trend', 'motion')
+NO_ANNOTATION = dict.fromkeys(ANNOTATIONS)
+
+
+def _kalman_step(level, slope, p00, p01, p11, dt, z, q, r):
+    """One predict/update step; works elementwise on scalars or arrays."""
+    # Predict with white-noise acceleration of spectral density q
+    level = level + slope * dt
+    p00 = p00 + dt * (2 * p01 + dt * p11) + q * dt * dt * dt / 3
+    p01 = p01 + dt * p11 + q * dt * dt / 2
+    p11 = p11 + q * dt
+    # Update with the reading z of variance r
+    s = p00 + r
+    k0 = p00 / s
+    k1 = p01 / s
+    innovation = z - level
+    return (level + k0 * innovation, slope + k1 * innovation,
+            (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01)
+
+
+def _holt_step(level, slope, dt, z, tau, exp):
+    """Holt's linear smoothing with a time constant of ``tau`` seconds."""
+    alpha = 1 - exp(-dt / tau)
+    new_level = alpha * z + (1 - alpha) * (level + slope * dt)
+    return new_level, alpha * (new_level - level) / dt + (1 - alpha) * slope
+
+
+class SignalSmoother:
+    """Smoothed dBm and slope for every device of one scan.
+
+    ``apply()`` takes a tick's freshly parsed records, steps the filter for
+    devices whose ``lastSeen`` advanced, and writes ``smoothedDbm``,
+    ``smoothedSignal``, ``trend`` (dB per second) and ``motion`` into every
+    record. Devices without a new reading keep the values of their last one,
+    so unchanged records still compare equal to the previous tick's; devices
+    that never had one get None.
+    """
+
+    FIELDS = ('level', 'slope', 'p00', 'p01', 'p11', 'seen')
+    MOTIONS = ('receding', 'steady', 'approaching')
+
+    def __init__(self, method=None, vectorized=None):
+        config = settings.SIGNAL_SMOOTHING
+        self.method = method or config['METHOD']
+        if self.method not in ('kalman', 'ewma'):
+            raise ValueError(f"Unknown smoothing method {self.method}")
+        self.process_noise = config['PROCESS_NOISE']
+        self.reading_noise = config['READING_NOISE']
+        self.ewma_seconds = config['EWMA_SECONDS']
+        self.motion_threshold = config['MOTION_THRESHOLD']
+        self.vectorized = numpy is not None if vectorized is None else vectorized
+        # kind -> {bssid or mac: slot}
+        self.slots = {'network': {}, 'client': {}}
+        self.size = 0
+        if self.vectorized:
+            self.state = {name: numpy.zeros(64) for name in self.FIELDS}
+        else:
+            self.state = {name: [] for name in self.FIELDS}
+        # slot -> annotation of its last reading
+        self.annotations = []
+
+    def _grow(self):
+        slot = self.size
+        self.size += 1
+        self.annotations.append(None)
+        if self.vectorized:
+            if self.size > len(self.state['level']):
+                for name, values in self.state.items():
+                    grown = numpy.zeros(2 * len(values))
+                    grown[:len(values)] = values
+                    self.state[name] = grown
+        else:
+            for values in self.state.values():
+                values.append(0.0)
+        return slot
+
+    def apply(self, networks, clients):
+        """Annotate this tick's records in place."""
+        slots, readings, new = [], [], []
+        for kind, records, field in (('network', networks, 'bssid'), ('client', clients, 'mac')):
+            known = self.slots[kind]
+            for record in records:
+                slot = known.get(record[field])
+                if record.get('dbm', NO_READING) >= NO_READING:
+                    # No reading this tick: keep the last annotation
+                    annotation = self.annotations[slot] if slot is not None else None
+                    record.update(annotation or NO_ANNOTATION)
+                    continue
+                if slot is None:
+                    slot = known[record[field]] = self._grow()
+                    new.append((slot, record))
+                slots.append(slot)
+                readings.append(record)
+
+        for slot, record in new:
+            # ``seen`` is left behind ``lastSeen`` so this tick's step
+            # annotates the device
+            self._start(slot, record['dbm'], 0.0, record['lastSeen'] - 1)
+        if self.vectorized:
+            updated = self._step_arrays(slots, readings)
+        else:
+            updated = self._step_lists(slots, readings)
+        if len(updated):
+            self._annotate(updated)
+
+        annotations = self.annotations
+        for slot, record in zip(slots, readings):
+            record.update(annotations[slot])
+
+    def seed(self, networks, clients):
+        """Take over the estimates checkpointed records carry, without a step."""
+        for kind, records, field in (('network', networks, 'bssid'), ('client', clients, 'mac')):
+            known = self.slots[kind]
+            for record in records:
+                if record.get('smoothedDbm') is None or record[field] in known:
+                    continue
+                slot = known[record[field]] = self._grow()
+                self._start(slot, record['smoothedDbm'], record['trend'], record['lastSeen'])
+                self.annotations[slot] = {name: record[name] for name in ANNOTATIONS}
+
+    def _start(self, slot, level, slope, seen):
+        state = self.state
+        state['level'][slot] = level
+        state['slope'][slot] = slope
+        state['p00'][slot] = self.reading_noise
+        state['p01'][slot] = 0.0
+        state['p11'][slot] = 1.0
+        state['seen'][slot] = seen
+
+    def _step_arrays(self, slots, readings):
+        """Step every device with a newer reading; return the updated slots."""
+        count = len(slots)
+        if not count:
+            return []
+        index = numpy.fromiter(slots, dtype=numpy.intp, count=count)
+        seen = numpy.fromiter((record['lastSeen'] for record in readings), dtype=float, count=count)
+        state = self.state
+        fresh = seen > state['seen'][index]
+        if not fresh.any():
+            return []
+        if not fresh.all():
+            index = index[fresh]
+            seen = seen[fresh]
+            readings = [record for record, keep in zip(readings, fresh.tolist()) if keep]
+        z = numpy.fromiter((record['dbm'] for record in readings), dtype=float, count=len(index))
+        dt = seen - state['seen'][index]
+        if self.method == 'kalman':
+            results = _kalman_step(
+                state['level'][index], state['slope'][index],
+                state['p00'][index], state['p01'][index], state['p11'][index],
+                dt, z, self.process_noise, self.reading_noise,
+            )
+            names = ('level', 'slope', 'p00', 'p01', 'p11')
+        else:
+            results = _holt_step(state['level'][index], state['slope'][index],
+                                 dt, z, self.ewma_seconds, numpy.exp)
+            names = ('level', 'slope')
+        for name, values in zip(names, results):
+            state[name][index] = values
+        state['seen'][index] = seen
+        return index
+
+    def _step_lists(self, slots, readings):
+        state = self.state
+        level, slope, p00, p01, p11, seen = (state[name] for name in self.FIELDS)
+        updated = []
+        for slot, record in zip(slots, readings):
+            dt = record['lastSeen'] - seen[slot]
+            if dt <= 0:
+                continue
+            if self.method == 'kalman':
+                (level[slot], slope[slot], p00[slot], p01[slot], p11[slot]) = _kalman_step(
+                    level[slot], slope[slot], p00[slot], p01[slot], p11[slot],
+                    dt, record['dbm'], self.process_noise, self.reading_noise,
+                )
+            else:
+                level[slot], slope[slot] = _holt_step(
+                    level[slot], slope[slot], dt, record['dbm'], self.ewma_seconds, math.exp
+                )
+            seen[slot] = record['lastSeen']
+            updated.append(slot)
+        return updated
+
+    def _annotate(self, slots):
+        threshold = self.motion_threshold
+        if self.vectorized:
+            levels = self.state['level'][slots]
+            slopes = self.state['slope'][slots]
+            # Same mapping as signal_from_power: 0 for a level of 0 dBm or more
+            signals = numpy.where(levels < 0, numpy.clip(((100 + levels) * 2).astype(int), 0, 100), 0)
+            motions = (slopes > threshold).astype(int) - (slopes < -threshold) + 1
+            rows = zip(slots.tolist(), numpy.round(levels, 1).tolist(),
+                       signals.tolist(), numpy.round(slopes, 2).tolist(), motions.tolist())
+        else:
+            rows = []
+            for slot in slots:
+                level = self.state['level'][slot]
+                slope = self.state['slope'][slot]
+                motion = 2 if slope > threshold else 0 if slope < -threshold else 1
+                rows.append((slot, round(level, 1), signal_from_power(level), round(slope, 2), motion))
+
+        annotations = self.annotations
+        motions = self.MOTIONS
+        for slot, level, signal, slope, motion in rows:
+            annotations[slot] = {
+                'smoothedDbm': level,
+                'smoothedSignal': signal,
+                'trend': slope,
+                'motion': motions[motion],
+            }
@@ -0,0 +1,386 @@
+
+# Geotagged surveys: position fixes joined to signal samples, per-device
+# spatial grids and interpolated heatmap tiles
+#
+# Fixes come from a recorded GPS log (NMEA sentences or gpsd JSON) or from
+# waypoints posted while walking a floor plan. GPS fixes are projected to
+# meters around the session's first fix, so both frames are handled the same
+# from there: each signal sample is placed on the track by interpolating
+# between the fixes around it, and binned into a grid of square cells.
+# Heatmaps are built from the binned cells, never from raw samples, so tile
+# generation scales with the surveyed area rather than the sample count.
+import calendar
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+
+from .observations import get_observation_store
+
+FRAMES = ('gps', 'plan')
+
+# Interpolation radius limit, in output cells
+MAX_REACH_CELLS = 16
+
+# Meters per degree of latitude, and of longitude at the equator
+METERS_PER_DEG_LAT = 110540.0
+METERS_PER_DEG_LON = 111320.0
+
+
+class SurveyError(ValueError):
+    pass
+
+
+# -- GPS logs ----------------------------------------------------------------
+
+def _nmea_checksum_ok(sentence):
+    body, _, checksum = sentence[1:].partition('*')
+    if not checksum:
+        # Checksums are optional in NMEA 0183
+        return True
+    value = 0
+    for char in body:
+        value ^= ord(char)
+    try:
+        return value == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def _nmea_coordinate(value, hemisphere):
+    if not value:
+        return None
+    # ddmm.mmmm / dddmm.mmmm
+    point = value.index('.') if '.' in value else len(value)
+    degrees = float(value[:point - 2]) + float(value[point - 2:]) / 60
+    return -degrees if hemisphere in ('S', 'W') else degrees
+
+
+def _nmea_time(hhmmss, ddmmyy):
+    seconds = int(hhmmss[0:2]) * 3600 + int(hhmmss[2:4]) * 60 + float(hhmmss[4:])
+    day = calendar.timegm((2000 + int(ddmmyy[4:6]), int(ddmmyy[2:4]), int(ddmmyy[0:2]), 0, 0, 0))
+    return day + seconds
+
+
+def iter_gps_log(lines):
+    """Yield ``(ts, lat, lon)`` fixes from NMEA or gpsd JSON lines.
+
+    RMC sentences carry the date; GGA fixes are timed against the last RMC
+    date seen. Invalid fixes and sentences failing their checksum are skipped.
+    """
+    date = None
+    last_ts = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('ascii', 'replace')
+        line = line.strip()
+        fix = None
+        if line.startswith('{'):
+            fix = _gpsd_fix(line)
+        elif line.startswith('$') and _nmea_checksum_ok(line):
+            fields = line.split('*')[0].split(',')
+            kind = fields[0][3:]
+            try:
+                if kind == 'RMC' and len(fields) >= 10:
+                    date = fields[9] or date
+                    if fields[2] == 'A' and date:
+                        fix = (_nmea_time(fields[1], date),
+                               _nmea_coordinate(fields[3], fields[4]),
+                               _nmea_coordinate(fields[5], fields[6]))
+                elif kind == 'GGA' and len(fields) >= 7 and date:
+                    if fields[6] not in ('', '0'):
+                        fix = (_nmea_time(fields[1], date),
+                               _nmea_coordinate(fields[2], fields[3]),
+                               _nmea_coordinate(fields[4], fields[5]))
+            except ValueError:
+                fix = None
+        if fix is None or fix[1] is None or fix[2] is None:
+            continue
+        # RMC and GGA report the same epoch
+        if fix[0] == last_ts:
+            continue
+        last_ts = fix[0]
+        yield fix
+
+
+def _gpsd_fix(line):
+    try:
+        report = json.loads(line)
+    except ValueError:
+        return None
+    if report.get('class') != 'TPV' or report.get('mode', 0) < 2:
+        return None
+    if 'lat' not in report or 'lon' not in report or 'time' not in report:
+        return None
+    try:
+        when = datetime.fromisoformat(report['time'].replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return when.timestamp(), report['lat'], report['lon']
+
+
+# -- Recording ---------------------------------------------------------------
+
+def record_locations(session, fixes, frame, source):
+    """Store ``(ts, x, y)`` fixes for ``session``; return how many were stored.
+
+    ``x``/``y`` are longitude/latitude for the 'gps' frame and meters for
+    'plan'.
+    """
+    if frame not in FRAMES:
+        raise SurveyError(f"Unknown location frame {frame}")
+    rows = [(str(session.pk), ts, x, y, frame, source) for ts, x, y in fixes]
+    if rows:
+        get_observation_store().add_locations(rows)
+        _grids.invalidate(str(session.pk))
+    return len(rows)
+
+
+# -- Tracks ------------------------------------------------------------------
+
+class Track:
+    """A session's fixes in one frame, in meters, for placing samples."""
+
+    def __init__(self, fixes, frame, max_gap):
+        self.frame = frame
+        self.max_gap = max_gap
+        self.origin = None
+        if frame == 'gps' and fixes:
+            lon0, lat0 = fixes[0][1], fixes[0][2]
+            scale = METERS_PER_DEG_LON * math.cos(math.radians(lat0))
+            self.origin = {'lat': lat0, 'lon': lon0}
+            fixes = [(ts, (lon - lon0) * scale, (lat - lat0) * METERS_PER_DEG_LAT)
+                     for ts, lon, lat in fixes]
+        self.ts = [fix[0] for fix in fixes]
+        self.xs = [fix[1] for fix in fixes]
+        self.ys = [fix[2] for fix in fixes]
+
+    def __len__(self):
+        return len(self.ts)
+
+    def locate(self, ts):
+        """Position at ``ts``, or None if no fix is close enough in time."""
+        i = bisect_left(self.ts, ts)
+        if i < len(self.ts) and self.ts[i] == ts:
+            return self.xs[i], self.ys[i]
+        before, after = i - 1, i
+        if before >= 0 and after < len(self.ts):
+            span = self.ts[after] - self.ts[before]
+            if span <= self.max_gap:
+                f = (ts - self.ts[before]) / span
+                return (self.xs[before] + f * (self.xs[after] - self.xs[before]),
+                        self.ys[before] + f * (self.ys[after] - self.ys[before]))
+        # Past either end of the track, or in a gap: snap to a fix only if
+        # it is within half the allowed gap
+        best = None
+        for j in (before, after):
+            if 0 <= j < len(self.ts) and abs(self.ts[j] - ts) <= self.max_gap / 2:
+                if best is None or abs(self.ts[j] - ts) < abs(self.ts[best] - ts):
+                    best = j
+        if best is None:
+            return None
+        return self.xs[best], self.ys[best]
+
+
+def load_track(session_id, frame=None):
+    """Build the session's track; ``frame`` None prefers floor-plan fixes."""
+    fixes = {name: [] for name in FRAMES}
+    for ts, x, y, fix_frame, _ in get_observation_store().iter_locations(session_id):
+        if fix_frame in fixes:
+            fixes[fix_frame].append((ts, x, y))
+    if frame is None:
+        frame = 'plan' if fixes['plan'] else 'gps'
+    return Track(fixes[frame], frame, settings.SURVEY['MAX_FIX_GAP_SECONDS'])
+
+
+# -- Spatial index -----------------------------------------------------------
+
+class SpatialGrid:
+    """One device's located samples binned into square cells.
+
+    Cells are ``cell`` meters wide and keyed by integer ``(ix, iy)``; each
+    holds ``[samples, signal sum, strongest signal]``.
+    """
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = {}
+        self.samples = 0
+
+    def add(self, x, y, signal):
+        key = (int(x // self.cell), int(y // self.cell))
+        entry = self.cells.get(key)
+        if entry is None:
+            self.cells[key] = [1, signal, signal]
+        else:
+            entry[0] += 1
+            entry[1] += signal
+            if signal > entry[2]:
+                entry[2] = signal
+        self.samples += 1
+
+    def coarsen(self, factor):
+        """Mean signal per cell of ``factor`` x ``factor`` base cells."""
+        if factor == 1:
+            return {key: entry[1] / entry[0] for key, entry in self.cells.items()}
+        merged = {}
+        for (ix, iy), entry in self.cells.items():
+            key = (ix // factor, iy // factor)
+            total = merged.get(key)
+            if total is None:
+                merged[key] = [entry[0], entry[1]]
+            else:
+                total[0] += entry[0]
+                total[1] += entry[1]
+        return {key: total[1] / total[0] for key, total in merged.items()}
+
+    def heatmap(self, resolution, radius, tile_cells, max_cells):
+        """Interpolated coverage at ``resolution`` meters, split into tiles.
+
+        Measured cells keep their mean signal; empty cells within ``radius``
+        meters of measured ones get an inverse-distance weighted estimate.
+        Only tiles with at least one value are returned.
+        """
+        factor = max(1, round(resolution / self.cell))
+        size = factor * self.cell
+        reach = max(0, int(radius // size))
+        if reach > MAX_REACH_CELLS:
+            raise SurveyError(f"radius may be at most {MAX_REACH_CELLS} cells ({MAX_REACH_CELLS * size:g} m)")
+        means = self.coarsen(factor)
+        if not means:
+            return {'cellMeters': size, 'tileCells': tile_cells, 'measuredCells': 0, 'tiles': []}
+
+        # Output is bounded by the padded bounding box and by the cells
+        # within reach of a measurement, whichever is smaller
+        offsets = [
+            (dx, dy, 1 / (dx * dx + dy * dy))
+            for dx in range(-reach, reach + 1)
+            for dy in range(-reach, reach + 1)
+            if 0 < dx * dx + dy * dy <= reach * reach
+        ]
+        xs = [ix for ix, _ in means]
+        ys = [iy for _, iy in means]
+        box = (max(xs) - min(xs) + 2 * reach + 1) * (max(ys) - min(ys) + 2 * reach + 1)
+        if min(box, len(means) * (len(offsets) + 1)) > max_cells:
+            raise SurveyError(
+                f"Too many cells at {size:g} m resolution; "
+                f"use a coarser resolution or smaller radius"
+            )
+
+        # Inverse-distance weighting, scattered from each measured cell to
+        # the cells within reach; cheaper than gathering for every output
+        # cell since walked paths leave most of the area unmeasured
+        sums = {}
+        for (ix, iy), value in means.items():
+            for dx, dy, weight in offsets:
+                key = (ix + dx, iy + dy)
+                total = sums.get(key)
+                if total is None:
+                    sums[key] = [weight * value, weight]
+                else:
+                    total[0] += weight * value
+                    total[1] += weight
+        values = {key: total[0] / total[1] for key, total in sums.items()}
+        # Measured cells keep their own mean
+        values.update(means)
+
+        tiles = {}
+        for (ix, iy), value in values.items():
+            tile_key = (ix // tile_cells, iy // tile_cells)
+            rows = tiles.get(tile_key)
+            if rows is None:
+                rows = tiles[tile_key] = [[None] * tile_cells for _ in range(tile_cells)]
+            rows[iy % tile_cells][ix % tile_cells] = round(value, 1)
+
+        return {
+            'cellMeters': size,
+            'tileCells': tile_cells,
+            'measuredCells': len(means),
+            'tiles': [
+                {
+                    'tx': tx, 'ty': ty,
+                    'x': tx * tile_cells * size, 'y': ty * tile_cells * size,
+                    'values': tiles[(tx, ty)],
+                }
+                for tx, ty in sorted(tiles)
+            ],
+        }
+
+
+def build_grid(session_id, mac, frame=None):
+    """Place the session's samples of ``mac`` on its track; return (grid, track)."""
+    track = load_track(session_id, frame)
+    grid = SpatialGrid(settings.SURVEY['CELL_METERS'])
+    if not len(track):
+        return grid, track
+    locate = track.locate
+    for _, _, ts, signal in get_observation_store().iter_samples(session_id, mac=mac):
+        position = locate(ts)
+        if position is not None:
+            grid.add(position[0], position[1], signal)
+    return grid, track
+
+
+class GridCache:
+    """LRU of built grids; entries for running scans expire after ``ttl``."""
+
+    def __init__(self, capacity, ttl):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session, mac, frame):
+        key = (str(session.pk), mac, frame)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                built_at, active, result = entry
+                if not active or time.monotonic() - built_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    return result
+        result = build_grid(key[0], mac, frame)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), session.is_active, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, session_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+
+
+_grids = GridCache(settings.SURVEY['CACHED_GRIDS'], settings.SURVEY['ACTIVE_CACHE_SECONDS'])
+
+
+def session_heatmap(session, mac, resolution=None, radius=None, frame=None):
+    config = settings.SURVEY
+    resolution = resolution or config['DEFAULT_RESOLUTION_METERS']
+    radius = config['DEFAULT_RADIUS_METERS'] if radius is None else radius
+    if not math.isfinite(resolution) or not math.isfinite(radius):
+        raise SurveyError("resolution and radius must be finite numbers")
+    if radius < 0:
+        raise SurveyError("radius must not be negative")
+    if resolution < config['CELL_METERS']:
+        raise SurveyError(f"resolution must be at least {config['CELL_METERS']} m")
+    if frame is not None and frame not in FRAMES:
+        raise SurveyError(f"Unknown location frame {frame}")
+
+    grid, track = _grids.get(session, mac, frame)
+    result = grid.heatmap(resolution, radius, config['TILE_CELLS'], config['MAX_CELLS'])
+    result.update({
+        'mac': mac,
+        'frame': track.frame,
+        'origin': track.origin,
+        'fixes': len(track),
+        'samples': grid.samples,
+    })
+    return result
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from wifi_api.capture_store import CaptureStore
+
+
+class CaptureIndexTests(SimpleTestCase):
+    """Stores in different workers share one index.json."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def make_store(self):
+        return CaptureStore(self.root, max_bytes=1 << 30, rotate_bytes=1 << 20, rotate_seconds=60, codec='gzip')
+
+    def test_other_worker_sees_rotations(self):
+        owner, reader = self.make_store(), self.make_store()
+        self.assertEqual(reader.segments(), [])
+
+        live = owner.new_capture('abc') + '-01.csv'
+        with open(live, 'w') as f:
+            f.write("BSSID, channel\n")
+        first = owner.rotate(live, 'abc')
+        owner.flush()
+        self.assertEqual([e['name'] for e in reader.segments('abc')], [first['name']])
+        self.assertEqual(reader.get_segment(first['name'])['codec'], 'gzip')
+
+        with open(live, 'a') as f:
+            f.write("00:11:22:33:44:55, 6\n")
+        second = owner.rotate(live, 'abc')
+        owner.flush()
+        self.assertEqual([e['name'] for e in reader.segments('abc')], [first['name'], second['name']])
+        with reader.open_segment(second['name']) as f:
+            self.assertEqual(f.read(), b"00:11:22:33:44:55, 6\n")
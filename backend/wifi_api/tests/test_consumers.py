@@ -0,0 +1,142 @@
+import json
+from unittest import mock
+
+from asgiref.testing import ApplicationCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from wifi_api.consumers import ScanConsumer
+from wifi_api.filters import ScanFilter
+from wifi_api.scan_state import LiveScanState
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class ReceiveValidationTests(SimpleTestCase):
+    def setUp(self):
+        inventory = mock.patch('wifi_api.consumers.get_interface_inventory')
+        inventory.start().return_value.list.return_value = []
+        self.addCleanup(inventory.stop)
+
+    async def exchange(self, frame):
+        """Connect, send one text frame and return the replies to it."""
+        scope = {'type': 'websocket', 'path': '/ws/scan/', 'subprotocols': [], 'headers': []}
+        socket = ApplicationCommunicator(ScanConsumer.as_asgi(), scope)
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await socket.receive_output(1))['type'], 'websocket.accept')
+        await socket.receive_output(1)  # initial interface_update
+        await socket.send_input({'type': 'websocket.receive', 'text': frame})
+        replies = []
+        while not await socket.receive_nothing(0.1):
+            replies.append(json.loads((await socket.receive_output(1))['text']))
+        await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await socket.wait(1)
+        return replies
+
+    async def assert_error(self, frame, text):
+        replies = await self.exchange(frame)
+        self.assertEqual([reply['type'] for reply in replies], ['error'])
+        self.assertIn(text, replies[0]['message'])
+
+    async def test_invalid_json(self):
+        await self.assert_error('{"message": "subscribe"', "expected a JSON object")
+        await self.assert_error('["subscribe"]', "expected a JSON object")
+
+    async def test_invalid_scan_ids(self):
+        await self.assert_error('{"message": "subscribe", "scanIds": "20240101_120000"}', "must be a list")
+        await self.assert_error('{"message": "subscribe", "scanIds": ["a b"]}', "Invalid scan id")
+        await self.assert_error('{"message": "unsubscribe", "scanIds": [{"x": 1}]}', "Invalid scan id")
+        await self.assert_error('{"message": "subscribe", "scanIds": ["%s"]}' % ('x' * 65), "Invalid scan id")
+
+    async def test_invalid_filter(self):
+        await self.assert_error(
+            '{"message": "subscribe", "filter": {"encryption": "WPA2"}}', "list of strings")
+
+    async def test_valid_subscribe(self):
+        replies = await self.exchange(json.dumps({
+            'message': 'subscribe', 'scanIds': ['20240101_120000'],
+            'filter': {'encryption': ['WPA2'], 'bssids': ['AA:BB:CC:DD:EE:FF']},
+        }))
+        self.assertEqual([reply['type'] for reply in replies], ['interface_update'])
+
+
+class FilterMessageTests(SimpleTestCase):
+    def test_lists_of_strings(self):
+        for spec in ({'bssids': 'AA:BB:CC:DD:EE:FF'}, {'bssids': [1]}, {'encryption': [None]},
+                     {'bands': '2.4'}, {'channels': '6'}):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                ScanFilter.from_message({'filter': spec})
+        with self.assertRaises(ValueError):
+            ScanFilter.from_message({'filter': ['WPA2']})
+        with self.assertRaises(ValueError):
+            ScanFilter.from_message({'fields': 'ssid'})
+
+    def test_valid_filter(self):
+        scan_filter = ScanFilter.from_message({
+            'filter': {'channels': [1, '6'], 'encryption': ['wpa2'], 'bssids': ['aa:bb:cc:dd:ee:ff']},
+            'fields': ['ssid'],
+        })
+        self.assertEqual(scan_filter.channels, {1, 6})
+        self.assertEqual(scan_filter.encryption, {'WPA2'})
+        self.assertEqual(scan_filter.bssids, {'AA:BB:CC:DD:EE:FF'})
+
+    def test_ssid_pattern_is_not_a_regex(self):
+        for pattern in (['corp'], 'x' * 65):
+            with self.subTest(pattern=pattern), self.assertRaises(ValueError):
+                ScanFilter.from_message({'filter': {'ssidPattern': pattern}})
+        scan_filter = ScanFilter.from_message({'filter': {'ssidPattern': '(a+)+$'}})
+        self.assertFalse(scan_filter.matches(network('AA:00:00:00:00:01', 'a' * 32 + '!')))
+        self.assertTrue(scan_filter.matches(network('AA:00:00:00:00:01', 'x(A+)+$')))
+
+
+def network(bssid, ssid, channel=6, encryption='WPA2', signal=50):
+    return {
+        'id': bssid.replace(':', ''), 'bssid': bssid, 'ssid': ssid, 'channel': channel,
+        'signal': signal, 'dbm': -70, 'encryption': encryption, 'vendor': 'Unknown',
+        'clients': 0, 'beacons': 10, 'firstSeen': 1, 'lastSeen': 2,
+    }
+
+
+class FilterSelectTests(SimpleTestCase):
+    def setUp(self):
+        self.state = LiveScanState('20240101_120000', detect=False, smooth=False)
+        self.state.update([
+            network('AA:00:00:00:00:01', 'CorpNet', signal=70),
+            network('AA:00:00:00:00:02', 'corp-guest', channel=11, signal=40),
+            network('AA:00:00:00:00:03', 'Home', encryption='OPN'),
+            network('AA:00:00:00:00:04', 'MyCorp'),
+        ], [])
+
+    def select(self, **spec):
+        scan_filter = ScanFilter.from_message({'filter': spec})
+        selected = [r['bssid'][-1] for r in scan_filter.select(self.state)]
+        # The index path and the plain predicate agree
+        expected = sorted(self.state.networks.values(), key=lambda r: -r['signal'])
+        self.assertEqual(selected, [r['bssid'][-1] for r in expected if scan_filter.matches(r)])
+        return selected
+
+    def test_substring_and_glob(self):
+        self.assertEqual(sorted(self.select(ssidPattern='CORP')), ['1', '2', '4'])
+        self.assertEqual(self.select(ssidPattern='corp*'), ['1', '2'])
+        self.assertEqual(self.select(ssidPattern='*n?t'), ['1'])
+        self.assertEqual(self.select(ssidPattern='[ch]o*'), ['1', '3', '2'])
+
+    def test_bssids_in_any_case(self):
+        self.assertEqual(self.select(bssids=['aa:00:00:00:00:02', 'AA:00:00:00:00:09']), ['2'])
+        self.assertEqual(self.select(bssids=['aa:00:00:00:00:03'], encryption=['WPA2']), [])
+
+
+class SendNetworksTests(SimpleTestCase):
+    async def test_filters_against_mirrored_state(self):
+        state = LiveScanState('20240101_120000', detect=False, smooth=False)
+        state.update([network('AA:00:00:00:00:01', 'Corp'), network('AA:00:00:00:00:02', 'Home')], [])
+        consumer = ScanConsumer()
+        consumer.scan_filter = ScanFilter.from_message({'filter': {'ssidPattern': 'home'}, 'fields': ['bssid']})
+        consumer.encoder = None
+        consumer.send = mock.AsyncMock()
+        with mock.patch('wifi_api.consumers.scan_state_for', return_value=state) as state_for:
+            # The frame's records are ignored when indexed state is available
+            await consumer.send_networks('20240101_120000', [])
+        state_for.assert_called_once_with('20240101_120000')
+        sent = json.loads(consumer.send.call_args.kwargs['text_data'])
+        self.assertEqual(sent['networks'], [{'bssid': 'AA:00:00:00:00:02'}])
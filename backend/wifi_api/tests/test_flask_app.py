@@ -0,0 +1,141 @@
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+try:
+    import app as backend
+except ImportError:  # app.py needs flask and flask-cors
+    backend = None
+
+WORKERS = 4
+QUEUE = 8
+# Every Nth fake attack exits with an error
+FAIL_EVERY = 5
+
+
+def fake_deauth(interface, bssid, client_mac, packets):
+    code = 1 if packets % FAIL_EVERY == 0 else 0
+    return [sys.executable, '-c', f'import time, sys; time.sleep(0.02); sys.exit({code})']
+
+
+@unittest.skipIf(backend is None, "flask is not installed")
+class ProcessRegistryTests(SimpleTestCase):
+    """The Flask app's registry under concurrent attacks; aireplay-ng is a short sleep."""
+
+    def setUp(self):
+        self.registry = backend.ProcessRegistry()
+        self.pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='test-job')
+        self.addCleanup(self.pool.shutdown, wait=True)
+        for name, value in (('registry', self.registry), ('job_pool', self.pool),
+                            ('WORKERS', WORKERS), ('MAX_QUEUED_JOBS', QUEUE),
+                            ('deauth_command', fake_deauth),
+                            ('find_monitor_interface', lambda: 'wlan0mon')):
+            patcher = mock.patch.object(backend, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        logger = mock.patch.object(backend.logger, 'disabled', True)
+        logger.start()
+        self.addCleanup(logger.stop)
+
+    def attack(self, client, packets):
+        response = client.post('/api/attack/deauth', json={'bssid': '00:11:22:33:44:55', 'packets': packets})
+        return response.status_code
+
+    def status(self, client):
+        return client.get('/api/status').get_json()
+
+    def wait_for_drain(self, client):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            status = self.status(client)
+            if not status['activeProcesses'] and not status['queuedJobs']:
+                return status
+            time.sleep(0.02)
+        self.fail(f"jobs left over: {status}")
+
+    def test_registry_drains_with_consistent_counts(self):
+        lock = threading.Lock()
+        accepted = []
+        sent = 0
+        violations = []
+        done = threading.Event()
+
+        def attack(packets):
+            nonlocal sent
+            client = backend.app.test_client()
+            # Retry refused attacks until the queue has room
+            while True:
+                with lock:
+                    sent += 1
+                code = self.attack(client, packets)
+                with lock:
+                    if code == 200:
+                        accepted.append(packets)
+                        return
+                    sent -= 1
+                    if code != 503:
+                        violations.append(f"attack returned {code}")
+                        return
+                time.sleep(0.01)
+
+        def poll():
+            client = backend.app.test_client()
+            while not done.is_set():
+                with lock:
+                    low = len(accepted)
+                status = self.status(client)
+                with lock:
+                    high = sent
+                counted = (status['activeProcesses'] + status['queuedJobs']
+                           + status['completedJobs'] + status['failedJobs'])
+                # Jobs the server knows about lie between the attacks already
+                # acknowledged and those in flight when the status was read
+                if not low <= counted <= high:
+                    violations.append(f"status counts {counted} jobs, expected {low}..{high}")
+                if status['activeProcesses'] > WORKERS:
+                    violations.append(f"{status['activeProcesses']} processes with {WORKERS} workers")
+                if status['queuedJobs'] > QUEUE:
+                    violations.append(f"{status['queuedJobs']} jobs queued, limit {QUEUE}")
+
+        poller = threading.Thread(target=poll)
+        poller.start()
+        try:
+            with ThreadPoolExecutor(max_workers=16) as clients:
+                list(clients.map(attack, range(1, 101)))
+            status = self.wait_for_drain(backend.app.test_client())
+        finally:
+            done.set()
+            poller.join()
+
+        self.assertEqual(violations, [])
+        self.assertEqual(len(accepted), 100)
+        self.assertEqual(status['completedJobs'] + status['failedJobs'], 100)
+        self.assertEqual(status['failedJobs'], 100 // FAIL_EVERY)
+        self.assertEqual(self.registry._processes, {})
+        self.assertEqual(self.registry._queued, {})
+
+    def test_full_queue_answers_503(self):
+        # Hold every worker so attacks stay queued
+        release = threading.Event()
+        for _ in range(WORKERS):
+            self.pool.submit(release.wait, 30)
+        client = backend.app.test_client()
+        try:
+            for packets in range(1, QUEUE + 1):
+                self.assertEqual(self.attack(client, packets), 200)
+            response = client.post('/api/attack/deauth', json={'bssid': '00:11:22:33:44:55'})
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Too many attacks queued", response.get_json()['error'])
+            self.assertEqual(self.status(client)['queuedJobs'], QUEUE)
+        finally:
+            release.set()
+
+        status = self.wait_for_drain(client)
+        self.assertEqual(status['completedJobs'] + status['failedJobs'], QUEUE)
+        self.assertEqual(self.registry._processes, {})
+        self.assertEqual(self.registry._queued, {})
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from wifi_api.frame_ring import RECORD_HEADER, FrameRing
+
+CAPACITY = 256
+PAYLOAD = 40
+
+
+class FrameRingTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        path = os.path.join(root, 'ring')
+        self.writer = FrameRing(path, CAPACITY)
+        self.reader = FrameRing(path)
+        self.addCleanup(self.writer.close)
+        self.addCleanup(self.reader.close)
+
+    def fill_lap(self):
+        """Write frames up to, but not past, a full lap over the first one."""
+        first = self.writer.write(b'a' * PAYLOAD)
+        while self.writer._head() + RECORD_HEADER.size + PAYLOAD <= CAPACITY:
+            self.writer.write(b'b' * PAYLOAD)
+        return first
+
+    def test_reads_frame(self):
+        first = self.fill_lap()
+        self.assertEqual(self.reader.read(*first), b'a' * PAYLOAD)
+
+    def test_lapped_frame_is_dropped(self):
+        first = self.fill_lap()
+        self.writer.write(b'c' * PAYLOAD)
+        self.assertIsNone(self.reader.read(*first))
+
+    def test_frame_overwritten_mid_write_is_dropped(self):
+        first = self.fill_lap()
+        copied = self.reader._copy_out(first[1], RECORD_HEADER.size + PAYLOAD)
+        results = []
+        real_copy_in = self.writer._copy_in
+
+        def copy_in(position, data):
+            real_copy_in(position, data)
+            # The writer stalls here, before moving the head, while a reader
+            # finishes a copy it started before the overwrite
+            with mock.patch.object(self.reader, '_copy_out', return_value=copied):
+                results.append(self.reader.read(*first))
+
+        with mock.patch.object(self.writer, '_copy_in', copy_in):
+            self.writer.write(b'c' * PAYLOAD)
+        self.assertEqual(results, [None])
@@ -0,0 +1,105 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from wifi_api import hopping
+from wifi_api.iface_control import (
+    FakeNetlinkBackend, InterfaceControlError, InterfaceController, IpCommandBackend,
+    NetlinkBackend, phy_channels,
+)
+
+IW_PHY_INFO = b"""Wiphy phy0
+\tBand 1:
+\t\tFrequencies:
+\t\t\t* 2412.0 MHz [1] (20.0 dBm)
+\t\t\t* 2437 MHz [6] (20.0 dBm)
+\t\t\t* 2484 MHz [14] (disabled)
+\tBand 2:
+\t\tFrequencies:
+\t\t\t* 5180 MHz [36] (23.0 dBm) (no IR)
+\t\t\t* 5260 MHz [52] (disabled)
+"""
+
+HOPPING = {
+    'MODE': 'adaptive',
+    'CHANNELS': [1, 6, 11, 36],
+    'CYCLE_SECONDS': 0.4,
+    'MIN_DWELL_SECONDS': 0.1,
+    'REBALANCE_SECONDS': 60,
+}
+
+
+class PhyChannelTests(SimpleTestCase):
+    def test_disabled_channels_are_left_out(self):
+        with mock.patch('wifi_api.iface_control.subprocess.check_output', return_value=IW_PHY_INFO):
+            self.assertEqual(phy_channels('phy0'), [1, 6, 36])
+
+
+@override_settings(CHANNEL_HOPPING=HOPPING)
+class AdaptiveHoppingTests(SimpleTestCase):
+    def enabled_with(self, backend):
+        controller = InterfaceController(lambda: backend)
+        with mock.patch.object(hopping, 'get_interface_controller', return_value=controller):
+            return hopping.adaptive_hopping_enabled()
+
+    def test_needs_netlink_backend(self):
+        self.assertTrue(self.enabled_with(mock.Mock(spec=NetlinkBackend)))
+        self.assertFalse(self.enabled_with(IpCommandBackend()))
+        self.assertFalse(self.enabled_with(FakeNetlinkBackend()))
+
+    @override_settings(CHANNEL_HOPPING=dict(HOPPING, MODE='airodump'))
+    def test_airodump_mode(self):
+        self.assertFalse(self.enabled_with(mock.Mock(spec=NetlinkBackend)))
+
+    def test_hops_supported_channels_only(self):
+        backend = FakeNetlinkBackend({'wlan0': {
+            'mode': 'monitor', 'up': True, 'phy': 'phy0', 'channel': 1, 'channels': [1, 6, 36],
+        }})
+        hopper = hopping.start_hopper('wlan0', backend)
+        try:
+            self.assertEqual(hopper.scheduler.channels, [1, 6, 36])
+        finally:
+            hopper.stop()
+        # Channels are set directly, without the down/set type/up sequence
+        self.assertTrue(all(call[0] == 'set_channel' for call in backend.calls))
+        self.assertLessEqual({call[2] for call in backend.calls}, {1, 6, 36})
+
+    def test_no_supported_channel(self):
+        backend = FakeNetlinkBackend({'wlan0': {
+            'mode': 'monitor', 'up': True, 'phy': 'phy0', 'channel': 1, 'channels': [2],
+        }})
+        self.assertIsNone(hopping.start_hopper('wlan0', backend))
+
+    def test_refused_channel_is_dropped(self):
+        def set_channel(channel):
+            if channel == 6:
+                raise InterfaceControlError("Could not set wlan0 to channel 6: Invalid argument")
+
+        scheduler = hopping.HoppingScheduler([1, 6, 11], 0.4, 0.1)
+        hopper = hopping.ChannelHopper(scheduler, set_channel, 60)
+        hopper.start()
+        try:
+            deadline = time.monotonic() + 2
+            while 6 in scheduler.channels and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            hopper.stop()
+        self.assertEqual(scheduler.channels, [1, 11])
+        self.assertEqual([channel for channel, _ in scheduler.plan], [1, 11])
+
+    def test_stops_when_every_channel_fails(self):
+        def set_channel(channel):
+            raise InterfaceControlError("Could not set wlan0: No such device")
+
+        on_stop = mock.Mock()
+        hopper = hopping.ChannelHopper(hopping.HoppingScheduler([1, 6, 11], 0.4, 0.1), set_channel, 60, on_stop)
+        with self.assertLogs(hopping.logger, 'WARNING') as logs:
+            hopper.start()
+            hopper._thread.join(2)
+        self.assertFalse(hopper._thread.is_alive())
+        self.assertEqual(hopper.scheduler.plan, [])
+        self.assertIn("No channel left", logs.output[-1])
+        on_stop.assert_called_once_with()
+        hopper.stop()
+        on_stop.assert_called_once_with()
@@ -0,0 +1,139 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from wifi_api import iface_helper
+from wifi_api.iface_control import (
+    FakeNetlinkBackend, HelperController, InterfaceControlError, InterfaceController,
+)
+
+HELPER = '/usr/local/sbin/wifi-iface-helper'
+
+
+def interfaces():
+    return {
+        'wlan0': {'mode': 'managed', 'up': True, 'phy': 'phy0', 'channel': None},
+        'wlan1': {'mode': 'monitor', 'up': True, 'phy': 'phy1', 'channel': 6},
+    }
+
+
+class InterfaceControllerTests(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeNetlinkBackend(interfaces())
+        self.controller = InterfaceController(lambda: self.fake)
+
+    def test_configure_switches_mode_and_channel(self):
+        state = self.controller.configure('wlan0', 'monitor', 11)
+        self.assertEqual((state['mode'], state['up'], state['channel'], state['changed']),
+                         ('monitor', True, 11, True))
+        self.assertEqual(self.fake.calls, [
+            ('set_link', 'wlan0', False), ('set_mode', 'wlan0', 'monitor'),
+            ('set_link', 'wlan0', True), ('set_channel', 'wlan0', 11),
+        ])
+
+    def test_configure_leaves_configured_interface_alone(self):
+        state = self.controller.configure('wlan1', 'monitor', 6)
+        self.assertFalse(state['changed'])
+        self.assertEqual(self.fake.calls, [])
+
+    def test_failed_mode_change_brings_link_back_up(self):
+        error = InterfaceControlError("Could not set wlan0 to monitor mode: Operation not supported")
+        with mock.patch.object(self.fake, 'set_mode', side_effect=error):
+            with self.assertRaisesMessage(InterfaceControlError, "Operation not supported"):
+                self.controller.configure('wlan0', 'monitor')
+        self.assertEqual(self.fake.interfaces['wlan0'], interfaces()['wlan0'])
+
+    def test_configure_many_reports_errors_per_interface(self):
+        self.fake.fail.add('wlan1')
+        results = self.controller.configure_many([('wlan0', 'monitor', None), ('wlan1', 'managed', None)])
+        self.assertEqual(results[0]['mode'], 'monitor')
+        self.assertEqual(results[1], {'name': 'wlan1', 'error': "Injected failure on wlan1"})
+
+
+class HelperControllerTests(SimpleTestCase):
+    """The helper's command line and output, with the helper run in-process on a fake."""
+
+    def setUp(self):
+        self.fake = FakeNetlinkBackend(interfaces())
+        self.commands = []
+        patcher = mock.patch('wifi_api.iface_control.subprocess.run', self.run_helper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.controller = HelperController(HELPER)
+
+    def run_helper(self, command, **kwargs):
+        self.commands.append((command, kwargs))
+        out = io.StringIO()
+        with redirect_stdout(out), mock.patch.object(iface_helper, 'local_backend', lambda: self.fake):
+            status = iface_helper.main(command[3:])
+        return subprocess.CompletedProcess(command, status, out.getvalue().encode(), b'')
+
+    def test_runs_fixed_helper_path(self):
+        self.controller.state('wlan0')
+        command, kwargs = self.commands[0]
+        self.assertEqual(command, ['sudo', '-n', HELPER, 'state', 'wlan0'])
+        self.assertNotIn('cwd', kwargs)
+
+    def test_configure(self):
+        state = self.controller.configure('wlan0', 'monitor', 1)
+        self.assertEqual(self.commands[0][0][3:], ['configure', 'wlan0=monitor:1'])
+        self.assertEqual((state['mode'], state['channel'], state['changed']), ('monitor', 1, True))
+
+    def test_configure_error_is_raised(self):
+        self.fake.fail.add('wlan0')
+        with self.assertRaisesMessage(InterfaceControlError, "Injected failure on wlan0"):
+            self.controller.configure('wlan0', 'monitor')
+
+    def test_rollback_through_helper(self):
+        error = InterfaceControlError("Could not set wlan0 to monitor mode: Operation not supported")
+        with mock.patch.object(self.fake, 'set_mode', side_effect=error):
+            results = self.controller.configure_many([('wlan0', 'monitor', None)])
+        self.assertIn("Operation not supported", results[0]['error'])
+        self.assertTrue(self.fake.interfaces['wlan0']['up'])
+
+    def test_helper_error_is_raised(self):
+        with self.assertRaisesMessage(InterfaceControlError, "No such interface: wlan9"):
+            self.controller.state('wlan9')
+        with self.assertRaisesMessage(InterfaceControlError, "usage"):
+            self.controller._run(['bogus', 'wlan0'])
+
+
+class HelperFailureTests(SimpleTestCase):
+    def run_with(self, **result):
+        completed = subprocess.CompletedProcess([], result.pop('returncode', 1), **result)
+        with mock.patch('wifi_api.iface_control.subprocess.run', return_value=completed):
+            HelperController(HELPER).state('wlan0')
+
+    def test_sudo_refusal_uses_stderr(self):
+        with self.assertRaisesMessage(InterfaceControlError, "sudo: a password is required"):
+            self.run_with(stdout=b'', stderr=b'sudo: a password is required\n')
+
+    def test_timeout(self):
+        timeout = subprocess.TimeoutExpired(HELPER, HelperController.TIMEOUT)
+        with mock.patch('wifi_api.iface_control.subprocess.run', side_effect=timeout):
+            with self.assertRaisesMessage(InterfaceControlError, "timed out"):
+                HelperController(HELPER).state('wlan0')
+
+
+@unittest.skipUnless(os.geteuid() == 0, "installing the helper needs root")
+class InstallTests(SimpleTestCase):
+    def test_installed_helper_runs_isolated(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        path = os.path.join(root, 'wifi-iface-helper')
+        iface_helper.install(path, os.path.join(root, 'lib'), sys.executable)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o755)
+        self.assertEqual(os.stat(path).st_uid, 0)
+        # Run from an empty directory so the checkout cannot be imported
+        out = subprocess.run([path, 'bogus'], cwd=root, capture_output=True)
+        self.assertEqual(out.returncode, 1)
+        self.assertIn('usage', json.loads(out.stdout)['error'])
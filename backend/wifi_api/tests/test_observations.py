@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase
+
+from wifi_api.observations import ObservationStore
+
+OLD_DAY = datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+class PartitionDropTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def sample(self):
+        return [('1', 'AA:BB:CC:DD:EE:FF', 'ap', int(OLD_DAY), -50, 1)]
+
+    def test_drops_unused_partition(self):
+        store = ObservationStore(self.root)
+        store.add_samples(self.sample())
+        self.assertEqual(store.drop_before('20200102'), ['20200101'])
+        self.assertEqual(store.partitions(), {})
+
+    def test_skips_partition_open_elsewhere(self):
+        # A second store stands in for another worker writing the same day
+        other = ObservationStore(self.root)
+        other.add_samples(self.sample())
+        store = ObservationStore(self.root)
+        self.assertEqual(store.drop_before('20200102'), [])
+        self.assertIn('20200101', store.partitions())
+
+        other._close_writer('20200101')
+        self.assertEqual(store.drop_before('20200102'), ['20200101'])
+
+    def test_skips_partition_being_read(self):
+        store = ObservationStore(self.root)
+        store.add_samples(self.sample())
+        store._close_writer('20200101')
+        reader = ObservationStore(self.root).iter_samples('1')
+        next(reader)
+        self.assertEqual(store.drop_before('20200102'), [])
+        reader.close()
+        self.assertEqual(store.drop_before('20200102'), ['20200101'])
+        self.assertFalse(os.path.exists(store.partition_path('20200101')))
+
+
+class CompactorElectionTests(SimpleTestCase):
+    def test_one_compactor_per_root(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        first = ObservationStore(root)
+        second = ObservationStore(root)
+        self.assertTrue(first.elect_compactor())
+        self.assertFalse(second.elect_compactor())
+        os.close(first._election)
+        self.assertTrue(second.elect_compactor())
+
+
+class CompactionTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.start = int(datetime.now(timezone.utc).timestamp()) // 3600 * 3600
+
+    def sample(self, offset, signal):
+        return [('1', 'AA:BB:CC:DD:EE:FF', 'ap', self.start + offset, signal, offset)]
+
+    def averages(self, store):
+        _, points = store.trend('AA:BB:CC:DD:EE:FF', self.start, self.start + 3599, resolution='1m')
+        return [point['avg'] for point in points]
+
+    def test_later_writes_are_rolled_up(self):
+        store = ObservationStore(self.root)
+        store.add_samples(self.sample(0, 40))
+        self.assertEqual(store.run_maintenance(), (1, []))
+        # As if the pass ran a while ago; new samples go to the WAL and leave
+        # the main file's mtime alone
+        path = store.partition_path(next(iter(store.partitions())))
+        os.utime(path, (self.start - 86400, self.start - 86400))
+        store.add_samples(self.sample(120, 60))
+        self.assertEqual(store.run_maintenance(), (1, []))
+        self.assertEqual(store.run_maintenance(), (0, []))
+        self.assertEqual(self.averages(store), [40, 60])
+
+    def test_compacts_partitions_written_elsewhere(self):
+        # The writer stays open in another worker; its samples sit in the WAL
+        writer = ObservationStore(self.root)
+        compactor = ObservationStore(self.root)
+        writer.add_samples(self.sample(0, 40))
+        self.assertEqual(compactor.run_maintenance(), (1, []))
+        writer.add_samples(self.sample(60, 50))
+        self.assertEqual(compactor.run_maintenance(), (1, []))
+        self.assertEqual(self.averages(compactor), [40, 50])
+        self.assertEqual(compactor._connections, {})
@@ -0,0 +1,43 @@
+import os
+
+from django.test import SimpleTestCase
+
+from wifi_api.parsers import channel_from_freq, iter_kismet_netxml, parse_airodump_csv, parse_kismet_csv, parse_kismet_netxml
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class KismetSchemaTests(SimpleTestCase):
+    """Kismet records use the same fields as airodump-ng CSV records."""
+
+    def setUp(self):
+        self.networks, self.clients = parse_airodump_csv(os.path.join(FIXTURES, 'scan-01.csv'))
+
+    def test_kismet_csv_networks(self):
+        networks, clients = parse_kismet_csv(os.path.join(FIXTURES, 'scan-01.kismet.csv'))
+        self.assertEqual(clients, [])
+        self.assertEqual(set(networks[0]), set(self.networks[0]))
+        self.assertEqual(networks[0]['dbm'], -48)
+        self.assertEqual(networks[0]['beacons'], 120)
+        self.assertEqual(networks[0]['signal'], self.networks[0]['signal'])
+
+    def test_netxml_records(self):
+        networks, clients = parse_kismet_netxml(os.path.join(FIXTURES, 'scan-01.kismet.netxml'))
+        self.assertEqual(set(networks[0]), set(self.networks[0]))
+        self.assertEqual(set(clients[0]), set(self.clients[0]))
+        self.assertEqual(networks[0]['dbm'], -48)
+        self.assertEqual(networks[0]['beacons'], 120)
+        self.assertEqual(clients[0]['dbm'], -60)
+        self.assertEqual(clients[0]['probe'], ['Cafe'])
+
+    def test_netxml_packets_per_channel(self):
+        packets = [record for kind, record in iter_kismet_netxml(os.path.join(FIXTURES, 'scan-01.kismet.netxml'))
+                   if kind == 'packets']
+        self.assertEqual(packets, [{6: 140, 7: 10}])
+
+    def test_channel_from_freq(self):
+        self.assertEqual(channel_from_freq(2412), 1)
+        self.assertEqual(channel_from_freq(2484), 14)
+        self.assertEqual(channel_from_freq(5180), 36)
+        self.assertEqual(channel_from_freq(5955), 1)
+        self.assertEqual(channel_from_freq(900), 0)
@@ -0,0 +1,44 @@
+import copy
+
+from django.test import SimpleTestCase
+
+from wifi_api.scan_state import LiveScanState
+
+
+def network(bssid, encryption, first_seen, dbm=-60, last_seen=1000):
+    return {
+        'id': bssid.replace(':', ''), 'bssid': bssid, 'ssid': 'Cafe', 'channel': 6,
+        'signal': 80, 'dbm': dbm, 'encryption': encryption, 'vendor': 'Unknown',
+        'clients': 0, 'beacons': 10, 'firstSeen': first_seen, 'lastSeen': last_seen,
+    }
+
+
+class RestoreTests(SimpleTestCase):
+    def checkpointed(self):
+        state = LiveScanState('1')
+        state.update([network('AA:BB:CC:00:00:01', 'WPA2', 900)], [])
+        state.update([network('AA:BB:CC:00:00:01', 'WPA2', 900, dbm=-70, last_seen=1010)], [])
+        return state, copy.deepcopy(list(state.networks.values()))
+
+    def test_restore_keeps_smoothed_values(self):
+        state, records = self.checkpointed()
+        restored = LiveScanState('1')
+        restored.restore(state.generation, copy.deepcopy(records), [])
+        self.assertEqual(list(restored.networks.values()), records)
+        self.assertEqual(restored.generation, state.generation)
+        # Re-reading the same CSV after the restart changes nothing
+        fresh = network('AA:BB:CC:00:00:01', 'WPA2', 900, dbm=-70, last_seen=1010)
+        self.assertFalse(restored.update([fresh], []))
+
+    def test_restore_raises_no_alerts(self):
+        records = [
+            network('AA:BB:CC:00:00:01', 'WPA2', 900),
+            network('11:22:33:00:00:02', 'OPN', 950),
+        ]
+        restored = LiveScanState('1')
+        delta = restored.restore(2, records, [])
+        self.assertEqual(delta.alerts, [])
+        self.assertEqual(restored.detector._raised, set())
+        # The rules still see the restored networks
+        alerts = restored.update(records + [network('44:55:66:00:00:03', 'WEP', 990)], []).alerts
+        self.assertEqual({alert['bssid'] for alert in alerts}, {'44:55:66:00:00:03'})
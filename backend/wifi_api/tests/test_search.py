@@ -0,0 +1,47 @@
+import random
+
+from django.test import SimpleTestCase
+
+from wifi_api.search import _TermIndex
+
+
+class TermIndexTests(SimpleTestCase):
+    """Lookups agree with a scan over every term, through adds and removes."""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.index = _TermIndex()
+        self.terms = {}
+        for n in range(400):
+            term = ''.join(rng.choice('abcAB-_ ') for _ in range(rng.randint(1, 9)))
+            self.index.add(term, f"mac{n}")
+            self.terms.setdefault(term, set()).add(f"mac{n}")
+        for n in range(0, 400, 3):
+            term = next(t for t, macs in self.terms.items() if f"mac{n}" in macs)
+            self.index.remove(term, f"mac{n}")
+            self.terms[term].discard(f"mac{n}")
+            if not self.terms[term]:
+                del self.terms[term]
+
+    def test_postings_match(self):
+        self.assertEqual(self.index.postings, self.terms)
+
+    def test_substring(self):
+        for query in ('', 'a', 'B', 'ab', 'a-', 'abc', 'ba b', 'aabb', 'zz'):
+            expected = {t for t in self.terms if query.lower() in t.lower()}
+            self.assertEqual(self.index.substring(query, limit=10 ** 6), expected, query)
+
+    def test_prefix(self):
+        for query in ('', 'a', 'Ab', 'ab_', 'abab', 'z'):
+            matching = sorted({t.lower() for t in self.terms if t.lower().startswith(query.lower())})
+            first = set(matching[:5])
+            expected = {t for t in self.terms if t.lower() in first}
+            self.assertEqual(self.index.prefix(query, limit=5), expected, query)
+
+    def test_removed_terms_leave_no_entries(self):
+        for term, macs in list(self.terms.items()):
+            for mac in macs:
+                self.index.remove(term, mac)
+        self.assertEqual(self.index._heads, {})
+        self.assertEqual(self.index._grams, {})
+        self.assertEqual(self.index._folded, {})
@@ -0,0 +1,67 @@
+import copy
+import random
+import unittest
+
+from django.test import SimpleTestCase
+
+from wifi_api.smoothing import ANNOTATIONS, SignalSmoother, numpy
+
+
+def ticks(count=30, devices=40, seed=7):
+    rng = random.Random(seed)
+    for tick in range(count):
+        networks = []
+        for device in range(devices):
+            # Every fifth device never has a reading; others skip some ticks
+            if device % 5 == 0 or rng.random() < 0.2:
+                dbm = -1
+            else:
+                dbm = rng.randint(-95, -20)
+            networks.append({
+                'bssid': f'AA:BB:CC:00:00:{device:02X}', 'dbm': dbm,
+                'lastSeen': 1000 + 2 * tick + rng.randint(0, 1),
+            })
+        yield networks, []
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class VectorizedPathTests(SimpleTestCase):
+    def test_paths_agree(self):
+        for method in ('kalman', 'ewma'):
+            vectorized = SignalSmoother(method, vectorized=True)
+            lists = SignalSmoother(method, vectorized=False)
+            for networks, clients in ticks():
+                expected = copy.deepcopy(networks)
+                vectorized.apply(networks, clients)
+                lists.apply(expected, clients)
+                self.assertEqual(networks, expected, method)
+
+    def test_non_negative_level_maps_to_zero(self):
+        annotations = []
+        for vectorized in (True, False):
+            smoother = SignalSmoother('kalman', vectorized=vectorized)
+            smoother.apply([{'bssid': 'AA:BB:CC:00:00:01', 'dbm': -40, 'lastSeen': 1000},
+                            {'bssid': 'AA:BB:CC:00:00:02', 'dbm': -40, 'lastSeen': 1000}], [])
+            smoother.state['level'][0] = 0.0
+            smoother.state['level'][1] = 4.5
+            smoother._annotate(numpy.array([0, 1]) if vectorized else [0, 1])
+            annotations.append(smoother.annotations)
+        self.assertEqual(annotations[0], annotations[1])
+        self.assertEqual([a['smoothedSignal'] for a in annotations[0]], [0, 0])
+
+
+class AnnotationTests(SimpleTestCase):
+    def test_fields_always_present(self):
+        smoother = SignalSmoother('kalman', vectorized=False)
+        networks = [{'bssid': 'AA:BB:CC:00:00:01', 'dbm': -1, 'lastSeen': 1000},
+                    {'bssid': 'AA:BB:CC:00:00:02', 'dbm': -50, 'lastSeen': 1000}]
+        clients = [{'mac': '11:22:33:44:55:66', 'dbm': -1, 'lastSeen': 1000}]
+        smoother.apply(networks, clients)
+        for record in networks[:1] + clients:
+            self.assertEqual({name: record[name] for name in ANNOTATIONS}, dict.fromkeys(ANNOTATIONS))
+        self.assertEqual(networks[1]['smoothedDbm'], -50.0)
+
+        # A device that has had a reading keeps it through ticks without one
+        networks = [{'bssid': 'AA:BB:CC:00:00:02', 'dbm': -1, 'lastSeen': 1001}]
+        smoother.apply(networks, [])
+        self.assertEqual(networks[0]['smoothedDbm'], -50.0)
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+
+from wifi_api.capture_store import CaptureStore
+from wifi_api.models import ScanSession
+from wifi_api.ranges import CHUNK_BYTES, FOLLOW_WINDOW, ShortRead, file_response
+
+SEGMENT_BYTES = 32 * 1024 * 1024
+
+
+async def asgi_get(path, on_body=None):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver')], 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1234),
+    }
+    requested = asyncio.Event()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    sent = {'status': None, 'bytes': 0}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            sent['status'] = message['status']
+        else:
+            sent['bytes'] += len(message.get('body', b''))
+            if on_body is not None:
+                on_body()
+
+    await ASGIHandler()(scope, receive, send)
+    disconnected.set()
+    return sent
+
+
+class SegmentStreamingTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = CaptureStore(self.root, 1 << 40, 1 << 40, 3600, codec='gzip')
+        name = 'scan_1_00001.csv'
+        with open(os.path.join(self.store.segment_dir, name), 'wb') as f:
+            f.truncate(SEGMENT_BYTES)
+        self.store._index.append({
+            'name': name, 'scanId': '1', 'seq': 1, 'file': name, 'createdAt': 0,
+            'offset': 0, 'base': True, 'rawBytes': SEGMENT_BYTES,
+            'bytes': SEGMENT_BYTES, 'codec': None,
+        })
+        patcher = mock.patch('wifi_api.views.get_capture_store', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_asgi_streams_without_buffering(self):
+        tracemalloc.start()
+        try:
+            sent = asyncio.run(asgi_get('/api/captures/scan_1_00001.csv/'))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(sent['status'], 200)
+        self.assertEqual(sent['bytes'], SEGMENT_BYTES)
+        # A buffered body would hold the whole segment at once
+        self.assertLess(peak, SEGMENT_BYTES // 4)
+
+    def test_wsgi_streams_sync_iterator(self):
+        response = self.client.get('/api/captures/scan_1_00001.csv/', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content), b'\0' * 10)
+
+
+class ExportStreamingTests(TransactionTestCase):
+    def test_asgi_sends_export_chunks_as_they_are_encoded(self):
+        session = ScanSession.objects.create(interface='wlan0mon')
+        produced = []
+        produced_at_body = []
+
+        def chunks(*args, **kwargs):
+            for i in range(5):
+                produced.append(i)
+                yield b'x' * 1024
+
+        with mock.patch('wifi_api.views.iter_export', chunks):
+            sent = asyncio.run(asgi_get(
+                f'/api/sessions/{session.id}/export/networks/',
+                on_body=lambda: produced_at_body.append(len(produced)),
+            ))
+        self.assertEqual(sent['status'], 200)
+        self.assertEqual(sent['bytes'], 5 * 1024)
+        # The first chunk went out before the rest were encoded
+        self.assertLess(produced_at_body[0], 5)
+
+
+class FollowTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.factory = RequestFactory()
+
+    def get(self, **params):
+        request = self.factory.get('/', params)
+        return file_response(request, self.path, 'text/csv')
+
+    def test_since_sends_only_the_new_bytes(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'a' * (FOLLOW_WINDOW * 3))
+        response = self.get(since=0, crc=0)
+        held = b''.join(response.streaming_content)
+        crc = response['X-Content-CRC32']
+
+        with open(self.path, 'ab') as f:
+            f.write(b'tail')
+        response = self.get(since=len(held), crc=crc)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'tail')
+
+        response = self.get(since=len(held) + 4, crc=response['X-Content-CRC32'])
+        self.assertEqual(response.status_code, 204)
+
+    def test_rewritten_window_sends_everything(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'a' * 100)
+        crc = self.get(since=0, crc=0)['X-Content-CRC32']
+        with open(self.path, 'wb') as f:
+            f.write(b'b' * 100 + b'tail')
+        response = self.get(since=100, crc=crc)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '104')
+
+    def test_shrinking_file_aborts_instead_of_short_body(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'a' * (CHUNK_BYTES * 2))
+        response = self.get(raw=1)
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        with open(self.path, 'r+b') as f:
+            f.truncate(10)
+        with self.assertRaises(ShortRead):
+            next(chunks)
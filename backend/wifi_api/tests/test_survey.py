@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from wifi_api.models import ScanSession
+from wifi_api.observations import ObservationStore
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'track.nmea')
+# 2024-01-01 12:00:00 UTC
+START = 1704110400
+
+
+class SurveyTestCase(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.store = ObservationStore(root)
+        patcher = mock.patch('wifi_api.survey.get_observation_store', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = ScanSession.objects.create(interface='wlan0')
+
+
+class ImportGpsLogTests(SurveyTestCase):
+    def test_imports_valid_fixes(self):
+        out = StringIO()
+        call_command('import_gps_log', str(self.session.pk), FIXTURE, stdout=out)
+        self.assertIn("4 fixes", out.getvalue())
+        locations = list(self.store.iter_locations(self.session.pk))
+        # GGA repeating an RMC epoch, a void fix, a bad checksum and a SKY
+        # report are skipped
+        self.assertEqual([ts for ts, *_ in locations], [START, START + 1, START + 4, START + 5])
+        ts, lon, lat, frame, source = locations[0]
+        self.assertAlmostEqual(lat, 52.5)
+        self.assertAlmostEqual(lon, 13.366667, places=5)
+        self.assertEqual((frame, source), ('gps', 'log'))
+
+    def test_offset(self):
+        call_command('import_gps_log', str(self.session.pk), FIXTURE, '--offset', '-1.5', stdout=StringIO())
+        self.assertEqual(next(self.store.iter_locations(self.session.pk))[0], START - 1.5)
+
+
+class HeatmapViewTests(SurveyTestCase):
+    def url(self):
+        return f'/api/sessions/{self.session.pk}/heatmap/AA:BB:CC:DD:EE:FF/'
+
+    def test_non_finite_parameters_are_rejected(self):
+        for params in ('resolution=inf', 'resolution=nan', 'resolution=-inf', 'radius=inf', 'radius=nan'):
+            with self.subTest(params=params):
+                response = self.client.get(f'{self.url()}?{params}')
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+    def test_negative_radius_is_rejected(self):
+        self.assertEqual(self.client.get(f'{self.url()}?radius=-1').status_code, 400)
@@ -0,0 +1,46 @@
+import copy
+
+from django.test import SimpleTestCase
+
+from wifi_api.wire import ScanDecoder, ScanEncoder
+
+
+def network(bssid, **fields):
+    record = {
+        'id': bssid.replace(':', ''), 'bssid': bssid, 'ssid': 'Cafe', 'channel': 6,
+        'signal': 80, 'dbm': -60, 'encryption': 'WPA2', 'vendor': 'Unknown',
+        'clients': 0, 'beacons': 10, 'firstSeen': 1000, 'lastSeen': 1000,
+    }
+    record.update(fields)
+    return record
+
+
+SMOOTHED = {'smoothedDbm': -61.3, 'smoothedSignal': 77, 'trend': -0.25, 'motion': 'steady'}
+NO_ESTIMATE = dict.fromkeys(SMOOTHED)
+
+
+class RoundTripTests(SimpleTestCase):
+    def assert_round_trips(self, ticks):
+        encoder, decoder = ScanEncoder(), ScanDecoder()
+        for networks in ticks:
+            frame = encoder.encode('20240101_120000', copy.deepcopy(networks))
+            self.assertEqual(decoder.decode(frame)['networks'], networks)
+
+    def test_mixed_records(self):
+        a, b, c = 'AA:BB:CC:00:00:01', 'AA:BB:CC:00:00:02', '11:22:33:44:55:66'
+        self.assert_round_trips([
+            # Only some records carry the smoothed fields, and not first
+            [network(a), network(b, **SMOOTHED), network(c, **NO_ESTIMATE)],
+            # Fields go from None to a value, from a value to None, and away
+            [network(a, **SMOOTHED), network(b, **NO_ESTIMATE), network(c, **dict(SMOOTHED, trend=0.5))],
+            [network(a, **dict(SMOOTHED, smoothedDbm=-58.0)), network(b, **SMOOTHED), network(c)],
+            [network(b, **SMOOTHED), network(c, signal=70)],
+        ])
+
+    def test_unchanged_records_cost_nothing(self):
+        networks = [network('AA:BB:CC:00:00:01', **NO_ESTIMATE), network('AA:BB:CC:00:00:02')]
+        encoder = ScanEncoder()
+        encoder.encode('1', copy.deepcopy(networks))
+        frame = encoder.encode('1', copy.deepcopy(networks))
+        # version, flags, no dictionary entries, scan ref, 3-byte schema, no changes
+        self.assertEqual(len(frame), 8)
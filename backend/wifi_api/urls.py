@@ -4,18 +4,42 @@ from .views import (
     WifiInterfacesView,
     MonitorModeStartView,
     MonitorModeStopView,
+    InterfaceBatchConfigView,
     ScanNetworksView,
     DeauthAttackView,
     StatusView,
-    AirodumpOutputView
+    AirodumpOutputView,
+    CaptureSegmentsView,
+    CaptureSegmentView,
+    SessionListView,
+    SessionExportView,
+    SessionLocationsView,
+    HeatmapView,
+    SearchView,
+    ChannelStatsView,
+    DashboardView,
+    AlertListView,
+    TrendView
 )
 
 urlpatterns = [
     path('interfaces/', WifiInterfacesView.as_view(), name='interfaces'),
     path('monitor/start/', MonitorModeStartView.as_view(), name='monitor_start'),
     path('monitor/stop/', MonitorModeStopView.as_view(), name='monitor_stop'),
+    path('interfaces/configure/', InterfaceBatchConfigView.as_view(), name='interfaces_configure'),
     path('scan/', ScanNetworksView.as_view(), name='scan'),
     path('attack/deauth/', DeauthAttackView.as_view(), name='deauth'),
     path('status/', StatusView.as_view(), name='status'),
     path('airodump/output/', AirodumpOutputView.as_view(), name='airodump_output'),
+    path('captures/', CaptureSegmentsView.as_view(), name='capture_segments'),
+    path('captures/<str:name>/', CaptureSegmentView.as_view(), name='capture_segment'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('channels/', ChannelStatsView.as_view(), name='channels'),
+    path('dashboard/<str:aggregate>/', DashboardView.as_view(), name='dashboard'),
+    path('alerts/', AlertListView.as_view(), name='alerts'),
+    path('history/<str:mac>/', TrendView.as_view(), name='trend'),
+    path('sessions/', SessionListView.as_view(), name='sessions'),
+    path('sessions/<uuid:session_id>/export/<str:table>/', SessionExportView.as_view(), name='session_export'),
+    path('sessions/<uuid:session_id>/locations/', SessionLocationsView.as_view(), name='session_locations'),
+    path('sessions/<uuid:session_id>/heatmap/<str:mac>/', HeatmapView.as_view(), name='session_heatmap'),
 ]
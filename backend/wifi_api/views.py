@@ -1,3 +1,4 @@
+import itertools
 import json
 import subprocess
 import re
@@ -5,89 +6,46 @@ import threading
 import time
 import os
 from datetime import datetime
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from .capture_store import get_capture_store
+from .conditional import conditional_response
+from .dashboard import AGGREGATES, DEFAULT_LIMIT, MAX_LIMIT, snapshot
+from .export import EXPORT_FORMATS, EXPORT_TABLES, ExportUnavailable, iter_export
+from .groups import LIFECYCLE_GROUP, publish
+from .hopping import adaptive_hopping_enabled
+from .iface_control import InterfaceControlError, get_interface_controller
+from .interfaces import get_interface_inventory
+from .memo import get_result_cache
+from .models import RogueAlert, ScanSession
+from .observations import RESOLUTIONS, get_observation_store
+from .ranges import file_response, iter_json_text, iter_read, streaming_response
+from .scan_runner import pid_alive, tail_scan
+from .shared_state import get_scan_registry, scan_state_for
+from .search import SearchIndex
+from .survey import SurveyError, iter_gps_log, record_locations, session_heatmap
 from .serializers import (
     WifiInterfaceSerializer,
     MonitorModeSerializer,
+    InterfaceBatchSerializer,
     DeauthAttackSerializer,
     ScanResultSerializer,
     AirodumpOutputSerializer,
+    LocationBatchSerializer,
 )
 
 class WifiInterfacesView(APIView):
     def get(self, request):
-        interfaces = []
         try:
-            # First, get all wireless interfaces
-            proc = subprocess.Popen(['iwconfig'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = proc.communicate()
-            output = out.decode('utf-8')
-            
-            # Parse the output to find interfaces
-            interface_sections = output.split('\n\n')
-            for section in interface_sections:
-                if not section.strip():
-                    continue
-                
-                lines = section.strip().split('\n')
-                if not lines:
-                    continue
-                
-                # Get interface name from the first line
-                interface_line = lines[0]
-                interface_match = re.match(r'^(\w+)', interface_line)
-                if not interface_match:
-                    continue
-                
-                interface_name = interface_match.group(1)
-                
-                # Check if in monitor mode
-                is_monitor = "Mode:Monitor" in section
-                
-                # Get driver and chipset information
-                try:
-                    driver_info = subprocess.check_output(
-                        ['ethtool', '-i', interface_name], 
-                        stderr=subprocess.STDOUT
-                    ).decode('utf-8')
-                    
-                    driver_match = re.search(r'driver:\s*(\S+)', driver_info)
-                    driver = driver_match.group(1) if driver_match else "Unknown"
-                    
-                    # Try to get chipset info from device
-                    try:
-                        pci_info = subprocess.check_output(
-                            ['lspci', '-v'], 
-                            stderr=subprocess.STDOUT
-                        ).decode('utf-8')
-                        
-                        for line in pci_info.split('\n'):
-                            if interface_name in line or driver in line:
-                                chipset = line.strip()
-                                break
-                        else:
-                            chipset = "Unknown"
-                    except:
-                        chipset = "Unknown"
-                        
-                except subprocess.CalledProcessError:
-                    driver = "Unknown"
-                    chipset = "Unknown"
-                
-                # Add interface to list
-                interfaces.append({
-                    'name': interface_name,
-                    'driver': driver,
-                    'chipset': chipset,
-                    'status': "monitor" if is_monitor else "normal",
-                    'phy': ""  # Optional field
-                })
-                
-            return Response(interfaces)
+            interfaces, version, modified = get_interface_inventory().snapshot(
+                settings.INTERFACE_CACHE_SECONDS
+            )
+            return conditional_response(
+                request, version, modified, lambda: Response(interfaces)
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -100,37 +58,32 @@ class MonitorModeStartView(APIView):
         if serializer.is_valid():
             interface = serializer.validated_data['interface']
             try:
-                # First, bring the interface down
-                subprocess.check_output(['sudo', 'ifconfig', interface, 'down'])
-                
-                # Set to monitor mode
-                subprocess.check_output(['sudo', 'iwconfig', interface, 'mode', 'monitor'])
-                
-                # Bring the interface up again
-                subprocess.check_output(['sudo', 'ifconfig', interface, 'up'])
-                
-                # Check if the mode was changed successfully
-                iwconfig_output = subprocess.check_output(['iwconfig', interface]).decode('utf-8')
-                
-                if "Mode:Monitor" in iwconfig_output:
+                # Down, set type and up again in one step; returns the new state
+                state = get_interface_controller().set_mode(interface, 'monitor')
+                get_interface_inventory().invalidate()
+
+                if state['mode'] == 'monitor':
                     return Response({
                         "success": True,
                         "message": f"Interface {interface} is now in monitor mode",
                         "data": {
-                            "monitorInterface": interface
+                            "monitorInterface": interface,
+                            "state": state
                         }
                     })
                 else:
                     return Response({
                         "success": False,
-                        "message": f"Failed to set {interface} to monitor mode"
+                        "message": f"Failed to set {interface} to monitor mode",
+                        "data": {
+                            "state": state
+                        }
                     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-            except subprocess.CalledProcessError as e:
-                error_output = e.output.decode('utf-8') if hasattr(e, 'output') else str(e)
+
+            except InterfaceControlError as e:
                 return Response({
                     "success": False,
-                    "message": f"Error setting monitor mode: {error_output}"
+                    "message": f"Error setting monitor mode: {str(e)}"
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             except Exception as e:
                 return Response({
@@ -145,24 +98,20 @@ class MonitorModeStopView(APIView):
         if serializer.is_valid():
             interface = serializer.validated_data['interface']
             try:
-                # First, bring the interface down
-                subprocess.check_output(['sudo', 'ifconfig', interface, 'down'])
-                
-                # Set to managed mode
-                subprocess.check_output(['sudo', 'iwconfig', interface, 'mode', 'managed'])
-                
-                # Bring the interface up again
-                subprocess.check_output(['sudo', 'ifconfig', interface, 'up'])
-                
+                state = get_interface_controller().set_mode(interface, 'managed')
+                get_interface_inventory().invalidate()
+
                 return Response({
                     "success": True,
-                    "message": f"Interface {interface} is now in managed mode"
+                    "message": f"Interface {interface} is now in managed mode",
+                    "data": {
+                        "state": state
+                    }
                 })
-            except subprocess.CalledProcessError as e:
-                error_output = e.output.decode('utf-8') if hasattr(e, 'output') else str(e)
+            except InterfaceControlError as e:
                 return Response({
                     "success": False,
-                    "message": f"Error setting managed mode: {error_output}"
+                    "message": f"Error setting managed mode: {str(e)}"
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             except Exception as e:
                 return Response({
@@ -171,6 +120,62 @@ class MonitorModeStopView(APIView):
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class InterfaceBatchConfigView(APIView):
+    def post(self, request):
+        serializer = InterfaceBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        configs = serializer.validated_data['interfaces']
+
+        try:
+            inventory = {
+                interface['name']: interface
+                for interface in get_interface_inventory().list(settings.INTERFACE_CACHE_SECONDS)
+            }
+        except Exception:
+            inventory = {}
+
+        results = {}
+        pending = []
+        for config in configs:
+            name = config['interface']
+            known = inventory.get(name)
+            # The inventory knows modes but not channels
+            if known is not None and 'channel' not in config and \
+                    known['status'] == ('monitor' if config['mode'] == 'monitor' else 'normal'):
+                results[name] = {"interface": name, "success": True, "skipped": True}
+            else:
+                pending.append(config)
+
+        if pending:
+            try:
+                states = get_interface_controller().configure_many([
+                    (config['interface'], config['mode'], config.get('channel')) for config in pending
+                ])
+            except InterfaceControlError as e:
+                states = [{'name': config['interface'], 'error': str(e)} for config in pending]
+            for config, state in zip(pending, states):
+                name = config['interface']
+                if 'error' in state:
+                    results[name] = {"interface": name, "success": False, "message": state['error']}
+                else:
+                    changed = state.pop('changed', True)
+                    results[name] = {"interface": name, "success": True, "skipped": not changed, "state": state}
+            if any(result.get('state') and not result['skipped'] for result in results.values()):
+                get_interface_inventory().invalidate()
+
+        results = [results[config['interface']] for config in configs]
+        failed = sum(1 for result in results if not result['success'])
+        skipped = sum(1 for result in results if result.get('skipped'))
+        return Response({
+            "success": failed == 0,
+            "message": f"Configured {len(results) - failed - skipped} interfaces, "
+                       f"{skipped} already set, {failed} failed",
+            "data": {
+                "results": results
+            }
+        }, status=status.HTTP_200_OK if failed == 0 else status.HTTP_207_MULTI_STATUS)
+
 class ScanNetworksView(APIView):
     def post(self, request):
         serializer = MonitorModeSerializer(data=request.data)
@@ -193,13 +198,11 @@ class ScanNetworksView(APIView):
             
             # Start airodump-ng in a separate thread
             try:
-                # Create output directory if it doesn't exist
-                output_dir = os.path.join(os.getcwd(), 'captures')
-                os.makedirs(output_dir, exist_ok=True)
-                
                 # Generate timestamp for unique filename
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(output_dir, f"scan_{timestamp}")
+                store = get_capture_store()
+                output_file = store.new_capture(timestamp)
+                session = ScanSession.objects.create(interface=interface)
                 
                 # Start airodump-ng process
                 cmd = [
@@ -208,51 +211,35 @@ class ScanNetworksView(APIView):
                     '--output-format', 'csv',
                     interface
                 ]
+                if adaptive_hopping_enabled():
+                    # Pin airodump-ng to one channel; the scan runner hops
+                    cmd[-1:-1] = ['--channel', str(settings.CHANNEL_HOPPING['CHANNELS'][0])]
                 
-                # Start process in background
+                # Start process in background, detached so that it outlives a
+                # backend restart and can be re-adopted from the checkpoint
                 process = subprocess.Popen(
                     cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True
                 )
                 
-                # Store process ID for later termination
-                from django.core.cache import cache
-                cache.set('airodump_process_id', process.pid, timeout=None)
-                cache.set('airodump_output_file', f"{output_file}-01.csv", timeout=None)
-                
-                # Start a thread to read and process the CSV file
-                def process_csv():
-                    time.sleep(2)  # Wait for airodump to create the file
-                    
-                    try:
-                        while True:
-                            # Check if process is still running
-                            if process.poll() is not None:
-                                break
-                                
-                            # Read and parse CSV file
-                            csv_file = f"{output_file}-01.csv"
-                            if os.path.exists(csv_file):
-                                networks, clients = parse_airodump_csv(csv_file)
-                                
-                                # Send updates via WebSocket
-                                channel_layer = get_channel_layer()
-                                async_to_sync(channel_layer.group_send)(
-                                    "scan_updates",
-                                    {
-                                        "type": "scan_update",
-                                        "networks": networks,
-                                        "clients": clients
-                                    }
-                                )
-                            
-                            time.sleep(1)  # Update interval
-                    except Exception as e:
-                        print(f"Error in CSV processing thread: {str(e)}")
-                
-                # Start the processing thread
-                csv_thread = threading.Thread(target=process_csv)
+                # Record the scan where every worker can see it
+                registry = get_scan_registry()
+                registry.start(timestamp, process.pid, f"{output_file}-01.csv", str(session.id))
+                try:
+                    # Sockets following the current scan move over to this one
+                    publish(LIFECYCLE_GROUP, {"type": "scan_started", "scanId": timestamp})
+                except Exception as e:
+                    print(f"Error announcing scan {timestamp}: {str(e)}")
+                
+                # Start the processing thread; if another worker's scan watcher
+                # owns the scan, this thread is still the one to reap airodump-ng
+                def tail_and_reap():
+                    tail_scan(timestamp, session, output_file, lambda: process.poll() is None)
+                    process.wait()
+
+                csv_thread = threading.Thread(target=tail_and_reap)
                 csv_thread.daemon = True
                 csv_thread.start()
                 
@@ -261,6 +248,7 @@ class ScanNetworksView(APIView):
                     "message": f"Started scanning on {interface}",
                     "data": {
                         "scanId": timestamp,
+                        "sessionId": str(session.id),
                         "outputFile": f"{output_file}-01.csv"
                     }
                 })
@@ -274,15 +262,15 @@ class ScanNetworksView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request):
-        # Stop airodump-ng process
-        from django.core.cache import cache
-        process_id = cache.get('airodump_process_id')
+        # Stop airodump-ng process (possibly started by another worker)
+        registry = get_scan_registry()
+        scan = registry.current()
         
-        if process_id:
+        if scan:
             try:
                 # Kill the process
-                subprocess.call(['sudo', 'kill', '-9', str(process_id)])
-                cache.delete('airodump_process_id')
+                subprocess.call(['sudo', 'kill', '-9', str(scan['pid'])])
+                registry.clear(scan['scanId'])
                 return Response({
                     "success": True,
                     "message": "Scan stopped successfully"
@@ -379,24 +367,24 @@ class StatusView(APIView):
     def get(self, request):
         try:
             # Check if airodump is running
-            from django.core.cache import cache
-            process_id = cache.get('airodump_process_id')
+            registry = get_scan_registry()
+            state = registry.snapshot()
             
             active_processes = 0
-            if process_id:
-                try:
-                    # Check if process exists
-                    os.kill(int(process_id), 0)
+            if state['scan']:
+                # Check if process exists
+                if pid_alive(state['scan']['pid']):
                     active_processes = 1
-                except OSError:
+                else:
                     # Process doesn't exist
-                    cache.delete('airodump_process_id')
+                    state = registry.clear(state['scan']['scanId'])
             
-            return Response({
+            # The registry revision is shared, so every worker agrees on the ETag
+            return conditional_response(request, state['revision'], state['modified'], lambda: Response({
                 "status": "running",
                 "activeProcesses": active_processes,
                 "version": "1.0.0"
-            })
+            }), tag=state['boot'] or None)
         except Exception as e:
             return Response({
                 "status": "error",
@@ -406,8 +394,8 @@ class StatusView(APIView):
 
 class AirodumpOutputView(APIView):
     def get(self, request):
-        from django.core.cache import cache
-        output_file = cache.get('airodump_output_file')
+        scan = get_scan_registry().current()
+        output_file = scan['outputFile'] if scan else None
         
         if not output_file or not os.path.exists(output_file):
             return Response({
@@ -415,171 +403,325 @@ class AirodumpOutputView(APIView):
             })
         
         try:
-            with open(output_file, 'r') as f:
-                content = f.read()
-                
-            return Response({
-                "output": content
-            })
+            # Raw bytes for ranges and following; JSON for older clients
+            if ('raw' in request.query_params or 'since' in request.query_params
+                    or 'Range' in request.headers):
+                return file_response(request, output_file, 'text/csv')
+            f = open(output_file, 'rb')
+            size = os.fstat(f.fileno()).st_size
+            return streaming_response(
+                request, iter_json_text(iter_read(f, 0, size), 'output'),
+                content_type='application/json'
+            )
         except Exception as e:
             return Response({
                 "output": f"Error reading scan data: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-def parse_airodump_csv(csv_file):
-    """Parse airodump-ng CSV output file and return networks and clients"""
-    networks = []
-    clients = []
-    
-    try:
-        with open(csv_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-        # Split the file into networks and clients sections
-        sections = content.split('\r\n\r\n')
-        if len(sections) < 2:
-            return networks, clients
-            
-        networks_section = sections[0]
-        clients_section = sections[1]
-        
-        # Parse networks
-        network_lines = networks_section.split('\r\n')
-        if len(network_lines) > 1:
-            headers = network_lines[0].split(',')
-            
-            for line in network_lines[1:]:
-                if not line.strip():
-                    continue
-                    
-                fields = line.split(',')
-                if len(fields) < 14:
-                    continue
-                    
-                # Extract network data
-                bssid = fields[0].strip()
-                first_seen = int(datetime.strptime(fields[1].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
-                last_seen = int(datetime.strptime(fields[2].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
-                channel = int(fields[3].strip()) if fields[3].strip().isdigit() else 0
-                speed = fields[4].strip()
-                privacy = fields[5].strip()
-                cipher = fields[6].strip()
-                authentication = fields[7].strip()
-                power = int(fields[8].strip()) if fields[8].strip().lstrip('-').isdigit() else 0
-                beacons = int(fields[9].strip()) if fields[9].strip().isdigit() else 0
-                iv = int(fields[10].strip()) if fields[10].strip().isdigit() else 0
-                lan_ip = fields[11].strip()
-                id_length = int(fields[12].strip()) if fields[12].strip().isdigit() else 0
-                essid = fields[13].strip()
-                
-                # Normalize signal strength (convert negative dBm to percentage)
-                signal = min(100, max(0, int((100 + power) * 2))) if power < 0 else 0
-                
-                # Get vendor from MAC address (first 3 bytes)
-                vendor = "Unknown"
-                if bssid and len(bssid) >= 8:
-                    oui = bssid.replace(':', '').upper()[:6]
-                    # In a real implementation, you would look up the OUI in a database
-                    # For now, we'll just use a placeholder
-                    vendor = get_vendor_from_mac(bssid)
-                
-                networks.append({
-                    'id': bssid.replace(':', ''),
-                    'bssid': bssid,
-                    'ssid': essid,
-                    'channel': channel,
-                    'signal': signal,
-                    'encryption': privacy,
-                    'vendor': vendor,
-                    'clients': 0,  # Will be updated later
-                    'firstSeen': first_seen,
-                    'lastSeen': last_seen
-                })
-        
-        # Parse clients
-        client_lines = clients_section.split('\r\n')
-        if len(client_lines) > 1:
-            headers = client_lines[0].split(',')
-            
-            for line in client_lines[1:]:
-                if not line.strip():
-                    continue
-                    
-                fields = line.split(',')
-                if len(fields) < 7:
-                    continue
-                    
-                # Extract client data
-                mac = fields[0].strip()
-                first_seen = int(datetime.strptime(fields[1].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
-                last_seen = int(datetime.strptime(fields[2].strip(), '%Y-%m-%d %H:%M:%S').timestamp())
-                power = int(fields[3].strip()) if fields[3].strip().lstrip('-').isdigit() else 0
-                packets = int(fields[4].strip()) if fields[4].strip().isdigit() else 0
-                bssid = fields[5].strip()
-                probed_essids = fields[6].strip()
-                
-                # Normalize signal strength
-                signal = min(100, max(0, int((100 + power) * 2))) if power < 0 else 0
-                
-                # Get vendor from MAC
-                vendor = get_vendor_from_mac(mac)
-                
-                # Parse probed networks
-                probes = [p.strip() for p in probed_essids.split(',') if p.strip()]
-                
-                clients.append({
-                    'mac': mac,
-                    'bssid': bssid,
-                    'power': signal,
-                    'rate': '0-0',  # Not provided by airodump CSV
-                    'lost': 0,      # Not provided by airodump CSV
-                    'frames': packets,
-                    'probe': probes,
-                    'vendor': vendor,
-                    'firstSeen': first_seen,
-                    'lastSeen': last_seen
-                })
-                
-                # Update client count for the associated network
-                if bssid != '(not associated)':
-                    for network in networks:
-                        if network['bssid'] == bssid:
-                            network['clients'] += 1
-                            break
-        
-        return networks, clients
-    except Exception as e:
-        print(f"Error parsing CSV: {str(e)}")
-        return [], []
-
-def get_vendor_from_mac(mac):
-    """Get vendor name from MAC address"""
-    # In a real implementation, you would use a MAC address database
-    # For now, return some common vendors based on the first byte
-    if not mac or len(mac) < 2:
-        return "Unknown"
-        
-    first_byte = mac.split(':')[0].upper()
-    
-    vendors = {
-        '00': 'Xerox',
-        '08': 'Apple',
-        '18': 'Cisco',
-        '28': 'Netgear',
-        '30': 'Dell',
-        '40': 'Huawei',
-        '44': 'Google',
-        '50': 'Amazon',
-        '60': 'Intel',
-        '70': 'Samsung',
-        '80': 'Sony',
-        '90': 'Microsoft',
-        'A0': 'Lenovo',
-        'B0': 'HP',
-        'C0': 'TP-Link',
-        'D0': 'D-Link',
-        'E0': 'Ubiquiti',
-        'F0': 'Belkin'
-    }
-    
-    return vendors.get(first_byte, "Unknown")
+class CaptureSegmentsView(APIView):
+    def get(self, request):
+        scan_id = request.query_params.get('scanId')
+        store = get_capture_store()
+        return Response({
+            "segments": store.segments(scan_id),
+            "diskUsage": store.disk_usage(),
+            "quota": store.max_bytes
+        })
+
+class CaptureSegmentView(APIView):
+    def get(self, request, name):
+        store = get_capture_store()
+        if store.get_segment(name) is None:
+            return Response({
+                "success": False,
+                "message": f"Unknown capture segment {name}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Uncompressed segments can be mapped and served in ranges; the
+        # compressor may replace one at any moment, so fall through if so
+        path = store.raw_segment_path(name)
+        if path is not None:
+            try:
+                return file_response(request, path, 'text/csv', immutable=True)
+            except FileNotFoundError:
+                pass
+
+        def stream():
+            with store.open_segment(name) as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        response = streaming_response(request, stream(), content_type='text/csv')
+        response['Accept-Ranges'] = 'none'
+        return response
+
+class SessionListView(APIView):
+    def get(self, request):
+        sessions = ScanSession.objects.order_by('-created_at')
+        return Response([
+            {
+                "id": str(session.id),
+                "interface": session.interface,
+                "createdAt": int(session.created_at.timestamp()),
+                "isActive": session.is_active
+            }
+            for session in sessions
+        ])
+
+class SessionExportView(APIView):
+    def get(self, request, session_id, table):
+        # 'format' is reserved by DRF for renderer negotiation
+        fmt = request.query_params.get('output', 'parquet')
+        if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+            return Response({
+                "success": False,
+                "message": f"Unsupported export {table}/{fmt}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        session = ScanSession.objects.filter(pk=session_id).first()
+        if session is None:
+            return Response({
+                "success": False,
+                "message": f"Unknown scan session {session_id}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            chunks = iter_export(session, table, fmt)
+            # Fail before the response starts if pyarrow is missing
+            first = next(chunks, b'')
+        except ExportUnavailable as e:
+            return Response({
+                "success": False,
+                "message": str(e)
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        content_type, extension = EXPORT_FORMATS[fmt]
+        response = streaming_response(
+            request, itertools.chain([first], chunks), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="session_{session.id}_{table}{extension}"'
+        )
+        return response
+
+class SessionLocationsView(APIView):
+    def get(self, request, session_id):
+        fixes = [
+            {"timestamp": ts, "x": x, "y": y, "frame": frame, "source": source}
+            for ts, x, y, frame, source in get_observation_store().iter_locations(session_id)
+        ]
+        return Response({"sessionId": str(session_id), "fixes": fixes})
+
+    def post(self, request, session_id):
+        session = ScanSession.objects.filter(pk=session_id).first()
+        if session is None:
+            return Response({
+                "success": False,
+                "message": f"Unknown scan session {session_id}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # A single waypoint may be posted bare
+        data = request.data
+        if 'waypoints' not in data and 'log' not in data:
+            data = {'waypoints': [data]}
+        serializer = LocationBatchSerializer(data=data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "message": "Invalid location data",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        now = time.time()
+        plan, gps = [], []
+        for waypoint in serializer.validated_data.get('waypoints', []):
+            ts = waypoint.get('timestamp', now)
+            if 'x' in waypoint:
+                plan.append((ts, waypoint['x'], waypoint['y']))
+            else:
+                gps.append((ts, waypoint['lon'], waypoint['lat']))
+        log = serializer.validated_data.get('log')
+        logged = [(ts, lon, lat) for ts, lat, lon in iter_gps_log(log.splitlines())] if log else []
+
+        stored = (record_locations(session, plan, 'plan', 'waypoint')
+                  + record_locations(session, gps, 'gps', 'waypoint')
+                  + record_locations(session, logged, 'gps', 'log'))
+        return Response({
+            "success": True,
+            "message": f"Stored {stored} location fixes",
+            "stored": stored
+        }, status=status.HTTP_201_CREATED)
+
+class HeatmapView(APIView):
+    def get(self, request, session_id, mac):
+        session = ScanSession.objects.filter(pk=session_id).first()
+        if session is None:
+            return Response({
+                "success": False,
+                "message": f"Unknown scan session {session_id}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            resolution = float(request.query_params.get('resolution') or 0) or None
+            radius = request.query_params.get('radius')
+            radius = float(radius) if radius else None
+            started = time.perf_counter()
+            heatmap = session_heatmap(session, mac.upper(), resolution, radius,
+                                      request.query_params.get('frame'))
+        except (SurveyError, ValueError) as e:
+            return Response({
+                "success": False,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        heatmap['tookMs'] = round((time.perf_counter() - started) * 1000, 2)
+        return Response(heatmap)
+
+class SearchView(APIView):
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        mode = request.query_params.get('mode', 'substring')
+        kinds = request.query_params.get('kind', 'ssid,probe').split(',')
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+        except ValueError:
+            limit = 100
+
+        if not query or mode not in SearchIndex.MODES:
+            return Response({
+                "success": False,
+                "message": "A query 'q' and a mode of exact, prefix or substring are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        scan_id = request.query_params.get('scanId')
+        state = scan_state_for(scan_id)
+        if state is None:
+            return Response({
+                "success": False,
+                "message": "No scan data available"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        started = time.perf_counter()
+        result = state.search.search(query, mode=mode, kinds=kinds, limit=limit)
+        result.update({
+            "scanId": state.scan_id,
+            "query": query,
+            "tookMs": round((time.perf_counter() - started) * 1000, 3)
+        })
+        return Response(result)
+
+class ChannelStatsView(APIView):
+    def get(self, request):
+        scan_id = request.query_params.get('scanId')
+        state = scan_state_for(scan_id)
+        if state is None:
+            return Response({
+                "success": False,
+                "message": "No scan data available"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        summary = state.channel_summary()
+        summary["scanId"] = state.scan_id
+        return Response(summary)
+
+class DashboardView(APIView):
+    def get(self, request, aggregate):
+        compute = AGGREGATES.get(aggregate)
+        if compute is None:
+            return Response({
+                "success": False,
+                "message": f"Unknown aggregate {aggregate}; one of {', '.join(AGGREGATES)}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        band = request.query_params.get('band') or None
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if band not in (None, '2.4', '5') or not 1 <= limit <= MAX_LIMIT:
+            return Response({
+                "success": False,
+                "message": f"band must be 2.4 or 5 and limit between 1 and {MAX_LIMIT}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        state = scan_state_for(request.query_params.get('scanId'))
+        if state is None:
+            return Response({
+                "success": False,
+                "message": "No scan data available"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        def build():
+            generation, networks, clients = snapshot(state)
+            result = compute(networks, clients, band=band, limit=limit)
+            result.update({"scanId": state.scan_id, "generation": generation, "aggregate": aggregate})
+            return generation, json.dumps(result).encode()
+
+        # Limits do not change the encryption counts, so leave them out of the key
+        params = (aggregate, band, None if aggregate == 'encryption' else limit)
+        body, hit = get_result_cache().get_or_compute(
+            (state.scan_id, id(state)), state.generation, params, build
+        )
+        response = HttpResponse(body, content_type='application/json')
+        response['X-Cache'] = 'hit' if hit else 'miss'
+        return response
+
+class AlertListView(APIView):
+    def get(self, request):
+        alerts = RogueAlert.objects.order_by('-created_at')
+        session_id = request.query_params.get('sessionId')
+        if session_id:
+            alerts = alerts.filter(session_id=session_id)
+        severity = request.query_params.get('severity')
+        if severity:
+            alerts = alerts.filter(severity=severity)
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+        except ValueError:
+            limit = 100
+
+        return Response([
+            {
+                "id": alert.pk,
+                "sessionId": str(alert.session_id),
+                "rule": alert.rule,
+                "severity": alert.severity,
+                "ssid": alert.ssid,
+                "bssid": alert.bssid,
+                "channel": alert.channel,
+                "message": alert.message,
+                "details": alert.details,
+                "timestamp": int(alert.created_at.timestamp())
+            }
+            for alert in alerts[:limit]
+        ])
+
+class TrendView(APIView):
+    def get(self, request, mac):
+        resolution = request.query_params.get('resolution') or None
+        try:
+            end = int(request.query_params.get('to') or time.time())
+            start = int(request.query_params.get('from') or end - 86400)
+        except ValueError:
+            start = end = None
+        if start is None or start > end or (resolution and resolution not in RESOLUTIONS):
+            return Response({
+                "success": False,
+                "message": "Invalid time range or resolution (raw, 1m or 1h)"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        resolution, points = get_observation_store().trend(
+            mac.upper(), start, end,
+            resolution=resolution,
+            session=request.query_params.get('sessionId'),
+        )
+        return Response({
+            "mac": mac.upper(),
+            "from": start,
+            "to": end,
+            "resolution": resolution,
+            "points": points
+        })
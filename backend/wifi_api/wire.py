@@ -0,0 +1,314 @@
+
+# Compact binary encoding of scan updates for the scan WebSocket
+#
+# A socket that offers the BINARY_SUBPROTOCOL at connect time receives its
+# ``scan_update`` messages as binary frames; every other message stays JSON.
+# Each connection keeps a dictionary of the strings it has been sent (MACs
+# as 6 bytes, SSIDs, vendors, ...) and the last values of every network, so
+# a frame only carries new dictionary entries and the fields that changed,
+# as varint deltas. Unchanged networks cost nothing.
+#
+# Frame layout (varint = unsigned LEB128, signed values zigzag encoded):
+#
+#   u8      version (1)
+#   u8      flags: 1 reset the scan's networks, 2 order follows,
+#                  4 reset the dictionary (and every scan's networks)
+#   varint  number of new dictionary entries, each:
+#             varint (length << 1 | is_mac), then 6 MAC bytes or UTF-8
+#   varint  scan id (dictionary reference)
+#   varint  schema: bit mask of FIELDS present in any of this scan's records
+#   varint  number of changed networks, each:
+#             varint bssid reference, varint mask of changed fields,
+#             varint mask of those that are now empty, and if it is not 0,
+#               varint mask of the empty ones that are absent rather than None,
+#             then per set bit that is not empty: zigzag delta (numbers,
+#               from 0 after an empty value) or reference (text)
+#   if order follows:
+#   varint  number of networks, then each one's bssid reference
+#
+# The order is only sent when the list of networks changed (a network came
+# or went, or a filter reordered them); otherwise it is the previous one.
+# ``id`` is not transmitted but rebuilt from the BSSID.
+import re
+
+from .scan_state import MAX_SCAN_STATES
+
+BINARY_SUBPROTOCOL = 'wifi-scan.bin.v1'
+WIRE_VERSION = 1
+
+FLAG_RESET = 1
+FLAG_ORDER = 2
+FLAG_DICTIONARY_RESET = 4
+
+# Past this many entries the dictionary starts over
+MAX_DICTIONARY = 1 << 16
+
+# name, kind; kind is 'text', 'key', 'derived' or a fixed-point scale
+FIELDS = (
+    ('id', 'derived'),
+    ('bssid', 'key'),
+    ('ssid', 'text'),
+    ('channel', 1),
+    ('signal', 1),
+    ('dbm', 1),
+    ('encryption', 'text'),
+    ('vendor', 'text'),
+    ('clients', 1),
+    ('beacons', 1),
+    ('firstSeen', 1),
+    ('lastSeen', 1),
+    ('smoothedDbm', 10),
+    ('smoothedSignal', 1),
+    ('trend', 100),
+    ('motion', 'text'),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+
+MAC_RE = re.compile(r'^[0-9A-F]{2}(:[0-9A-F]{2}){5}$')
+
+# Baseline value of a field a record does not have
+_ABSENT = object()
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_signed(out, value):
+    write_varint(out, (value << 1) if value >= 0 else (-value << 1) - 1)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def read_signed(data, pos):
+    value, pos = read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+class _ScanBaseline:
+    """What one connection last sent of one scan."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        # bssid reference -> list of encoded values, one per FIELDS entry;
+        # None and _ABSENT for empty ones
+        self.records = {}
+        self.order = []
+
+
+class ScanEncoder:
+    """Encodes one connection's scan updates against what it already sent."""
+
+    def __init__(self):
+        self.dictionary = {}
+        self.scans = {}
+
+    def _reference(self, text, new_entries):
+        ref = self.dictionary.get(text)
+        if ref is None:
+            ref = self.dictionary[text] = len(self.dictionary)
+            new_entries.append(text)
+        return ref
+
+    def encode(self, scan_id, networks):
+        """Return the binary frame for one ``scan_update``."""
+        flags = 0
+        if len(self.dictionary) > MAX_DICTIONARY:
+            self.dictionary.clear()
+            self.scans.clear()
+            flags |= FLAG_DICTIONARY_RESET
+
+        # Records may differ in their keys, e.g. smoothed fields only on some
+        keys = set()
+        for network in networks:
+            keys.update(network)
+        schema = 0
+        for bit, name in enumerate(FIELD_NAMES):
+            if name in keys:
+                schema |= 1 << bit
+        baseline = self.scans.pop(scan_id, None)
+        if baseline is None or (networks and schema != baseline.schema):
+            baseline = _ScanBaseline(schema)
+            flags |= FLAG_RESET
+        # Most recently updated scan last, so the oldest is dropped first
+        self.scans[scan_id] = baseline
+        while len(self.scans) > MAX_SCAN_STATES:
+            del self.scans[next(iter(self.scans))]
+        present = [(bit, name, kind) for bit, (name, kind) in enumerate(FIELDS)
+                   if baseline.schema >> bit & 1 and kind not in ('key', 'derived')]
+
+        new_entries = []
+        scan_ref = self._reference(scan_id, new_entries)
+        body = bytearray()
+        order = []
+        changed = 0
+        for network in networks:
+            ref = self._reference(network['bssid'], new_entries)
+            order.append(ref)
+            previous = baseline.records.get(ref)
+            values = [0] * len(FIELDS)
+            mask = 0
+            empty = absent = 0
+            for bit, name, kind in present:
+                value = network.get(name, _ABSENT)
+                if value is None or value is _ABSENT:
+                    empty |= 1 << bit
+                    if value is _ABSENT:
+                        absent |= 1 << bit
+                elif kind == 'text':
+                    value = self._reference(value, new_entries)
+                else:
+                    value = round(value * kind) if kind != 1 else int(value)
+                values[bit] = value
+                if previous is None or previous[bit] != value:
+                    mask |= 1 << bit
+            if previous is not None and not mask:
+                continue
+            baseline.records[ref] = values
+            changed += 1
+            write_varint(body, ref)
+            write_varint(body, mask)
+            write_varint(body, empty & mask)
+            if empty & mask:
+                write_varint(body, absent & mask)
+            for bit, name, kind in present:
+                if mask >> bit & 1 and not empty >> bit & 1:
+                    if kind == 'text':
+                        write_varint(body, values[bit])
+                    else:
+                        base = previous[bit] if previous is not None else None
+                        write_signed(body, values[bit] - (base if isinstance(base, int) else 0))
+
+        if order != baseline.order:
+            flags |= FLAG_ORDER
+            if len(order) < len(baseline.records):
+                kept = set(order)
+                baseline.records = {ref: v for ref, v in baseline.records.items() if ref in kept}
+            baseline.order = order
+
+        frame = bytearray((WIRE_VERSION, flags))
+        write_varint(frame, len(new_entries))
+        for text in new_entries:
+            if MAC_RE.match(text):
+                write_varint(frame, 6 << 1 | 1)
+                frame += bytes.fromhex(text.replace(':', ''))
+            else:
+                encoded = text.encode('utf-8')
+                write_varint(frame, len(encoded) << 1)
+                frame += encoded
+        write_varint(frame, scan_ref)
+        write_varint(frame, baseline.schema)
+        write_varint(frame, changed)
+        frame += body
+        if flags & FLAG_ORDER:
+            write_varint(frame, len(order))
+            for ref in order:
+                write_varint(frame, ref)
+        return bytes(frame)
+
+
+class ScanDecoder:
+    """Client side of ScanEncoder: turns frames back into ``scan_update`` dicts."""
+
+    def __init__(self):
+        self.dictionary = []
+        # scan id -> [schema, {bssid: record}, order]
+        self.scans = {}
+
+    def decode(self, frame):
+        data = memoryview(frame)
+        if data[0] != WIRE_VERSION:
+            raise ValueError(f"Unsupported wire version {data[0]}")
+        flags = data[1]
+        if flags & FLAG_DICTIONARY_RESET:
+            self.dictionary = []
+            self.scans.clear()
+
+        count, pos = read_varint(data, 2)
+        for _ in range(count):
+            header, pos = read_varint(data, pos)
+            length = header >> 1
+            raw = bytes(data[pos:pos + length])
+            pos += length
+            if header & 1:
+                self.dictionary.append(':'.join(f'{b:02X}' for b in raw))
+            else:
+                self.dictionary.append(raw.decode('utf-8'))
+
+        scan_ref, pos = read_varint(data, pos)
+        scan_id = self.dictionary[scan_ref]
+        schema, pos = read_varint(data, pos)
+        scan = self.scans.get(scan_id)
+        if scan is None or flags & FLAG_RESET:
+            scan = self.scans[scan_id] = [schema, {}, []]
+        scan[0] = schema
+        records = scan[1]
+
+        changed, pos = read_varint(data, pos)
+        for _ in range(changed):
+            ref, pos = read_varint(data, pos)
+            mask, pos = read_varint(data, pos)
+            empty, pos = read_varint(data, pos)
+            absent = 0
+            if empty:
+                absent, pos = read_varint(data, pos)
+            bssid = self.dictionary[ref]
+            record = records.get(bssid)
+            if record is None:
+                record = records[bssid] = self._blank(schema, bssid)
+            for bit, (name, kind) in enumerate(FIELDS):
+                if not mask >> bit & 1:
+                    continue
+                if empty >> bit & 1:
+                    record.pop('_' + name, None)
+                    if absent >> bit & 1:
+                        record.pop(name, None)
+                    else:
+                        record[name] = None
+                elif kind == 'text':
+                    value, pos = read_varint(data, pos)
+                    record[name] = self.dictionary[value]
+                else:
+                    delta, pos = read_signed(data, pos)
+                    raw = record.get('_' + name, 0) + delta
+                    record['_' + name] = raw
+                    record[name] = raw / kind if kind != 1 else raw
+
+        if flags & FLAG_ORDER:
+            count, pos = read_varint(data, pos)
+            order = []
+            for _ in range(count):
+                ref, pos = read_varint(data, pos)
+                order.append(self.dictionary[ref])
+            scan[2] = order
+            kept = set(order)
+            for bssid in [b for b in records if b not in kept]:
+                del records[bssid]
+
+        networks = []
+        for bssid in scan[2]:
+            record = records[bssid]
+            networks.append({name: record[name] for name in FIELD_NAMES if name in record})
+        return {'type': 'scan_update', 'scanId': scan_id, 'networks': networks}
+
+    def _blank(self, schema, bssid):
+        record = {}
+        for bit, (name, kind) in enumerate(FIELDS):
+            if schema >> bit & 1:
+                if kind == 'derived':
+                    record[name] = bssid.replace(':', '')
+                elif kind == 'key':
+                    record[name] = bssid
+        return record
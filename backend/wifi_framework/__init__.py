@@ -1,12 +1,13 @@
 
 # Django project initialization
+# This is the only place .env is read; settings and apps rely on it.
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Load .env file if it exists
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 if os.path.exists(env_path):
+    from dotenv import load_dotenv
     load_dotenv(env_path)
 else:
     # Set default sudo password if .env doesn't exist
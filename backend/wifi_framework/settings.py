@@ -2,18 +2,12 @@
 Django settings for wifi_framework project.
 """
 
-import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
+# (.env has already been loaded by wifi_framework/__init__.py)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Load .env file if it exists
-env_path = Path(__file__).resolve().parent.parent.parent / '.env'
-if os.path.exists(env_path):
-    load_dotenv(env_path)
-
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-wifi-framework-dev-only'
 
@@ -87,6 +81,105 @@ DATABASES = {
     }
 }
 
+# Capture storage
+# New bytes of live airodump-ng files are sealed into segments every
+# ROTATE_SECONDS or ROTATE_BYTES of growth, compressed in the background (zstd
+# if the zstandard package is installed, gzip otherwise) and evicted
+# oldest-first once the segments exceed MAX_BYTES.
+CAPTURE_STORE = {
+    'ROOT': BASE_DIR / 'captures',
+    'MAX_BYTES': 2 * 1024 * 1024 * 1024,
+    'ROTATE_BYTES': 16 * 1024 * 1024,
+    'ROTATE_SECONDS': 300,
+    'CODEC': 'zstd',
+}
+
+# Signal samples are kept in one SQLite file per day with 1-minute and 1-hour
+# rollups; partitions older than RETENTION_DAYS are dropped (None keeps all)
+HISTORY_STORE = {
+    'ROOT': BASE_DIR / 'history',
+    'RETENTION_DAYS': 90,
+    'COMPACT_SECONDS': 60,
+}
+
+# Where workers share the running scan, owner locks and scan snapshots.
+# /dev/shm keeps the snapshots in memory; every worker must see the same path.
+SCAN_RUNTIME_DIR = (
+    Path('/dev/shm/wifi_framework') if Path('/dev/shm').is_dir() else BASE_DIR / 'run'
+)
+
+# Run each scan's parse/diff/encode loop in its own process so it never holds
+# the GIL of the worker serving WebSockets. Frames are handed over through a
+# shared-memory ring of this size; needs a channel layer that crosses processes.
+SCAN_PARSE_WORKER = True
+SCAN_FRAME_RING_BYTES = 64 * 1024 * 1024
+
+# How long the interface inventory is trusted before iwconfig/ethtool are
+# re-run. Mode changes made through the API invalidate it immediately.
+INTERFACE_CACHE_SECONDS = 30
+
+# How monitor/managed mode changes reach the kernel: 'auto' uses nl80211 in
+# this process when running as root and the sudo helper otherwise; 'netlink',
+# 'helper' and 'fake' (in-memory interfaces, for development) force one.
+INTERFACE_CONTROL_BACKEND = 'auto'
+
+# The root-owned helper the sudo backend runs, installed with
+# `sudo python manage.py install_iface_helper`; the sudoers rule names this path.
+INTERFACE_HELPER_PATH = '/usr/local/sbin/wifi-iface-helper'
+
+# Channel hopping during scans. 'airodump' leaves hopping to airodump-ng.
+# 'adaptive' (opt-in) hops from the backend and gives channels dwell time by
+# how fast they turn up new APs and stations, never less than
+# MIN_DWELL_SECONDS per cycle; it needs the in-process netlink backend
+# (root and pyroute2) and skips CHANNELS the radio does not support.
+CHANNEL_HOPPING = {
+    'MODE': 'airodump',
+    'CHANNELS': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13,
+                 36, 40, 44, 48, 52, 56, 60, 64, 100, 104, 108, 112, 116, 120,
+                 124, 128, 132, 136, 140, 149, 153, 157, 161, 165],
+    'CYCLE_SECONDS': 8.0,
+    'MIN_DWELL_SECONDS': 0.1,
+    'REBALANCE_SECONDS': 5.0,
+}
+
+# Per-device signal smoothing in the live scan. 'kalman' tracks level and
+# slope with a constant-velocity filter (PROCESS_NOISE in dB^2/s^3,
+# READING_NOISE in dB^2); 'ewma' uses Holt's smoothing with a time constant of
+# EWMA_SECONDS. Slopes beyond MOTION_THRESHOLD dB/s count as moving.
+SIGNAL_SMOOTHING = {
+    'METHOD': 'kalman',
+    'PROCESS_NOISE': 0.02,
+    'READING_NOISE': 16.0,
+    'EWMA_SECONDS': 10.0,
+    'MOTION_THRESHOLD': 0.2,
+}
+
+# Dashboard aggregates are memoized per scan tick; the least recently used
+# results are evicted beyond MAX_ENTRIES or MAX_BYTES of encoded JSON.
+RESULT_CACHE = {
+    'MAX_ENTRIES': 512,
+    'MAX_BYTES': 32 * 1024 * 1024,
+}
+
+# Geotagged surveys. Samples are placed between position fixes at most
+# MAX_FIX_GAP_SECONDS apart and binned into CELL_METERS cells per device;
+# heatmaps interpolate up to a radius around measured cells and come back in
+# tiles of TILE_CELLS x TILE_CELLS, refusing requests over MAX_CELLS cells.
+SURVEY = {
+    'CELL_METERS': 1.0,
+    'MAX_FIX_GAP_SECONDS': 10.0,
+    'DEFAULT_RESOLUTION_METERS': 2.0,
+    'DEFAULT_RADIUS_METERS': 6.0,
+    'TILE_CELLS': 32,
+    'MAX_CELLS': 1_000_000,
+    'CACHED_GRIDS': 64,
+    'ACTIVE_CACHE_SECONDS': 10,
+}
+
+# Threads available to WebSocket consumers for iwconfig/ethtool/lspci calls,
+# kept apart from Django's main thread so slow commands do not block it.
+COMMAND_EXECUTOR_WORKERS = 4
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,12 +1,18 @@
-
 """
 WSGI config for wifi_framework project.
 """
 
 import os
+import threading
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wifi_framework.settings')
 
 application = get_wsgi_application()
+
+# WSGI servers (runserver included) send no lifespan events, so start the
+# warm-up, history compactor and scan watcher here
+from wifi_api.lifespan import warm_up
+
+threading.Thread(target=warm_up, daemon=True).start()
@@ -3,6 +3,11 @@ export interface Client {
   mac: string;          // MAC address of the client
   bssid: string;        // BSSID of the AP the client is connected to (or '(not associated)')
   power: number;        // Signal strength
+  dbm?: number;          // Raw signal in dBm
+  smoothedDbm?: number | null;  // Filtered signal in dBm, null until a reading
+  smoothedSignal?: number | null; // Filtered signal on the 0-100 scale
+  trend?: number | null;        // Signal slope in dB per second
+  motion?: "approaching" | "receding" | "steady" | null;
   rate: string;         // Data rate
   lost: number;         // Lost packets
   frames: number;       // Number of frames
@@ -5,6 +5,12 @@ export interface Network {
   bssid: string;
   channel: number;
   signal: number;
+  dbm?: number;
+  // null until the backend has a reading to smooth
+  smoothedDbm?: number | null;
+  smoothedSignal?: number | null;
+  trend?: number | null;
+  motion?: "approaching" | "receding" | "steady" | null;
   encryption: "WPA3" | "WPA2" | "WPA" | "WEP" | "OPEN";
   vendor: string;
   clients: number;